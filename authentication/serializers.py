@@ -158,8 +158,10 @@ class AzamPayAuthSerializer(serializers.ModelSerializer):
         
         validated_data['expires_in'] = expire_datetime
         
-        # Delete old tokens to keep only the latest one
-        AzamPayAuthToken.objects.all().delete()
+        token = super().create(validated_data)
         
-        return super().create(validated_data)
-        return user
+        # Prune older tokens, keeping the one just created even if another
+        # worker saved a token at the same time
+        AzamPayAuthToken.objects.exclude(pk=token.pk).filter(created_at__lte=token.created_at).delete()
+        
+        return token
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import login
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
+from catalog.services.cart import merge_guest_cart
 from .models import User, Address
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, AddressSerializer,
@@ -34,6 +35,9 @@ class RegisterView(generics.CreateAPIView):
         if serializer.is_valid():
             user = serializer.save()
             
+            # Carry over anything added to the cart before signing up
+            merge_guest_cart(request, user)
+            
             # Generate tokens
             refresh = RefreshToken.for_user(user)
             
@@ -68,6 +72,9 @@ class LoginView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
+            # Carry over anything added to the cart before logging in
+            merge_guest_cart(request, user)
+            
             # Generate tokens
             refresh = RefreshToken.for_user(user)
             
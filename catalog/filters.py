@@ -38,5 +38,5 @@ class ArtworkFilter(django_filters.FilterSet):
     def filter_available(self, queryset, name, value):
         """Filter by availability"""
         if value:
-            return queryset.filter(stock_quantity__gt=0)
+            return queryset.filter(stock_quantity__gt=models.F('reserved_quantity'))
         return queryset
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_artwork_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0, help_text='Units held by pending orders', verbose_name='reserved quantity'),
+        ),
+    ]
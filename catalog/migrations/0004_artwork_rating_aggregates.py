@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('catalog', '0003_artwork_reserved_quantity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='average_rating',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='average rating'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='1 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='2 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='3 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='4 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='5 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='review count'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['average_rating', 'review_count'], name='artworks_average_4a6b71_idx'),
+        ),
+    ]
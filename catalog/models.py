@@ -111,6 +111,11 @@ class Artwork(models.Model):
     price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
     currency = models.CharField(_('currency'), max_length=3, default='TZS')
     stock_quantity = models.PositiveIntegerField(_('stock quantity'), default=1)
+    reserved_quantity = models.PositiveIntegerField(
+        _('reserved quantity'),
+        default=0,
+        help_text=_('Units held by pending orders')
+    )
     
     # Status and Metadata
     status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=DRAFT)
@@ -132,6 +137,15 @@ class Artwork(models.Model):
     # Stats
     view_count = models.PositiveIntegerField(_('view count'), default=0)
     like_count = models.PositiveIntegerField(_('like count'), default=0)
+    
+    # Approved review aggregates, maintained by reviews.services.ratings
+    average_rating = models.DecimalField(_('average rating'), max_digits=3, decimal_places=2, default=0)
+    review_count = models.PositiveIntegerField(_('review count'), default=0)
+    rating_1_count = models.PositiveIntegerField(_('1 star reviews'), default=0)
+    rating_2_count = models.PositiveIntegerField(_('2 star reviews'), default=0)
+    rating_3_count = models.PositiveIntegerField(_('3 star reviews'), default=0)
+    rating_4_count = models.PositiveIntegerField(_('4 star reviews'), default=0)
+    rating_5_count = models.PositiveIntegerField(_('5 star reviews'), default=0)
     likes = models.ManyToManyField(
         User,
         related_name='liked_artworks',
@@ -150,6 +164,7 @@ class Artwork(models.Model):
             models.Index(fields=['price', 'currency']),
             models.Index(fields=['created_at']),
             models.Index(fields=['is_featured', 'status']),
+            models.Index(fields=['average_rating', 'review_count']),
         ]
         ordering = ['-created_at']
     
@@ -168,10 +183,20 @@ class Artwork(models.Model):
     
     @property
     def is_available(self):
-        return self.status == self.ACTIVE and self.stock_quantity > 0
+        return self.status == self.ACTIVE and self.available_quantity > 0
+    
+    @property
+    def available_quantity(self):
+        return max(self.stock_quantity - self.reserved_quantity, 0)
     
     @property
     def main_image(self):
+        if 'media' in getattr(self, '_prefetched_objects_cache', {}):
+            # Use prefetched media instead of issuing a query per artwork
+            return next(
+                (media for media in self.media.all() if media.kind == Media.IMAGE and media.is_primary),
+                None
+            )
         return self.media.filter(kind='image', is_primary=True).first()
     
     @property
@@ -285,17 +310,23 @@ class CartItem(models.Model):
     def total_price(self):
         return self.unit_price * self.quantity
     
+    @staticmethod
+    def build_snapshot(artwork):
+        """Snapshot of artwork data at time of adding to cart"""
+        main_image = artwork.main_image
+        return {
+            'title': artwork.title,
+            'artist': artwork.artist.display_name,
+            'price': str(artwork.price),
+            'currency': artwork.currency,
+            'image_url': main_image.file.url if main_image else None,
+        }
+
     def save(self, *args, **kwargs):
         if not self.unit_price:
             self.unit_price = self.artwork.price
-        
+
         # Save artwork snapshot
-        self.snapshot = {
-            'title': self.artwork.title,
-            'artist': self.artwork.artist.display_name,
-            'price': str(self.artwork.price),
-            'currency': self.artwork.currency,
-            'image_url': self.artwork.main_image.file.url if self.artwork.main_image else None,
-        }
-        
+        self.snapshot = self.build_snapshot(self.artwork)
+
         super().save(*args, **kwargs)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import F
 from .models import Category, Collection, Artwork, Media, Cart, CartItem
 
 
@@ -63,6 +64,39 @@ class MediaSerializer(serializers.ModelSerializer):
             return None
 
 
+def remember_artwork_likes(context, artwork_ids):
+    """
+    Look up in one query which of ``artwork_ids`` the requesting user has liked.
+
+    Results are stored in the serializer context so ``is_liked`` fields don't
+    need a query per artwork.
+    """
+    likes = context.setdefault('artwork_likes', {})
+    pending = {artwork_id for artwork_id in artwork_ids if artwork_id not in likes}
+    if not pending:
+        return
+
+    request = context.get('request')
+    liked = set()
+    if request and request.user.is_authenticated:
+        liked = set(
+            Artwork.likes.through.objects.filter(
+                user_id=request.user.id, artwork_id__in=pending
+            ).values_list('artwork_id', flat=True)
+        )
+    for artwork_id in pending:
+        likes[artwork_id] = artwork_id in liked
+
+
+class ArtworkListListSerializer(serializers.ListSerializer):
+    """Resolves ``is_liked`` for the whole list with a single query"""
+    
+    def to_representation(self, data):
+        artworks = list(data.all() if hasattr(data, 'all') else data)
+        remember_artwork_likes(self.context, [artwork.pk for artwork in artworks])
+        return super().to_representation(artworks)
+
+
 class ArtworkListSerializer(serializers.ModelSerializer):
     """Artwork list serializer (minimal data)"""
     
@@ -76,8 +110,10 @@ class ArtworkListSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'title', 'slug', 'artist_name', 'category_name',
             'price', 'currency', 'main_image', 'is_featured',
-            'tribe', 'region', 'material', 'view_count', 'like_count', 'is_liked'
+            'tribe', 'region', 'material', 'view_count', 'like_count', 'is_liked',
+            'average_rating', 'review_count'
         )
+        list_serializer_class = ArtworkListListSerializer
     
     def get_artist_name(self, obj):
         """Return artist display name or empty string"""
@@ -95,6 +131,9 @@ class ArtworkListSerializer(serializers.ModelSerializer):
     
     def get_is_liked(self, obj):
         """Return whether the current user has liked this artwork"""
+        likes = self.context.get('artwork_likes', {})
+        if obj.pk in likes:
+            return likes[obj.pk]
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             try:
@@ -105,11 +144,17 @@ class ArtworkListSerializer(serializers.ModelSerializer):
     
     def get_main_image(self, obj):
         """Return main image or None if no image exists"""
-        main_media = obj.media.filter(kind='image', is_primary=True).first()
+        if 'media' in getattr(obj, '_prefetched_objects_cache', {}):
+            # Use prefetched media instead of querying per artwork
+            images = [media for media in obj.media.all() if media.kind == Media.IMAGE]
+            main_media = next((media for media in images if media.is_primary), None)
+            first_image = images[0] if images else None
+        else:
+            main_media = obj.media.filter(kind='image', is_primary=True).first()
+            first_image = None if main_media else obj.media.filter(kind='image').first()
         if main_media:
             return MediaSerializer(main_media, context=self.context).data
         # Fallback to first image
-        first_image = obj.media.filter(kind='image').first()
         if first_image:
             return MediaSerializer(first_image, context=self.context).data
         # Return None if no images exist
@@ -124,6 +169,7 @@ class ArtworkDetailSerializer(serializers.ModelSerializer):
     media = MediaSerializer(many=True, read_only=True)
     collections = serializers.StringRelatedField(many=True, read_only=True)
     is_liked = serializers.SerializerMethodField()
+    rating_distribution = serializers.SerializerMethodField()
     
     class Meta:
         model = Artwork
@@ -131,10 +177,11 @@ class ArtworkDetailSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'description', 'story', 'meaning',
             'artist', 'category', 'collections', 'tribe', 'region',
             'material', 'tags', 'dimensions', 'weight', 'price',
-            'currency', 'stock_quantity', 'status', 'is_featured',
+            'currency', 'stock_quantity', 'available_quantity', 'status', 'is_featured',
             'is_unique', 'attributes', 'meta_description',
             'meta_keywords', 'media', 'created_at', 'updated_at',
-            'published_at', 'view_count', 'like_count', 'is_available', 'is_liked'
+            'published_at', 'view_count', 'like_count', 'is_available', 'is_liked',
+            'average_rating', 'review_count', 'rating_distribution'
         )
     
     def get_artist(self, obj):
@@ -144,6 +191,10 @@ class ArtworkDetailSerializer(serializers.ModelSerializer):
             return ArtistPublicSerializer(obj.artist, context=self.context).data
         return None
     
+    def get_rating_distribution(self, obj):
+        """Return approved review counts per star"""
+        return {str(star): getattr(obj, f'rating_{star}_count') for star in range(1, 6)}
+    
     def get_is_liked(self, obj):
         """Return whether the current user has liked this artwork"""
         request = self.context.get('request')
@@ -264,6 +315,50 @@ class CartItemSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class CartBatchOperationSerializer(serializers.Serializer):
+    """A single add/update/remove operation in a batch cart mutation"""
+    
+    ADD = 'add'
+    UPDATE = 'update'
+    REMOVE = 'remove'
+    
+    action = serializers.ChoiceField(choices=[ADD, UPDATE, REMOVE])
+    artwork_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1, required=False, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Batch cart mutation serializer"""
+    
+    MAX_OPERATIONS = 100
+    
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False)
+    
+    def validate_operations(self, value):
+        if len(value) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"A batch can contain at most {self.MAX_OPERATIONS} operations"
+            )
+        
+        # Validate every artwork being added or updated in one query
+        artwork_ids = {
+            op['artwork_id'] for op in value
+            if op['action'] != CartBatchOperationSerializer.REMOVE
+        }
+        artworks = Artwork.objects.filter(
+            id__in=artwork_ids, status='active', stock_quantity__gt=F('reserved_quantity')
+        ).select_related('artist').prefetch_related('media').in_bulk()
+        
+        unavailable = artwork_ids - set(artworks)
+        if unavailable:
+            raise serializers.ValidationError(
+                [f"Artwork {artwork_id} not found or not available" for artwork_id in sorted(map(str, unavailable))]
+            )
+        
+        self.artworks = artworks
+        return value
+
+
 class CartSerializer(serializers.ModelSerializer):
     """Cart serializer"""
     
@@ -300,7 +395,8 @@ class ArtworkSearchSerializer(serializers.Serializer):
     ordering = serializers.ChoiceField(
         choices=[
             'created_at', '-created_at', 'price', '-price',
-            'title', '-title', 'view_count', '-view_count'
+            'title', '-title', 'view_count', '-view_count',
+            'rating', '-rating', 'review_count', '-review_count'
         ],
         required=False,
         default='-created_at'
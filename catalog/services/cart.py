@@ -0,0 +1,365 @@
+"""
+Cart services
+
+Guest carts live in the session until the user logs in, at which point they are
+merged into the persistent ``Cart``/``CartItem`` tables with a single upsert.
+Cart ids are cached per user so cart reads don't need a ``get_or_create``.
+"""
+import logging
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from catalog.models import Artwork, Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+GUEST_CART_SESSION_KEY = 'guest_cart'
+CART_ID_CACHE_KEY = 'catalog:cart_id:{user_id}'
+CART_ID_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class CartOperationError(Exception):
+    """Raised when a batch cart operation can't be applied; nothing is changed"""
+
+
+def get_cart_id(user, verify=False):
+    """
+    Return the id of the user's cart, creating the cart on first use.
+
+    The cached id can outlive the cart (deleted at checkout, by an admin or a
+    merge). Reads scoped by the id just find nothing, but writes that insert
+    items need the row, so they pass ``verify=True`` to check it still exists
+    and fall back to ``get_or_create`` if it doesn't.
+    """
+    key = CART_ID_CACHE_KEY.format(user_id=user.pk)
+    cart_id = cache.get(key)
+    if cart_id is not None and verify and not Cart.objects.filter(id=cart_id).exists():
+        cart_id = None
+    if cart_id is None:
+        cart, created = Cart.objects.get_or_create(user=user)
+        cart_id = cart.id
+        cache.set(key, cart_id, CART_ID_CACHE_TIMEOUT)
+    return cart_id
+
+
+def forget_cart_id(user):
+    """Drop the cached cart id for a user"""
+    cache.delete(CART_ID_CACHE_KEY.format(user_id=user.pk))
+
+
+def get_user_cart(user):
+    """Load the user's cart with its items and their artworks"""
+    items = CartItem.objects.select_related(
+        'artwork__artist', 'artwork__category'
+    ).prefetch_related('artwork__media')
+    queryset = Cart.objects.prefetch_related(Prefetch('items', queryset=items))
+
+    try:
+        return queryset.get(id=get_cart_id(user))
+    except Cart.DoesNotExist:
+        # Stale cache entry, fall back to get_or_create once
+        forget_cart_id(user)
+        return queryset.get(id=get_cart_id(user))
+
+
+class SessionCart:
+    """Guest cart stored in the session with the same API shape as ``Cart``"""
+
+    def __init__(self, request):
+        self.session = request.session
+        self.data = self.session.get(GUEST_CART_SESSION_KEY) or self._empty()
+
+    @staticmethod
+    def _empty():
+        now = timezone.localtime().isoformat()
+        return {
+            'next_id': 1,
+            'currency': 'TZS',
+            'items': [],
+            'created_at': now,
+            'updated_at': now,
+        }
+
+    @property
+    def items(self):
+        return self.data['items']
+
+    def _save(self):
+        self.data['updated_at'] = timezone.localtime().isoformat()
+        self.session[GUEST_CART_SESSION_KEY] = self.data
+        self.session.modified = True
+
+    def get_item(self, item_id):
+        for item in self.items:
+            if item['id'] == item_id:
+                return item
+        return None
+
+    def get_item_for_artwork(self, artwork_id):
+        artwork_id = str(artwork_id)
+        for item in self.items:
+            if item['artwork_id'] == artwork_id:
+                return item
+        return None
+
+    def add(self, artwork, quantity=1):
+        """Add an artwork, increasing the quantity if it is already in the cart"""
+        now = timezone.localtime().isoformat()
+        item = self.get_item_for_artwork(artwork.id)
+
+        if item:
+            item['quantity'] += quantity
+            item['updated_at'] = now
+        else:
+            item = {
+                'id': self.data['next_id'],
+                'artwork_id': str(artwork.id),
+                'quantity': quantity,
+                'unit_price': str(artwork.price),
+                'snapshot': CartItem.build_snapshot(artwork),
+                'created_at': now,
+                'updated_at': now,
+            }
+            self.data['next_id'] += 1
+            self.items.append(item)
+
+        self._save()
+        return item
+
+    def update(self, item_id, quantity):
+        item = self.get_item(item_id)
+        if item is None:
+            return None
+        item['quantity'] = quantity
+        item['updated_at'] = timezone.localtime().isoformat()
+        self._save()
+        return item
+
+    def remove(self, item_id):
+        item = self.get_item(item_id)
+        if item is None:
+            return False
+        self.items.remove(item)
+        self._save()
+        return True
+
+    def clear(self):
+        self.data['items'] = []
+        self._save()
+
+    def apply(self, operations, artworks):
+        """Apply a validated batch of add/update/remove operations"""
+        current = {
+            Artwork._meta.pk.to_python(item['artwork_id']): item['quantity']
+            for item in self.items
+        }
+        planned = plan_quantities(current, operations, artworks)
+
+        for artwork_id, quantity in planned.items():
+            item = self.get_item_for_artwork(artwork_id)
+            if item is None:
+                self.add(artworks[artwork_id], quantity)
+            elif item['quantity'] != quantity:
+                self.update(item['id'], quantity)
+
+        self.data['items'] = [
+            item for item in self.items
+            if Artwork._meta.pk.to_python(item['artwork_id']) in planned
+        ]
+        self._save()
+
+    def discard(self):
+        """Forget the guest cart entirely (e.g. after merging it at login)"""
+        self.session.pop(GUEST_CART_SESSION_KEY, None)
+
+    def as_cart_items(self, items=None):
+        """Build unsaved ``CartItem`` instances so the regular serializers can be reused"""
+        items = self.items if items is None else items
+        artworks = Artwork.objects.filter(
+            id__in=[item['artwork_id'] for item in items]
+        ).select_related('artist', 'category').prefetch_related('media').in_bulk()
+
+        cart_items = []
+        for item in items:
+            artwork = artworks.get(Artwork._meta.pk.to_python(item['artwork_id']))
+            if artwork is None:
+                continue
+            cart_items.append(CartItem(
+                id=item['id'],
+                artwork=artwork,
+                quantity=item['quantity'],
+                unit_price=Decimal(item['unit_price']),
+                snapshot=item['snapshot'],
+                created_at=item['created_at'],
+                updated_at=item['updated_at'],
+            ))
+        return cart_items
+
+    def serialize(self, context):
+        """Serialize the guest cart in the same shape as ``CartSerializer``"""
+        from catalog.serializers import CartItemSerializer
+
+        cart_items = self.as_cart_items()
+        return {
+            'id': None,
+            'currency': self.data['currency'],
+            'items': CartItemSerializer(cart_items, many=True, context=context).data,
+            'total_amount': sum((item.total_price for item in cart_items), Decimal('0.00')),
+            'total_items': sum(item.quantity for item in cart_items),
+            'created_at': self.data['created_at'],
+            'updated_at': self.data['updated_at'],
+        }
+
+    def serialize_item(self, item, context):
+        from catalog.serializers import CartItemSerializer
+
+        cart_items = self.as_cart_items([item])
+        if not cart_items:
+            return None
+        return CartItemSerializer(cart_items[0], context=context).data
+
+
+def plan_quantities(current, operations, artworks):
+    """
+    Replay batch operations over a {artwork_id: quantity} mapping.
+
+    ``update`` only changes lines already in the cart (or added earlier in
+    the batch), and lines that are added or updated can't exceed the stock
+    still available. Raises ``CartOperationError`` otherwise.
+    """
+    quantities = dict(current)
+    for op in operations:
+        artwork_id = op['artwork_id']
+        if op['action'] == 'add':
+            quantities[artwork_id] = quantities.get(artwork_id, 0) + op['quantity']
+        elif op['action'] == 'update':
+            if artwork_id not in quantities:
+                raise CartOperationError(f"Artwork {artwork_id} is not in the cart")
+            quantities[artwork_id] = op['quantity']
+        else:
+            quantities.pop(artwork_id, None)
+
+    for artwork_id in {op['artwork_id'] for op in operations if op['action'] != 'remove'}:
+        if artwork_id in quantities and quantities[artwork_id] > artworks[artwork_id].available_quantity:
+            raise CartOperationError(
+                f"Only {artworks[artwork_id].available_quantity} of artwork {artwork_id} available"
+            )
+    return quantities
+
+
+def apply_cart_operations(cart_id, operations, artworks):
+    """
+    Apply a validated batch of add/update/remove operations to a persistent cart.
+
+    ``artworks`` maps artwork id to the (already validated) artwork for every
+    add/update operation. Changes are written with one delete, one
+    ``bulk_update`` and one ``bulk_create`` inside a single transaction; if
+    any operation is rejected (``CartOperationError``) none are applied.
+    """
+    touched = {op['artwork_id'] for op in operations}
+
+    with transaction.atomic():
+        existing = {
+            item.artwork_id: item
+            for item in CartItem.objects.select_for_update().filter(cart_id=cart_id, artwork_id__in=touched)
+        }
+        planned = plan_quantities(
+            {artwork_id: item.quantity for artwork_id, item in existing.items()},
+            operations,
+            artworks
+        )
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for artwork_id, quantity in planned.items():
+            item = existing.get(artwork_id)
+            if item is None:
+                artwork = artworks[artwork_id]
+                to_create.append(CartItem(
+                    cart_id=cart_id,
+                    artwork=artwork,
+                    quantity=quantity,
+                    unit_price=artwork.price,
+                    snapshot=CartItem.build_snapshot(artwork),
+                ))
+            elif item.quantity != quantity:
+                item.quantity = quantity
+                item.updated_at = now
+                to_update.append(item)
+
+        removed = [item.id for artwork_id, item in existing.items() if artwork_id not in planned]
+        if removed:
+            CartItem.objects.filter(id__in=removed).delete()
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+
+    return {'created': len(to_create), 'updated': len(to_update), 'removed': len(removed)}
+
+
+def merge_guest_cart(request, user):
+    """
+    Merge the session guest cart into the user's persistent cart.
+
+    Quantities are added to any existing items, capped at the stock still
+    available, and everything is written with a single bulk upsert on
+    (cart, artwork). Returns the number of merged items.
+    """
+    guest_cart = SessionCart(request)
+    if not guest_cart.items:
+        guest_cart.discard()
+        return 0
+
+    quantities = {}
+    for item in guest_cart.items:
+        artwork_id = Artwork._meta.pk.to_python(item['artwork_id'])
+        quantities[artwork_id] = quantities.get(artwork_id, 0) + item['quantity']
+    guest_items = {Artwork._meta.pk.to_python(item['artwork_id']): item for item in guest_cart.items}
+
+    # Drop anything that went out of stock while the user was browsing and cap
+    # the merged quantities at what is left
+    available = dict(
+        Artwork.objects.filter(
+            id__in=quantities, status=Artwork.ACTIVE, stock_quantity__gt=F('reserved_quantity')
+        ).annotate(
+            available=F('stock_quantity') - F('reserved_quantity')
+        ).values_list('id', 'available')
+    )
+
+    cart_id = get_cart_id(user, verify=True)
+    with transaction.atomic():
+        existing = dict(
+            CartItem.objects.filter(cart_id=cart_id, artwork_id__in=quantities)
+            .values_list('artwork_id', 'quantity')
+        )
+
+        merged = [
+            CartItem(
+                cart_id=cart_id,
+                artwork_id=artwork_id,
+                quantity=min(existing.get(artwork_id, 0) + quantities[artwork_id], available[artwork_id]),
+                unit_price=Decimal(guest_items[artwork_id]['unit_price']),
+                snapshot=guest_items[artwork_id]['snapshot'],
+            )
+            for artwork_id in available
+        ]
+
+        if merged:
+            # MySQL upserts can't name the conflict target
+            unique_fields = ['cart', 'artwork'] if connection.features.supports_update_conflicts_with_target else None
+            CartItem.objects.bulk_create(
+                merged,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['quantity', 'updated_at'],
+            )
+
+    guest_cart.discard()
+    logger.info(f"Merged {len(merged)} guest cart items into cart {cart_id}")
+    return len(merged)
@@ -1,3 +1,156 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from artists.models import Artist
+from .models import Artwork, Cart, CartItem, Category
+from .services.cart import get_cart_id
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_artworks(count, stock=10):
+    artist_user = User.objects.create_user(email='artist@example.com', username='artist', password=None)
+    artist = Artist.objects.create(user=artist_user, display_name='Asha')
+    category = Category.objects.create(name='Masks', slug='masks')
+    return Artwork.objects.bulk_create([
+        Artwork(
+            artist=artist, category=category, title=f'Mask {i}', slug=f'mask-{i}',
+            description='Mask', material='Wood', dimensions='10 x 10 x 10',
+            price=Decimal('1000.00'), stock_quantity=stock, status=Artwork.ACTIVE
+        )
+        for i in range(count)
+    ])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GuestCartTests(APITestCase):
+    """Session carts for guests and merging them at login"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artworks = create_artworks(3, stock=5)
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret-pass-1')
+
+    def setUp(self):
+        cache.clear()
+
+    def add(self, artwork, quantity):
+        return self.client.post(
+            reverse('catalog:cart_add_item'), {'artwork_id': str(artwork.pk), 'quantity': quantity}, format='json'
+        )
+
+    def test_guest_cart_lives_in_the_session(self):
+        self.assertEqual(self.add(self.artworks[0], 2).status_code, 201)
+        self.assertEqual(self.add(self.artworks[0], 1).status_code, 201)
+
+        response = self.client.get(reverse('catalog:cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['id'])
+        self.assertEqual([item['quantity'] for item in response.data['items']], [3])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_login_merges_into_existing_lines(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, artwork=self.artworks[0], quantity=1, unit_price=Decimal('1000.00'))
+        CartItem.objects.create(cart=cart, artwork=self.artworks[1], quantity=4, unit_price=Decimal('1000.00'))
+        self.add(self.artworks[0], 2)
+        self.add(self.artworks[1], 3)
+        self.add(self.artworks[2], 1)
+
+        response = self.client.post(
+            reverse('authentication:login'), {'email': 'buyer@example.com', 'password': 'secret-pass-1'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        quantities = dict(CartItem.objects.filter(cart=cart).values_list('artwork__title', 'quantity'))
+        # Mask 1 is capped at the 5 in stock
+        self.assertEqual(quantities, {'Mask 0': 3, 'Mask 1': 5, 'Mask 2': 1})
+        self.assertEqual(self.client.get(reverse('catalog:cart')).data['items'], [])
+
+    def test_add_after_the_cached_cart_was_deleted(self):
+        self.client.force_authenticate(self.user)
+        stale_id = get_cart_id(self.user)
+        Cart.objects.filter(id=stale_id).delete()
+
+        self.assertEqual(self.add(self.artworks[0], 1).status_code, 201)
+        cart = Cart.objects.get(user=self.user)
+        self.assertNotEqual(cart.id, stale_id)
+        self.assertEqual(cart.items.get().quantity, 1)
+
+
+class PaymentMigrationTests(TransactionTestCase):
+    """payments 0002 adds the method field before the unique_together that uses it"""
+
+    def test_payment_migrations_apply_in_order(self):
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes('payments')
+        executor.migrate([('payments', '0001_initial')])
+
+        executor.loader.build_graph()
+        executor.migrate(latest)
+
+        executor.loader.build_graph()
+        self.assertEqual(executor.migration_plan(latest), [])
+
+
+class CartBatchTests(APITestCase):
+    """Batch add/update/remove on the persistent cart"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artworks = create_artworks(3, stock=5)
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.cart = Cart.objects.create(user=cls.user)
+        CartItem.objects.create(cart=cls.cart, artwork=cls.artworks[0], quantity=1, unit_price=Decimal('1000.00'))
+        CartItem.objects.create(cart=cls.cart, artwork=cls.artworks[1], quantity=1, unit_price=Decimal('1000.00'))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *operations):
+        return self.client.post(reverse('catalog:cart_batch'), {'operations': [
+            {'action': action, 'artwork_id': str(artwork.pk), 'quantity': quantity}
+            for action, artwork, quantity in operations
+        ]}, format='json')
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list('artwork__title', 'quantity'))
+
+    def test_mixed_operations(self):
+        response = self.batch(
+            ('add', self.artworks[0], 2),
+            ('remove', self.artworks[1], 1),
+            ('add', self.artworks[2], 1),
+            ('update', self.artworks[2], 4),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {'Mask 0': 3, 'Mask 2': 4})
+        self.assertEqual(response.data['total_items'], 7)
+
+    def test_update_of_an_item_not_in_the_cart_is_rejected(self):
+        response = self.batch(('add', self.artworks[0], 1), ('update', self.artworks[2], 2))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(), {'Mask 0': 1, 'Mask 1': 1})
+
+    def test_quantities_are_checked_against_stock(self):
+        Artwork.objects.filter(pk=self.artworks[1].pk).update(reserved_quantity=3)
+
+        response = self.batch(('add', self.artworks[0], 2), ('update', self.artworks[1], 3))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Only 2', response.data['error'])
+        # The valid add was rolled back with the rejected update
+        self.assertEqual(self.quantities(), {'Mask 0': 1, 'Mask 1': 1})
+
+        Artwork.objects.filter(pk=self.artworks[2].pk).update(status=Artwork.DRAFT)
+        self.assertEqual(self.batch(('add', self.artworks[2], 1)).status_code, 400)
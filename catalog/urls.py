@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (
     CategoryListView, CollectionListView, CollectionDetailView,
     ArtworkListView, ArtworkDetailView, ArtworkCreateView, ArtworkUpdateView,
-    CartView, CartItemView, ArtworkLikeView, LikedArtworksView,
+    CartView, CartItemView, CartBatchView, ArtworkLikeView, LikedArtworksView,
     artwork_stats, filter_options
 )
 
@@ -27,6 +27,7 @@ urlpatterns = [
     # Cart
     path('cart/', CartView.as_view(), name='cart'),
     path('cart/items/', CartItemView.as_view(), name='cart_add_item'),
+    path('cart/items/batch/', CartBatchView.as_view(), name='cart_batch'),
     path('cart/items/<int:item_id>/', CartItemView.as_view(), name='cart_item_detail'),
     
     # Stats and Filters
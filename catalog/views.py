@@ -12,9 +12,10 @@ from .models import Category, Collection, Artwork, Media, Cart, CartItem
 from .serializers import (
     CategorySerializer, CollectionSerializer, ArtworkListSerializer,
     ArtworkDetailSerializer, ArtworkCreateUpdateSerializer, MediaSerializer,
-    CartSerializer, CartItemSerializer, ArtworkSearchSerializer
+    CartSerializer, CartItemSerializer, CartBatchSerializer, ArtworkSearchSerializer
 )
 from .filters import ArtworkFilter
+from .services.cart import CartOperationError, SessionCart, apply_cart_operations, get_cart_id, get_user_cart
 
 
 class CategoryListView(generics.ListCreateAPIView):
@@ -104,13 +105,16 @@ class ArtworkListView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ArtworkFilter
     search_fields = ['title', 'description', 'story', 'artist__display_name', 'tribe', 'region', 'material']
-    ordering_fields = ['created_at', 'price', 'title', 'view_count']
+    ordering_fields = ['created_at', 'price', 'title', 'view_count', 'rating', 'review_count']
     ordering = ['-created_at']
     
     def get_queryset(self):
         queryset = Artwork.objects.filter(status='active').select_related(
             'artist', 'category'
-        ).prefetch_related('media', 'collections')
+        ).prefetch_related('media', 'collections').annotate(
+            # Stored aggregate, exposed as ?ordering=rating
+            rating=F('average_rating')
+        )
         
         # Collection filtering
         collection_slug = self.request.query_params.get('collection')
@@ -137,7 +141,7 @@ class ArtworkListView(generics.ListAPIView):
             OpenApiParameter(name='price_min', description='Minimum price', required=False, type=float),
             OpenApiParameter(name='price_max', description='Maximum price', required=False, type=float),
             OpenApiParameter(name='featured', description='Featured only', required=False, type=bool),
-            OpenApiParameter(name='ordering', description='Ordering', required=False, type=str),
+            OpenApiParameter(name='ordering', description='Order by: created_at, price, title, view_count, rating, review_count (prefix with - for descending)', required=False, type=str),
         ]
     )
     def get(self, request, *args, **kwargs):
@@ -218,22 +222,21 @@ class ArtworkUpdateView(generics.RetrieveUpdateAPIView):
 
 
 class CartView(APIView):
-    """Cart management endpoint"""
+    """Cart management endpoint (session-backed for guests)"""
     
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_cart(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+    permission_classes = [permissions.AllowAny]
     
     @extend_schema(
         operation_id='get_cart',
         summary='Get cart',
-        description='Retrieve current user cart',
+        description='Retrieve current user cart, or the session cart for guests',
         responses={200: CartSerializer}
     )
     def get(self, request):
-        cart = self.get_cart()
+        if not request.user.is_authenticated:
+            return Response(SessionCart(request).serialize({'request': request}))
+        
+        cart = get_user_cart(request.user)
         serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
     
@@ -243,19 +246,21 @@ class CartView(APIView):
         description='Remove all items from cart',
     )
     def delete(self, request):
-        cart = self.get_cart()
-        cart.items.all().delete()
+        if not request.user.is_authenticated:
+            SessionCart(request).clear()
+        else:
+            CartItem.objects.filter(cart_id=get_cart_id(request.user)).delete()
         return Response({'message': 'Cart cleared'})
 
 
 class CartItemView(APIView):
-    """Cart item management endpoint"""
+    """Cart item management endpoint (session-backed for guests)"""
     
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
     
-    def get_cart(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+    def get_cart(self, verify=False):
+        # Only the id is needed to scope item queries, so skip loading the row
+        return Cart(id=get_cart_id(self.request.user, verify=verify), user=self.request.user)
     
     @extend_schema(
         operation_id='add_to_cart',
@@ -265,7 +270,18 @@ class CartItemView(APIView):
         responses={201: CartItemSerializer}
     )
     def post(self, request):
-        cart = self.get_cart()
+        if not request.user.is_authenticated:
+            serializer = CartItemSerializer(data=request.data, context={'request': request})
+            if serializer.is_valid():
+                artwork = Artwork.objects.select_related('artist').get(id=serializer.validated_data['artwork_id'])
+                guest_cart = SessionCart(request)
+                item = guest_cart.add(artwork, serializer.validated_data.get('quantity', 1))
+                return Response(guest_cart.serialize_item(item, {'request': request}), status=status.HTTP_201_CREATED)
+            
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Adding inserts a row referencing the cart, so make sure it still exists
+        cart = self.get_cart(verify=True)
         serializer = CartItemSerializer(data=request.data, context={'cart': cart, 'request': request})
         
         if serializer.is_valid():
@@ -281,6 +297,19 @@ class CartItemView(APIView):
         request=CartItemSerializer,
     )
     def patch(self, request, item_id):
+        if not request.user.is_authenticated:
+            guest_cart = SessionCart(request)
+            if guest_cart.get_item(item_id) is None:
+                return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            serializer = CartItemSerializer(data=request.data, partial=True, context={'request': request})
+            if serializer.is_valid():
+                quantity = serializer.validated_data.get('quantity')
+                item = guest_cart.update(item_id, quantity) if quantity else guest_cart.get_item(item_id)
+                return Response(guest_cart.serialize_item(item, {'request': request}))
+            
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
         cart = self.get_cart()
         
         try:
@@ -301,6 +330,11 @@ class CartItemView(APIView):
         description='Remove an item from cart',
     )
     def delete(self, request, item_id):
+        if not request.user.is_authenticated:
+            if SessionCart(request).remove(item_id):
+                return Response({'message': 'Item removed from cart'})
+            return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
+        
         cart = self.get_cart()
         
         try:
@@ -311,6 +345,43 @@ class CartItemView(APIView):
             return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class CartBatchView(APIView):
+    """Batch add/update/remove of cart items"""
+    
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        operation_id='batch_update_cart',
+        summary='Batch update cart',
+        description=(
+            'Apply a list of add/update/remove operations to the cart in one request. '
+            'Operations are applied in order and the updated cart is returned. update only '
+            'changes items already in the cart; if any operation is rejected, none are applied.'
+        ),
+        request=CartBatchSerializer,
+        responses={200: CartSerializer}
+    )
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        operations = serializer.validated_data['operations']
+        
+        try:
+            if not request.user.is_authenticated:
+                guest_cart = SessionCart(request)
+                guest_cart.apply(operations, serializer.artworks)
+                return Response(guest_cart.serialize({'request': request}))
+            
+            apply_cart_operations(get_cart_id(request.user, verify=True), operations, serializer.artworks)
+        except CartOperationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart = get_user_cart(request.user)
+        return Response(CartSerializer(cart, context={'request': request}).data)
+
+
 class ArtworkLikeView(APIView):
     """Like/Unlike artwork endpoint"""
     
@@ -1,11 +1,14 @@
 from django.contrib import admin
-from .models import Order, OrderItem, OrderStatusHistory, Refund
+from .models import (
+    Order, OrderItem, OrderStatusHistory, Refund, OrderNumberSequence, StockReservation, IdempotencyRecord,
+    SalesDailyRollup, ArchivedOrder
+)
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """Order admin"""
-    list_display = ('order_number', 'user', 'status', 'total_amount', 'currency')
+    list_display = ('order_number', 'user', 'status', 'total_amount', 'currency', 'archived_at')
     list_filter = ('status', 'currency')
     search_fields = ('order_number', 'user__email', 'user__first_name', 'user__last_name')
     ordering = ('-created_at',)
@@ -35,3 +38,46 @@ class RefundAdmin(admin.ModelAdmin):
     list_filter = ('status',)
     search_fields = ('order__order_number',)
     ordering = ('-created_at',)
+
+
+@admin.register(OrderNumberSequence)
+class OrderNumberSequenceAdmin(admin.ModelAdmin):
+    """OrderNumberSequence admin"""
+    list_display = ('year', 'last_value', 'updated_at')
+    ordering = ('-year',)
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """StockReservation admin"""
+    list_display = ('order', 'artwork', 'quantity', 'status', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('order__order_number', 'artwork__title')
+    ordering = ('-created_at',)
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    """IdempotencyRecord admin"""
+    list_display = ('key', 'scope', 'user', 'status', 'response_status', 'created_at')
+    list_filter = ('scope', 'status')
+    search_fields = ('key', 'user__email')
+    ordering = ('-created_at',)
+
+
+@admin.register(SalesDailyRollup)
+class SalesDailyRollupAdmin(admin.ModelAdmin):
+    """SalesDailyRollup admin"""
+    list_display = ('date', 'artist', 'category', 'currency', 'orders_count', 'items_sold', 'revenue')
+    list_filter = ('currency', 'category')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """ArchivedOrder admin"""
+    list_display = ('order', 'items_count', 'payment_status', 'shipment_status', 'archived_at')
+    list_filter = ('payment_status', 'shipment_status')
+    search_fields = ('order__order_number', 'order__user__email')
+    ordering = ('-archived_at',)
@@ -0,0 +1,46 @@
+"""
+Management command to move old finished orders to the archive
+"""
+from django.core.management.base import BaseCommand
+
+from orders.services.archive import DEFAULT_BATCH_SIZE, archivable_orders, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Archive completed, cancelled and refunded orders that finished long ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            help='Archive orders last changed more than this many days ago (default: ORDER_ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Orders archived per transaction (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after archiving this many orders',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the orders that would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_orders(archive_cutoff(options['older_than_days'])).count()
+            self.stdout.write(f'{count} orders would be archived')
+            return
+
+        archived = archive_orders(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            limit=options['limit']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders'))
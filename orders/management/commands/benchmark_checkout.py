@@ -0,0 +1,128 @@
+"""
+Management command to benchmark checkout (cart -> order) latency
+"""
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from artists.models import Artist
+from catalog.models import Artwork, Cart, CartItem, Category
+from orders.services.checkout import create_order_from_cart
+from shipping.models import ShippingMethod
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark order creation from carts of different sizes (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 10, 100],
+            help='Cart sizes to benchmark (default: 1 10 100)',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=10,
+            help='Checkouts per cart size (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🛒 Benchmarking checkout...\n'))
+
+        with transaction.atomic():
+            user, artworks, shipping_method = self.create_fixtures(max(options['sizes']))
+
+            self.stdout.write(f"{'items':>6} {'queries':>8} {'mean ms':>9} {'p50 ms':>8} {'max ms':>8}")
+            for size in options['sizes']:
+                timings = []
+                queries = 0
+                for _ in range(options['runs']):
+                    self.fill_cart(user, artworks[:size])
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.perf_counter()
+                        create_order_from_cart(
+                            user,
+                            shipping_method=shipping_method,
+                            shipping_address={'country': 'TZ'},
+                            billing_address={'country': 'TZ'}
+                        )
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries = len(context.captured_queries)
+
+                self.stdout.write(
+                    f"{size:>6} {queries:>8} {statistics.mean(timings):>9.2f} "
+                    f"{statistics.median(timings):>8.2f} {max(timings):>8.2f}"
+                )
+
+            # Leave the database untouched
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Benchmark complete (benchmark data rolled back)'))
+
+    def create_fixtures(self, count):
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            email=f'benchmark-{suffix}@example.com',
+            username=f'benchmark-{suffix}',
+            password=None,
+            first_name='Benchmark',
+            last_name='Buyer'
+        )
+        artist_user = User.objects.create_user(
+            email=f'benchmark-artist-{suffix}@example.com',
+            username=f'benchmark-artist-{suffix}',
+            password=None,
+            first_name='Benchmark',
+            last_name='Artist'
+        )
+        artist = Artist.objects.create(user=artist_user, display_name=f'Benchmark Artist {suffix}')
+        category = Category.objects.create(name=f'Benchmark {suffix}', slug=f'benchmark-{suffix}')
+        artworks = Artwork.objects.bulk_create([
+            Artwork(
+                artist=artist,
+                category=category,
+                title=f'Benchmark Artwork {i}',
+                slug=f'benchmark-artwork-{suffix}-{i}',
+                description='Benchmark artwork',
+                material='Wood',
+                dimensions='10 x 10 x 10',
+                weight=Decimal('1.000'),
+                price=Decimal('10000.00') + i,
+                stock_quantity=1000,
+                status=Artwork.ACTIVE,
+            )
+            for i in range(count)
+        ])
+        shipping_method = ShippingMethod.objects.create(
+            name=f'Benchmark Shipping {suffix}',
+            carrier='Benchmark',
+            base_cost=Decimal('5000.00'),
+            cost_per_kg=Decimal('1000.00'),
+            min_delivery_days=1,
+            max_delivery_days=3,
+        )
+        return user, artworks, shipping_method
+
+    def fill_cart(self, user, artworks):
+        cart, _ = Cart.objects.get_or_create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(
+                cart=cart,
+                artwork=artwork,
+                quantity=1,
+                unit_price=artwork.price,
+                snapshot=CartItem.build_snapshot(artwork)
+            )
+            for artwork in artworks
+        ])
@@ -0,0 +1,81 @@
+"""
+Management command to export orders as CSV or JSON Lines
+"""
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Order
+from orders.services.export import CSV, DEFAULT_CHUNK_SIZE, FORMATS, ITEMS, ORDERS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream orders (with payment and shipment) or order items to a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            choices=[ORDERS, ITEMS],
+            default=ORDERS,
+            help='One row per order or per order item (default: orders)',
+        )
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=list(FORMATS),
+            default=CSV,
+            help='Output format (default: csv)',
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='First order date to include (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Last order date to include (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=[choice for choice, _ in Order.STATUS_CHOICES],
+            help='Only include orders with this status (repeatable)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows read per query (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--output',
+            '-o',
+            help='File to write (default: stdout)',
+        )
+
+    def handle(self, *args, **options):
+        if options['date_from'] and options['date_to'] and options['date_from'] > options['date_to']:
+            raise CommandError('--from must be on or before --to')
+
+        chunks = stream_export(
+            options['dataset'],
+            options['file_format'],
+            chunk_size=options['chunk_size'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            statuses=options['status']
+        )
+
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}"))
@@ -0,0 +1,14 @@
+"""
+Management command to delete expired idempotency records
+"""
+from django.core.management.base import BaseCommand
+
+from orders.services.idempotency import prune_idempotency_records
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL_HOURS'
+
+    def handle(self, *args, **options):
+        deleted = prune_idempotency_records()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency records'))
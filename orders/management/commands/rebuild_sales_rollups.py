@@ -0,0 +1,41 @@
+"""
+Management command to rebuild the daily sales rollups
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.services.sales import first_order_date, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily sales rollups from order items (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='First day to rebuild (default: date of the first order)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Last day to rebuild (default: today)',
+        )
+
+    def handle(self, *args, **options):
+        date_from = options['date_from'] or first_order_date()
+        date_to = options['date_to'] or timezone.localdate()
+
+        if date_from is None:
+            self.stdout.write(self.style.WARNING('No orders to roll up'))
+            return
+        if date_from > date_to:
+            raise CommandError('--from must be on or before --to')
+
+        self.stdout.write(f'Rebuilding sales rollups from {date_from} to {date_to}...')
+        written = rebuild_rollups(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows'))
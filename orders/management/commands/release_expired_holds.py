@@ -0,0 +1,36 @@
+"""
+Management command to release expired stock holds
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.services.inventory import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Release stock held by unpaid orders once their hold has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Holds released per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and sweep every SECONDS seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock holds'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
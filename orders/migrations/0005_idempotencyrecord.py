@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_stockreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, verbose_name='scope')),
+                ('key', models.CharField(max_length=255, verbose_name='idempotency key')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='request fingerprint')),
+                ('status', models.CharField(choices=[('in_progress', 'In Progress'), ('completed', 'Completed')], default='in_progress', max_length=15, verbose_name='status')),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='response status')),
+                ('response_body', models.JSONField(blank=True, null=True, verbose_name='response body')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Idempotency Record',
+                'verbose_name_plural': 'Idempotency Records',
+                'db_table': 'idempotency_records',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='idempotency_created_3fb3ea_idx')],
+                'unique_together': {('user', 'scope', 'key')},
+            },
+        ),
+    ]
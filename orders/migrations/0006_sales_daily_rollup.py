@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('catalog', '0003_artwork_reserved_quantity'),
+        ('orders', '0005_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='sales_recorded_at',
+            field=models.DateTimeField(blank=True, help_text='When this order was added to the sales rollups', null=True, verbose_name='sales recorded at'),
+        ),
+        migrations.CreateModel(
+            name='SalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('currency', models.CharField(max_length=3, verbose_name='currency')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='orders count')),
+                ('items_sold', models.PositiveIntegerField(default=0, verbose_name='items sold')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='artists.artist')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='catalog.category')),
+            ],
+            options={
+                'verbose_name': 'Sales Daily Rollup',
+                'verbose_name_plural': 'Sales Daily Rollups',
+                'db_table': 'sales_daily_rollups',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['artist', 'date'], name='sales_daily_artist__54e025_idx'), models.Index(fields=['category', 'date'], name='sales_daily_categor_31df5a_idx')],
+                'unique_together': {('date', 'artist', 'category', 'currency')},
+            },
+        ),
+    ]
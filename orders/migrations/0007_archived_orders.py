@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_sales_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='orders.order')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='items count')),
+                ('payment_status', models.CharField(blank=True, max_length=20, null=True, verbose_name='payment status')),
+                ('shipment_status', models.CharField(blank=True, max_length=20, null=True, verbose_name='shipment status')),
+                ('document', models.JSONField(verbose_name='document')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='archived at')),
+            ],
+            options={
+                'verbose_name': 'Archived Order',
+                'verbose_name_plural': 'Archived Orders',
+                'db_table': 'archived_orders',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='When the order details were moved to the archive', null=True, verbose_name='archived at'),
+        ),
+    ]
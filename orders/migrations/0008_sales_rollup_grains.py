@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('catalog', '0004_artwork_rating_aggregates'),
+        ('orders', '0007_archived_orders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salesdailyrollup',
+            name='artist',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='artists.artist'),
+        ),
+        migrations.AlterField(
+            model_name='salesdailyrollup',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='catalog.category'),
+        ),
+    ]
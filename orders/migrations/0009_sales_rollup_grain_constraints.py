@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('catalog', '0004_artwork_rating_aggregates'),
+        ('orders', '0008_sales_rollup_grains'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='salesdailyrollup',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'artist', 'category', 'currency'), name='sales_rollup_artist_category_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('date', 'artist', 'currency'), name='sales_rollup_artist_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('artist__isnull', True)), fields=('date', 'category', 'currency'), name='sales_rollup_category_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('artist__isnull', True), ('category__isnull', True)), fields=('date', 'currency'), name='sales_rollup_day_unique'),
+        ),
+    ]
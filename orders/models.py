@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 import uuid
@@ -6,6 +7,32 @@ import uuid
 User = get_user_model()
 
 
+class OrderQuerySet(models.QuerySet):
+    """Query plans for the order endpoints"""
+    
+    def for_list(self):
+        """Annotate the summary columns shown in order lists"""
+        # Archived orders no longer have payment or shipment rows; their
+        # statuses are kept on the archive record
+        return self.annotate(
+            items_count=models.Count('items'),
+            payment_status=Coalesce(models.F('payment__status'), models.F('archive__payment_status')),
+            shipment_status=Coalesce(models.F('shipment__status'), models.F('archive__shipment_status')),
+        )
+    
+    def for_detail(self):
+        """Load an order with everything ``OrderSerializer`` renders in a fixed number of queries"""
+        items = OrderItem.objects.select_related(
+            'artwork__artist', 'artwork__category'
+        ).prefetch_related('artwork__media')
+        history = OrderStatusHistory.objects.order_by('changed_at')
+        
+        return self.select_related('shipping_method', 'payment', 'shipment').prefetch_related(
+            models.Prefetch('items', queryset=items),
+            models.Prefetch('status_history', queryset=history),
+        )
+
+
 class Order(models.Model):
     """Order model"""
     
@@ -69,6 +96,20 @@ class Order(models.Model):
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     shipped_at = models.DateTimeField(_('shipped at'), null=True, blank=True)
     delivered_at = models.DateTimeField(_('delivered at'), null=True, blank=True)
+    sales_recorded_at = models.DateTimeField(
+        _('sales recorded at'),
+        null=True,
+        blank=True,
+        help_text=_('When this order was added to the sales rollups')
+    )
+    archived_at = models.DateTimeField(
+        _('archived at'),
+        null=True,
+        blank=True,
+        help_text=_('When the order details were moved to the archive')
+    )
+    
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         db_table = 'orders'
@@ -85,19 +126,8 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Generate order number (e.g., SC2024001234)
-            from django.utils import timezone
-            year = timezone.now().year
-            last_order = Order.objects.filter(
-                order_number__startswith=f'SC{year}'
-            ).order_by('order_number').last()
-            
-            if last_order:
-                last_num = int(last_order.order_number[-6:])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
-            self.order_number = f'SC{year}{new_num:06d}'
+            from .services.order_numbers import next_order_number
+            self.order_number = next_order_number()
         
         super().save(*args, **kwargs)
     
@@ -117,6 +147,23 @@ class Order(models.Model):
         return self.status in [self.CONFIRMED, self.PROCESSING, self.SHIPPED] and self.is_paid
 
 
+class OrderNumberSequence(models.Model):
+    """Per-year counter used to allocate order numbers"""
+    
+    year = models.PositiveIntegerField(_('year'), unique=True)
+    last_value = models.PositiveBigIntegerField(_('last value'), default=0)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        db_table = 'order_number_sequences'
+        verbose_name = _('Order Number Sequence')
+        verbose_name_plural = _('Order Number Sequences')
+        ordering = ['-year']
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+
 class OrderItem(models.Model):
     """Order item model"""
     
@@ -152,6 +199,42 @@ class OrderItem(models.Model):
         return self.total_price * self.tax_rate
 
 
+class StockReservation(models.Model):
+    """Short-lived hold on artwork stock taken at checkout"""
+    
+    HELD = 'held'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+    
+    STATUS_CHOICES = [
+        (HELD, _('Held')),
+        (COMMITTED, _('Committed')),
+        (RELEASED, _('Released')),
+    ]
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_reservations')
+    artwork = models.ForeignKey('catalog.Artwork', on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField(_('quantity'))
+    status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField(_('expires at'))
+    
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        verbose_name = _('Stock Reservation')
+        verbose_name_plural = _('Stock Reservations')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['order', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.artwork.title} x {self.quantity} ({self.get_status_display()}) for Order {self.order.order_number}"
+
+
 class OrderStatusHistory(models.Model):
     """Track order status changes"""
     
@@ -178,6 +261,128 @@ class OrderStatusHistory(models.Model):
         return f"Order {self.order.order_number}: {self.old_status} → {self.new_status}"
 
 
+class SalesDailyRollup(models.Model):
+    """
+    Daily sales per currency for reporting, by artist x category, by artist
+    (no category), by category (no artist) and for the whole day (neither)
+    """
+    
+    date = models.DateField(_('date'))
+    artist = models.ForeignKey(
+        'artists.Artist', on_delete=models.CASCADE, null=True, blank=True, related_name='sales_rollups'
+    )
+    category = models.ForeignKey(
+        'catalog.Category', on_delete=models.CASCADE, null=True, blank=True, related_name='sales_rollups'
+    )
+    currency = models.CharField(_('currency'), max_length=3)
+    
+    orders_count = models.PositiveIntegerField(_('orders count'), default=0)
+    items_sold = models.PositiveIntegerField(_('items sold'), default=0)
+    revenue = models.DecimalField(_('revenue'), max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        db_table = 'sales_daily_rollups'
+        verbose_name = _('Sales Daily Rollup')
+        verbose_name_plural = _('Sales Daily Rollups')
+        ordering = ['-date']
+        # NULLs are distinct in unique indexes, so each grain gets its own
+        # partial constraint over the columns it actually sets
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'artist', 'category', 'currency'],
+                name='sales_rollup_artist_category_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'artist', 'currency'],
+                condition=models.Q(category__isnull=True),
+                name='sales_rollup_artist_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'category', 'currency'],
+                condition=models.Q(artist__isnull=True),
+                name='sales_rollup_category_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'currency'],
+                condition=models.Q(artist__isnull=True, category__isnull=True),
+                name='sales_rollup_day_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['artist', 'date']),
+            models.Index(fields=['category', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.artist_id}/{self.category_id}: {self.revenue} {self.currency}"
+
+
+class ArchivedOrder(models.Model):
+    """Details of an archived order, kept out of the hot order tables"""
+    
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    
+    # Summary shown in order lists
+    items_count = models.PositiveIntegerField(_('items count'), default=0)
+    payment_status = models.CharField(_('payment status'), max_length=20, null=True, blank=True)
+    shipment_status = models.CharField(_('shipment status'), max_length=20, null=True, blank=True)
+    
+    # The order as rendered by the API at archive time, plus its payment
+    # webhooks, payment refunds and shipment events
+    document = models.JSONField(_('document'))
+    
+    archived_at = models.DateTimeField(_('archived at'), auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_orders'
+        verbose_name = _('Archived Order')
+        verbose_name_plural = _('Archived Orders')
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return f"Archived order {self.order_id}"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored result of a request made with an Idempotency-Key header"""
+    
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    
+    STATUS_CHOICES = [
+        (IN_PROGRESS, _('In Progress')),
+        (COMPLETED, _('Completed')),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_records')
+    scope = models.CharField(_('scope'), max_length=50)
+    key = models.CharField(_('idempotency key'), max_length=255)
+    fingerprint = models.CharField(_('request fingerprint'), max_length=64)
+    status = models.CharField(_('status'), max_length=15, choices=STATUS_CHOICES, default=IN_PROGRESS)
+    
+    # Stored response, replayed for retries
+    response_status = models.PositiveSmallIntegerField(_('response status'), null=True, blank=True)
+    response_body = models.JSONField(_('response body'), null=True, blank=True)
+    
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        db_table = 'idempotency_records'
+        verbose_name = _('Idempotency Record')
+        verbose_name_plural = _('Idempotency Records')
+        ordering = ['-created_at']
+        unique_together = ['user', 'scope', 'key']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.get_status_display()})"
+
+
 class Refund(models.Model):
     """Refund model"""
     
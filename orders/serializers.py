@@ -1,10 +1,19 @@
 from rest_framework import serializers
 from .models import Order, OrderItem, OrderStatusHistory
-from catalog.serializers import ArtworkListSerializer
+from catalog.serializers import ArtworkListSerializer, remember_artwork_likes
 from shipping.serializers import ShippingMethodSerializer, ShipmentSerializer
 from payments.serializers import PaymentSerializer
 
 
+class OrderItemListSerializer(serializers.ListSerializer):
+    """Resolves ``is_liked`` for every item's artwork with a single query"""
+    
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        remember_artwork_likes(self.context, [item.artwork_id for item in items])
+        return super().to_representation(items)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     artwork = ArtworkListSerializer(read_only=True)
     
@@ -15,6 +24,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'tax_rate', 'tax_amount', 'snapshot'
         ]
         read_only_fields = ['id', 'total_price', 'tax_amount']
+        list_serializer_class = OrderItemListSerializer
 
 
 class OrderCreateSerializer(serializers.Serializer):
@@ -58,7 +68,11 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
     
     def get_status_history(self, obj):
-        history = OrderStatusHistory.objects.filter(order=obj).order_by('changed_at')
+        if 'status_history' in getattr(obj, '_prefetched_objects_cache', {}):
+            # Prefetched in changed_at order by Order.objects.for_detail()
+            history = obj.status_history.all()
+        else:
+            history = obj.status_history.order_by('changed_at')
         return [
             {
                 'old_status': h.old_status,
@@ -96,9 +110,11 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
 class OrderListSerializer(serializers.ModelSerializer):
-    items_count = serializers.SerializerMethodField()
-    payment_status = serializers.SerializerMethodField()
-    shipment_status = serializers.SerializerMethodField()
+    """Lightweight order summary; expects a queryset from ``Order.objects.for_list()``"""
+    
+    items_count = serializers.IntegerField(read_only=True)
+    payment_status = serializers.CharField(read_only=True, allow_null=True)
+    shipment_status = serializers.CharField(read_only=True, allow_null=True)
     
     class Meta:
         model = Order
@@ -107,19 +123,67 @@ class OrderListSerializer(serializers.ModelSerializer):
             'items_count', 'created_at', 'delivered_at', 'payment_status',
             'shipment_status'
         ]
+
+
+class OrderExportQuerySerializer(serializers.Serializer):
+    dataset = serializers.ChoiceField(choices=['orders', 'items'], default='orders')
+    file_format = serializers.ChoiceField(choices=['csv', 'jsonl'], default='csv')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.CharField(required=False, help_text='Comma-separated order statuses')
     
-    def get_items_count(self, obj):
-        return obj.items.count()
+    def validate_status(self, value):
+        statuses = [status.strip() for status in value.split(',') if status.strip()]
+        valid = {choice for choice, _ in Order.STATUS_CHOICES}
+        invalid = [status for status in statuses if status not in valid]
+        if invalid:
+            raise serializers.ValidationError(f"Invalid status: {', '.join(invalid)}")
+        return statuses
     
-    def get_payment_status(self, obj):
-        if hasattr(obj, 'payment'):
-            return obj.payment.status
-        return None
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from must be on or before date_to")
+        return attrs
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=['day', 'artist', 'category'], default='day')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    currency = serializers.CharField(max_length=3, required=False)
+    artist_id = serializers.IntegerField(required=False)
+    category_id = serializers.IntegerField(required=False)
     
-    def get_shipment_status(self, obj):
-        if hasattr(obj, 'shipment'):
-            return obj.shipment.status
-        return None
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from must be on or before date_to")
+        return attrs
+
+
+class SalesReportRowSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    artist_id = serializers.IntegerField(required=False)
+    artist_name = serializers.CharField(required=False)
+    category_id = serializers.IntegerField(required=False)
+    category_name = serializers.CharField(required=False)
+    currency = serializers.CharField()
+    total_orders = serializers.IntegerField()
+    total_items_sold = serializers.IntegerField()
+    total_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class OrderBulkTransitionSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class OrderBulkTransitionResultSerializer(serializers.Serializer):
+    updated_count = serializers.IntegerField()
+    updated = serializers.ListField(child=serializers.UUIDField())
+    skipped = serializers.ListField(child=serializers.DictField())
 
 
 class OrderStatusHistorySerializer(serializers.ModelSerializer):
@@ -0,0 +1,124 @@
+"""
+Checkout services
+
+Turns a user's cart into an order with a fixed number of queries regardless of
+cart size: cart items are loaded with their artwork, artist and artist user in
+one query, totals are computed in a single pass and all ``OrderItem`` rows are
+written with one ``bulk_create``. Shipping is quoted for the cart's total
+weight and the destination country from the shared rate index. Stock for the order is held for
+``INVENTORY_HOLD_TTL_MINUTES`` until the payment is confirmed.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+
+from catalog.models import CartItem
+from orders.models import Order, OrderItem, OrderStatusHistory
+from orders.services.inventory import hold_stock
+from orders.services.order_numbers import next_order_number
+from shipping.services.quotes import DOMESTIC_COUNTRY, items_weight, quote_shipping
+
+logger = logging.getLogger(__name__)
+
+
+class EmptyCartError(Exception):
+    """Raised when checking out a cart without items"""
+
+
+class ShippingUnavailableError(Exception):
+    """Raised when the shipping method can't ship the cart to the destination"""
+
+
+def build_item_snapshot(artwork):
+    """Snapshot of artwork data at time of order"""
+    return {
+        'title': artwork.title,
+        'artist': artwork.artist.user.get_full_name() if artwork.artist else 'Unknown',
+        'price': str(artwork.price),
+        'currency': artwork.currency,
+    }
+
+
+def create_order_from_cart(user, shipping_method, shipping_address, billing_address, customer_notes=''):
+    """
+    Create a pending order from the user's cart and empty the cart.
+
+    Raises ``EmptyCartError`` if the cart has no items,
+    ``ShippingUnavailableError`` if the shipping method doesn't cover the
+    destination or the cart's weight and ``InsufficientStockError`` if any artwork is sold out or held by other
+    orders.
+    """
+    cart_items = list(
+        CartItem.objects.filter(cart__user=user).select_related('artwork__artist__user')
+    )
+    if not cart_items:
+        raise EmptyCartError()
+
+    subtotal = Decimal('0.00')
+    order_items = []
+    for cart_item in cart_items:
+        artwork = cart_item.artwork
+        subtotal += artwork.price * cart_item.quantity
+        order_items.append(OrderItem(
+            artwork=artwork,
+            quantity=cart_item.quantity,
+            unit_price=artwork.price,
+            tax_rate=Decimal('0.0000'),  # No tax for now
+            snapshot=build_item_snapshot(artwork),
+        ))
+
+    quote = quote_shipping(
+        shipping_method,
+        country=(shipping_address.get('country') or DOMESTIC_COUNTRY).upper(),
+        weight=items_weight(cart_items),
+        region=shipping_address.get('region', ''),
+    )
+    if quote is None:
+        raise ShippingUnavailableError()
+    shipping_cost = quote.cost
+
+    # For now, no tax or discount
+    tax_amount = Decimal('0.00')
+    discount_amount = Decimal('0.00')
+
+    total_amount = subtotal + shipping_cost + tax_amount - discount_amount
+
+    # Allocate the order number outside the transaction so the per-process
+    # block of numbers can be used
+    order_number = next_order_number()
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            order_number=order_number,
+            user=user,
+            currency='TZS',
+            subtotal=subtotal,
+            shipping_cost=shipping_cost,
+            tax_amount=tax_amount,
+            discount_amount=discount_amount,
+            total_amount=total_amount,
+            shipping_address=shipping_address,
+            billing_address=billing_address,
+            shipping_method=shipping_method,
+            customer_notes=customer_notes,
+            status=Order.PENDING
+        )
+
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+
+        hold_stock(order, {item.artwork_id: item.quantity for item in cart_items})
+
+        OrderStatusHistory.objects.create(
+            order=order,
+            new_status=Order.PENDING,
+            notes='Order created'
+        )
+
+        # Clear the cart
+        CartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
+
+    logger.info(f"Created order {order.order_number} with {len(order_items)} items for user {user.pk}")
+    return order
@@ -0,0 +1,216 @@
+"""
+Order exports for finance
+
+Exports are streamed from ``values_list`` pages read with keyset pagination
+(``WHERE (created_at, id) > last_seen ... LIMIT chunk_size``), so memory stays
+flat no matter how many orders match and no backend has to hold a server-side
+cursor open for the whole export. Two datasets are available:
+
+- ``orders``: one row per order with its payment and shipment
+- ``items``: one row per order item with its order and payment status
+
+Rows are rendered as CSV or JSON Lines. The payment, shipment and addresses
+of archived orders are gone from the hot tables, so those columns are read
+from the ``ArchivedOrder`` document, fetched once per page.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, Order, OrderItem
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = {
+    CSV: 'text/csv',
+    JSONL: 'application/x-ndjson',
+}
+
+ORDERS = 'orders'
+ITEMS = 'items'
+
+# (column name, lookup) per dataset
+COLUMNS = {
+    ORDERS: [
+        ('order_number', 'order_number'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('customer_email', 'user__email'),
+        ('currency', 'currency'),
+        ('subtotal', 'subtotal'),
+        ('shipping_cost', 'shipping_cost'),
+        ('tax_amount', 'tax_amount'),
+        ('discount_amount', 'discount_amount'),
+        ('total_amount', 'total_amount'),
+        ('shipping_method', 'shipping_method__name'),
+        ('shipping_country', 'shipping_address__country'),
+        ('payment_provider', 'payment__provider'),
+        ('payment_method', 'payment__method'),
+        ('payment_status', 'payment__status'),
+        ('payment_reference', 'payment__provider_ref'),
+        ('paid_at', 'payment__processed_at'),
+        ('carrier', 'shipment__carrier'),
+        ('tracking_number', 'shipment__tracking_number'),
+        ('shipment_status', 'shipment__status'),
+        ('shipped_at', 'shipment__shipped_at'),
+        ('delivered_at', 'shipment__delivered_at'),
+    ],
+    ITEMS: [
+        ('order_number', 'order__order_number'),
+        ('order_created_at', 'order__created_at'),
+        ('order_status', 'order__status'),
+        ('artwork_id', 'artwork_id'),
+        ('artwork_title', 'snapshot__title'),
+        ('artist', 'artwork__artist__display_name'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'unit_price'),
+        ('tax_rate', 'tax_rate'),
+        ('currency', 'order__currency'),
+        ('payment_status', 'order__payment__status'),
+    ],
+}
+
+# Columns read from the archive document for archived orders: column name ->
+# path in the document's ``order``
+ARCHIVED_COLUMNS = {
+    ORDERS: {
+        'shipping_country': ['shipping_address', 'country'],
+        'payment_provider': ['payment', 'provider'],
+        'payment_method': ['payment', 'method'],
+        'payment_status': ['payment', 'status'],
+        'payment_reference': ['payment', 'provider_ref'],
+        'paid_at': ['payment', 'processed_at'],
+        'carrier': ['shipment', 'carrier'],
+        'tracking_number': ['shipment', 'tracking_number'],
+        'shipment_status': ['shipment', 'status'],
+        'shipped_at': ['shipment', 'shipped_at'],
+        'delivered_at': ['shipment', 'delivered_at'],
+    },
+    ITEMS: {
+        'payment_status': ['payment', 'status'],
+    },
+}
+
+# (archived_at, order id) lookups per dataset
+ARCHIVE_LOOKUPS = {
+    ORDERS: ['archived_at', 'id'],
+    ITEMS: ['order__archived_at', 'order_id'],
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(dataset, date_from=None, date_to=None, statuses=None):
+    """
+    Queryset for a dataset, filtered on the order's ``created_at`` (inclusive
+    date range) and ``status`` indexes and ordered for keyset pagination.
+    """
+    if dataset == ORDERS:
+        queryset, prefix, ordering = Order.objects.all(), '', ['created_at', 'id']
+    else:
+        queryset, prefix, ordering = OrderItem.objects.all(), 'order__', ['id']
+
+    filters = {}
+    if date_from:
+        filters[f'{prefix}created_at__gte'] = _day_start(date_from)
+    if date_to:
+        # Half-open range so the created_at index can be used
+        filters[f'{prefix}created_at__lt'] = _day_start(date_to + timedelta(days=1))
+    if statuses:
+        filters[f'{prefix}status__in'] = statuses
+
+    return queryset.filter(**filters).order_by(*ordering)
+
+
+def _from_archive(dataset, row, document):
+    """Replace the columns of an archived order's row with the values in its archive document"""
+    row = list(row)
+    for position, (name, _) in enumerate(COLUMNS[dataset]):
+        path = ARCHIVED_COLUMNS[dataset].get(name)
+        if path:
+            value = document
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            row[position] = value
+    return tuple(row)
+
+
+def iter_rows(dataset, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Yield export rows as tuples, reading ``chunk_size`` rows per query"""
+    queryset = export_queryset(dataset, **filters)
+    keys = ['created_at', 'id'] if dataset == ORDERS else ['id']
+    hidden = keys + ARCHIVE_LOOKUPS[dataset]
+    lookups = hidden + [lookup for _, lookup in COLUMNS[dataset]]
+    archived_at, order_id = len(keys), len(keys) + 1
+    last = None
+
+    while True:
+        page = queryset
+        if last is not None:
+            if dataset == ORDERS:
+                page = page.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+            else:
+                page = page.filter(id__gt=last[0])
+        rows = list(page.values_list(*lookups)[:chunk_size])
+
+        archived = {row[order_id] for row in rows if row[archived_at] is not None}
+        documents = dict(
+            ArchivedOrder.objects.filter(order_id__in=archived).values_list('order_id', 'document__order')
+        ) if archived else {}
+
+        for row in rows:
+            if row[order_id] in documents:
+                yield _from_archive(dataset, row[len(hidden):], documents[row[order_id]])
+            else:
+                yield row[len(hidden):]
+        if len(rows) < chunk_size:
+            break
+        last = rows[-1][:len(keys)]
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class _Echo:
+    """File-like object that hands back what is written, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def stream_export(dataset, file_format, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Yield the export as text chunks (header first) for ``StreamingHttpResponse`` or a file"""
+    columns = [name for name, _ in COLUMNS[dataset]]
+    rows = iter_rows(dataset, chunk_size=chunk_size, **filters)
+
+    writer = csv.writer(_Echo())
+
+    def render(row):
+        if file_format == CSV:
+            return writer.writerow([_format_value(value) for value in row])
+        return json.dumps(dict(zip(columns, row)), default=_format_value, ensure_ascii=False) + '\n'
+
+    if file_format == CSV:
+        yield writer.writerow(columns)
+
+    buffer = []
+    for row in rows:
+        buffer.append(render(row))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,191 @@
+"""
+Idempotency-Key support for write endpoints
+
+Clients on flaky networks retry checkout and payment requests. When a request
+carries an ``Idempotency-Key`` header, the first execution stores the request
+fingerprint and its response in ``IdempotencyRecord``; retries with the same key
+get the stored response back without running the view again. A retry that
+arrives while the first request is still running waits for it to finish.
+
+Keys are scoped per user and per endpoint and kept for
+``IDEMPOTENCY_KEY_TTL_HOURS``.
+"""
+import functools
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from orders.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1  # seconds
+
+
+def request_fingerprint(request):
+    """Hash of the parts of the request that must match for a replay"""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    raw = f"{request.method}:{request.path}:{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _claim(user, scope, key, fingerprint):
+    """
+    Create the record for a new key, or return the existing one.
+
+    Returns ``(record, created)``. Expired records and records left
+    in progress by a request that died are taken over.
+    """
+    now = timezone.now()
+    lock_timeout = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    user=user, scope=scope, key=key, fingerprint=fingerprint
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        try:
+            record = IdempotencyRecord.objects.get(user=user, scope=scope, key=key)
+        except IdempotencyRecord.DoesNotExist:
+            continue  # Deleted in the meantime, try again
+
+        if record.created_at < now - _ttl():
+            IdempotencyRecord.objects.filter(pk=record.pk, updated_at=record.updated_at).delete()
+            continue
+
+        if (
+            record.status == IdempotencyRecord.IN_PROGRESS
+            and record.fingerprint == fingerprint
+            and record.updated_at < now - lock_timeout
+        ):
+            # The first request never finished; take it over
+            taken = IdempotencyRecord.objects.filter(
+                pk=record.pk, status=IdempotencyRecord.IN_PROGRESS, updated_at=record.updated_at
+            ).update(updated_at=now)
+            if taken:
+                return record, True
+            continue
+
+        return record, False
+
+
+def _wait_for(record):
+    """Poll until the first request with this key finishes or the wait times out"""
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            record.refresh_from_db(fields=['status', 'response_status', 'response_body', 'updated_at'])
+        except IdempotencyRecord.DoesNotExist:
+            return None  # First request failed and released the key
+        if record.status == IdempotencyRecord.COMPLETED:
+            return record
+    return record
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Make an ``APIView`` handler idempotent for requests with an ``Idempotency-Key`` header.
+
+    Responses below 500 are stored and replayed; server errors release the key
+    so the client can retry.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or not request.user.is_authenticated:
+                return handler(view, request, *args, **kwargs)
+
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            fingerprint = request_fingerprint(request)
+
+            while True:
+                record, created = _claim(request.user, scope, key, fingerprint)
+                if created:
+                    break
+
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+
+                if record.status == IdempotencyRecord.IN_PROGRESS:
+                    record = _wait_for(record)
+                    if record is None:
+                        continue
+
+                if record.status == IdempotencyRecord.COMPLETED:
+                    return _replay(record)
+
+                response = Response(
+                    {"error": "A request with this Idempotency-Key is still being processed"},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+
+            if response.status_code >= 500 or not hasattr(response, 'data'):
+                record.delete()
+                return response
+
+            record.status = IdempotencyRecord.COMPLETED
+            record.response_status = response.status_code
+            record.response_body = json.loads(JSONRenderer().render(response.data) or b'null')
+            record.save(update_fields=['status', 'response_status', 'response_body', 'updated_at'])
+            return response
+
+        return wrapper
+    return decorator
+
+
+def prune_idempotency_records(batch_size=1000):
+    """Delete records older than the key TTL. Returns the number deleted."""
+    cutoff = timezone.now() - _ttl()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyRecord.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -0,0 +1,233 @@
+"""
+Inventory reservation services
+
+Checkout takes a short-lived hold on the artworks in an order by bumping
+``Artwork.reserved_quantity`` with a conditional ``UPDATE`` (the row is only
+touched while ``stock_quantity - reserved_quantity`` covers the hold), so two
+buyers can never both get the last unit and no explicit row locks are held.
+
+Holds are converted into stock decrements when the payment is confirmed,
+released when the order is cancelled, and released in bulk by the
+``release_expired_holds`` sweeper once ``INVENTORY_HOLD_TTL_MINUTES`` passes.
+Committed stock goes back on the shelf with ``restock_order_stock`` when a
+paid order is cancelled or refunded before it ships. Each step has an
+``*_orders_stock`` variant that handles many orders in the same queries,
+for bulk status changes.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from catalog.models import Artwork
+from orders.models import StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Raised when a hold can't be taken because the stock is already sold or held"""
+
+    def __init__(self, artworks):
+        self.artworks = artworks
+        titles = ', '.join(artwork.title for artwork in artworks)
+        super().__init__(f"Not enough stock for: {titles}")
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(minutes=getattr(settings, 'INVENTORY_HOLD_TTL_MINUTES', 15))
+
+
+def _quantity_case(quantities):
+    """``CASE id WHEN ... THEN quantity`` expression for a {artwork_id: quantity} mapping"""
+    return Case(
+        *[When(id=artwork_id, then=Value(quantity)) for artwork_id, quantity in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def hold_stock(order, quantities):
+    """
+    Reserve stock for ``order`` from a {artwork_id: quantity} mapping.
+
+    All holds are taken with a single conditional ``UPDATE``; if any artwork
+    can't cover its quantity nothing is reserved and ``InsufficientStockError``
+    is raised.
+    """
+    if not quantities:
+        return []
+
+    covered = reduce(or_, [
+        Q(id=artwork_id, stock_quantity__gte=F('reserved_quantity') + quantity)
+        for artwork_id, quantity in quantities.items()
+    ])
+
+    with transaction.atomic():
+        updated = Artwork.objects.filter(covered, status=Artwork.ACTIVE).update(
+            reserved_quantity=F('reserved_quantity') + _quantity_case(quantities)
+        )
+        if updated != len(quantities):
+            # Undo the partial hold before working out which artworks are short
+            transaction.set_rollback(True)
+
+    if updated != len(quantities):
+        unavailable = [
+            artwork for artwork in Artwork.objects.filter(id__in=quantities)
+            if artwork.status != Artwork.ACTIVE or artwork.available_quantity < quantities[artwork.id]
+        ]
+        raise InsufficientStockError(unavailable)
+
+    expires_at = hold_expiry()
+    return StockReservation.objects.bulk_create([
+        StockReservation(order=order, artwork_id=artwork_id, quantity=quantity, expires_at=expires_at)
+        for artwork_id, quantity in quantities.items()
+    ])
+
+
+def _release(reservations):
+    """Release held reservations and give their quantities back in one ``UPDATE``"""
+    quantities = defaultdict(int)
+    for reservation in reservations:
+        quantities[reservation.artwork_id] += reservation.quantity
+    if not quantities:
+        return 0
+
+    StockReservation.objects.filter(id__in=[r.id for r in reservations]).update(
+        status=StockReservation.RELEASED, updated_at=timezone.now()
+    )
+    Artwork.objects.filter(id__in=quantities).update(
+        reserved_quantity=F('reserved_quantity') - _quantity_case(quantities)
+    )
+    return len(reservations)
+
+
+def commit_orders_stock(orders):
+    """
+    Turn the holds of paid orders into stock decrements, with one ``UPDATE``
+    for all of their held items.
+
+    Items whose hold already expired are taken from free stock if it's still
+    there; otherwise the oversell is logged for staff to resolve.
+    """
+    orders = {order.pk: order for order in orders}
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(
+                order_id__in=list(orders)
+            ).exclude(status=StockReservation.COMMITTED)
+        )
+        if not reservations:
+            return 0
+
+        held = defaultdict(int)
+        for reservation in reservations:
+            if reservation.status == StockReservation.HELD:
+                held[reservation.artwork_id] += reservation.quantity
+        if held:
+            quantity = _quantity_case(held)
+            Artwork.objects.filter(id__in=held).update(
+                stock_quantity=F('stock_quantity') - quantity,
+                reserved_quantity=F('reserved_quantity') - quantity
+            )
+
+        for reservation in reservations:
+            if reservation.status != StockReservation.RELEASED:
+                continue
+            taken = Artwork.objects.filter(
+                id=reservation.artwork_id,
+                stock_quantity__gte=F('reserved_quantity') + reservation.quantity
+            ).update(stock_quantity=F('stock_quantity') - reservation.quantity)
+            if not taken:
+                logger.warning(
+                    f"Order {orders[reservation.order_id].order_number} paid after its hold on artwork "
+                    f"{reservation.artwork_id} expired and the stock is gone"
+                )
+
+        StockReservation.objects.filter(id__in=[r.id for r in reservations]).update(
+            status=StockReservation.COMMITTED, updated_at=timezone.now()
+        )
+
+    return len(reservations)
+
+
+def commit_order_stock(order):
+    """Turn an order's holds into stock decrements once payment is confirmed"""
+    return commit_orders_stock([order])
+
+
+def release_orders_stock(orders):
+    """Release all holds of the given orders (e.g. when they're cancelled)"""
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(
+                order_id__in=[order.pk for order in orders], status=StockReservation.HELD
+            )
+        )
+        return _release(reservations)
+
+
+def release_order_stock(order):
+    """Release all of an order's holds (e.g. when it's cancelled)"""
+    return release_orders_stock([order])
+
+
+def restock_orders_stock(orders):
+    """
+    Put the committed stock of the given orders back (e.g. paid orders
+    cancelled or refunded before they ship). The reservations are marked
+    released, so calling this twice restocks once.
+    """
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(
+                order_id__in=[order.pk for order in orders], status=StockReservation.COMMITTED
+            )
+        )
+        quantities = defaultdict(int)
+        for reservation in reservations:
+            quantities[reservation.artwork_id] += reservation.quantity
+        if not quantities:
+            return 0
+
+        StockReservation.objects.filter(id__in=[r.id for r in reservations]).update(
+            status=StockReservation.RELEASED, updated_at=timezone.now()
+        )
+        Artwork.objects.filter(id__in=quantities).update(
+            stock_quantity=F('stock_quantity') + _quantity_case(quantities)
+        )
+    return len(reservations)
+
+
+def restock_order_stock(order):
+    """Put an order's committed stock back"""
+    return restock_orders_stock([order])
+
+
+def release_expired_holds(batch_size=500, now=None):
+    """Release holds past their expiry in batches. Returns the number released."""
+    now = now or timezone.now()
+    released = 0
+
+    while True:
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects.select_for_update(skip_locked=True).filter(
+                    status=StockReservation.HELD, expires_at__lte=now
+                ).order_by('expires_at')[:batch_size]
+            )
+            count = _release(reservations)
+
+        released += count
+        if count < batch_size:
+            break
+
+    if released:
+        logger.info(f"Released {released} expired stock holds")
+    return released
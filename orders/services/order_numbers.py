@@ -0,0 +1,107 @@
+"""
+Order number allocation
+
+Order numbers (``SC{year}{n:06d}``) come from a per-year ``OrderNumberSequence``
+row that is bumped with a single atomic ``UPDATE``. Each process reserves a
+block of numbers at a time and hands them out from memory, so concurrent
+checkouts only touch the counter row once per block instead of scanning the
+orders table on every ``Order.save``.
+
+Numbers are unique but not gap-free: a process that exits with part of a block
+unused simply skips those numbers.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from orders.models import Order, OrderNumberSequence
+
+logger = logging.getLogger(__name__)
+
+ORDER_NUMBER_PREFIX = 'SC'
+
+_lock = threading.Lock()
+_blocks = {}  # year -> [next_value, last_value]
+
+
+def format_order_number(year, value):
+    return f'{ORDER_NUMBER_PREFIX}{year}{value:06d}'
+
+
+def _seed_value(year):
+    """
+    Highest number already issued for ``year`` (used when the counter row is
+    first created).
+
+    ``order_number`` is a string, so ``Max`` would compare it lexically and
+    rank ``SC2026999999`` above ``SC20261000000``. Longer numbers are larger,
+    so look at the longest ones first and parse the numeric suffix, skipping
+    any that don't follow the format.
+    """
+    prefix = f'{ORDER_NUMBER_PREFIX}{year}'
+    numbers = Order.objects.filter(order_number__startswith=prefix).annotate(
+        length=Length('order_number')
+    ).order_by('-length', '-order_number').values_list('order_number', flat=True)
+
+    for number in numbers.iterator():
+        suffix = number[len(prefix):]
+        if suffix.isdigit():
+            return int(suffix)
+    return 0
+
+
+def reserve_block(year, size):
+    """
+    Atomically reserve ``size`` numbers for ``year``.
+
+    Returns the ``(first, last)`` values of the reserved range.
+    """
+    with transaction.atomic():
+        updated = OrderNumberSequence.objects.filter(year=year).update(
+            last_value=F('last_value') + size,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    OrderNumberSequence.objects.create(year=year, last_value=_seed_value(year) + size)
+            except IntegrityError:
+                # Another process created the row first
+                OrderNumberSequence.objects.filter(year=year).update(
+                    last_value=F('last_value') + size,
+                    updated_at=timezone.now()
+                )
+
+        last_value = OrderNumberSequence.objects.filter(year=year).values_list('last_value', flat=True).get()
+
+    return last_value - size + 1, last_value
+
+
+def next_order_number():
+    """Return the next unused order number for the current year"""
+    year = timezone.now().year
+
+    if connection.in_atomic_block:
+        # The reservation would roll back with the caller's transaction while
+        # numbers cached in memory stay handed out, so take a single number
+        # that lives and dies with that transaction.
+        value, _ = reserve_block(year, 1)
+        return format_order_number(year, value)
+
+    with _lock:
+        block = _blocks.get(year)
+        if block is None or block[0] > block[1]:
+            block_size = max(1, getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 20))
+            first, last = reserve_block(year, block_size)
+            block = _blocks[year] = [first, last]
+            logger.debug(f"Reserved order numbers {first}-{last} for {year}")
+
+        value = block[0]
+        block[0] += 1
+
+    return format_order_number(year, value)
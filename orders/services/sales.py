@@ -0,0 +1,244 @@
+"""
+Sales rollups for reporting
+
+``SalesDailyRollup`` keeps order count, items sold and revenue (item
+subtotal, before shipping and tax) per day and currency, by artist x category,
+by artist, by category and for the whole day (see ``GRAINS``).
+Orders are added once, when they are confirmed, and taken out again when
+they are cancelled or refunded, both guarded by a conditional update of
+``Order.sales_recorded_at``; ``rebuild_rollups`` recomputes a date range from
+``order_items`` for backfills and repairs.
+
+Sales are attributed to the local date the order was placed.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from orders.models import Order, OrderItem, SalesDailyRollup
+
+logger = logging.getLogger(__name__)
+
+# Orders counted as sales
+SALES_STATUSES = [
+    Order.CONFIRMED, Order.PROCESSING, Order.SHIPPED, Order.DELIVERED, Order.COMPLETED,
+]
+
+LINE_TOTAL = ExpressionWrapper(
+    F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+# Rollup rows are kept at four grains, like SQL grouping sets: artist x
+# category, per artist (category NULL), per category (artist NULL) and the
+# whole day (both NULL). Each report reads the grain matching its grouping and
+# filters, so an order spanning several artists or categories is counted once.
+GRAINS = [
+    ['artwork__artist_id', 'artwork__category_id'],
+    ['artwork__artist_id'],
+    ['artwork__category_id'],
+    [],
+]
+
+
+def _sales_rows(items):
+    """Group order items into rollup rows at every grain"""
+    for grain in GRAINS:
+        rows = items.values(*grain, 'order__currency').annotate(
+            orders_count=Count('order_id', distinct=True),
+            items_sold=Sum('quantity'),
+            revenue=Sum(LINE_TOTAL),
+        ).order_by()
+        for row in rows:
+            yield {
+                'artist_id': row.get('artwork__artist_id'),
+                'category_id': row.get('artwork__category_id'),
+                'currency': row['order__currency'],
+                'orders_count': row['orders_count'],
+                'items_sold': row['items_sold'],
+                'revenue': row['revenue'],
+            }
+
+
+def _add_to_rollup(day, row):
+    """Increment a rollup row, creating it if needed"""
+    lookup = {
+        'date': day,
+        'artist_id': row['artist_id'],
+        'category_id': row['category_id'],
+        'currency': row['currency'],
+    }
+    increments = {
+        'orders_count': F('orders_count') + row['orders_count'],
+        'items_sold': F('items_sold') + row['items_sold'],
+        'revenue': F('revenue') + row['revenue'],
+        'updated_at': timezone.now(),
+    }
+    if SalesDailyRollup.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            SalesDailyRollup.objects.create(
+                orders_count=row['orders_count'],
+                items_sold=row['items_sold'],
+                revenue=row['revenue'],
+                **lookup
+            )
+    except IntegrityError:
+        # Created concurrently by another order on the same day
+        SalesDailyRollup.objects.filter(**lookup).update(**increments)
+
+
+def _claim_orders(orders, recorded):
+    """
+    Flip ``sales_recorded_at`` on the orders not recorded yet (or, with
+    ``recorded``, on the ones already recorded) and return their ids grouped
+    by local order date
+    """
+    orders = {order.pk: order for order in orders}
+    claimed = list(
+        Order.objects.select_for_update().filter(
+            pk__in=list(orders), sales_recorded_at__isnull=not recorded
+        ).values_list('id', flat=True)
+    )
+    Order.objects.filter(pk__in=claimed, sales_recorded_at__isnull=not recorded).update(
+        sales_recorded_at=None if recorded else timezone.now()
+    )
+
+    days = defaultdict(list)
+    for order_id in claimed:
+        days[timezone.localtime(orders[order_id].created_at).date()].append(order_id)
+    return days
+
+
+def record_orders_sales(orders):
+    """
+    Add confirmed orders to the daily rollups, grouping the items of all
+    orders placed on the same day into one set of rows.
+
+    Safe to call more than once per order: only the first call that flips
+    ``sales_recorded_at`` adds anything. Returns the number of orders added.
+    """
+    with transaction.atomic():
+        days = _claim_orders(orders, recorded=False)
+        for day, order_ids in days.items():
+            for row in _sales_rows(OrderItem.objects.filter(order_id__in=order_ids)):
+                _add_to_rollup(day, row)
+
+    return sum(len(order_ids) for order_ids in days.values())
+
+
+def record_order_sales(order):
+    """Add a confirmed order to the daily rollups, once"""
+    return record_orders_sales([order]) == 1
+
+
+def _remove_from_rollup(day, row):
+    """Decrement a rollup row (never below zero)"""
+    SalesDailyRollup.objects.filter(
+        date=day, artist_id=row['artist_id'], category_id=row['category_id'], currency=row['currency']
+    ).update(
+        orders_count=Greatest(F('orders_count') - row['orders_count'], 0),
+        items_sold=Greatest(F('items_sold') - row['items_sold'], 0),
+        revenue=Greatest(F('revenue') - row['revenue'], 0),
+        updated_at=timezone.now(),
+    )
+
+
+def remove_orders_sales(orders):
+    """
+    Take cancelled or refunded orders out of the daily rollups.
+
+    Only orders whose sales were recorded are removed, and only once: the
+    first call clears ``sales_recorded_at``. Returns the number of orders
+    removed.
+    """
+    with transaction.atomic():
+        days = _claim_orders(orders, recorded=True)
+        for day, order_ids in days.items():
+            for row in _sales_rows(OrderItem.objects.filter(order_id__in=order_ids)):
+                _remove_from_rollup(day, row)
+
+    return sum(len(order_ids) for order_ids in days.values())
+
+
+def remove_order_sales(order):
+    """Take a cancelled or refunded order out of the daily rollups, once"""
+    return remove_orders_sales([order]) == 1
+
+
+def rebuild_rollups(date_from, date_to):
+    """
+    Recompute the rollups for each day in ``[date_from, date_to]`` from the
+    order items, including those of archived orders. Returns the number of
+    rollup rows written.
+    """
+    written = 0
+    day = date_from
+    while day <= date_to:
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = start + timedelta(days=1)
+        orders = Order.objects.filter(created_at__gte=start, created_at__lt=end, status__in=SALES_STATUSES)
+
+        with transaction.atomic():
+            SalesDailyRollup.objects.filter(date=day).delete()
+            Order.objects.filter(created_at__gte=start, created_at__lt=end).exclude(
+                status__in=SALES_STATUSES
+            ).update(sales_recorded_at=None)
+            orders.update(sales_recorded_at=timezone.now())
+
+            rollups = SalesDailyRollup.objects.bulk_create([
+                SalesDailyRollup(date=day, **row)
+                for row in _sales_rows(OrderItem.objects.filter(order__in=orders))
+            ])
+
+        written += len(rollups)
+        day += timedelta(days=1)
+
+    logger.info(f"Rebuilt sales rollups {date_from} - {date_to}: {written} rows")
+    return written
+
+
+def first_order_date():
+    created_at = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    return timezone.localtime(created_at).date() if created_at else None
+
+
+# Report groupings: name -> (rollup fields to group on, extra columns, ordering)
+REPORT_GROUPS = {
+    'day': (['date'], {}, ['date']),
+    'artist': (['artist_id'], {'artist_name': F('artist__display_name')}, ['-total_revenue']),
+    'category': (['category_id'], {'category_name': F('category__name')}, ['-total_revenue']),
+}
+
+
+def sales_report(group_by, date_from=None, date_to=None, currency=None, artist_id=None, category_id=None):
+    """Aggregate the rollups by day, artist or category"""
+    rollups = SalesDailyRollup.objects.all()
+    if date_from:
+        rollups = rollups.filter(date__gte=date_from)
+    if date_to:
+        rollups = rollups.filter(date__lte=date_to)
+    if currency:
+        rollups = rollups.filter(currency=currency)
+    if artist_id:
+        rollups = rollups.filter(artist_id=artist_id)
+    if category_id:
+        rollups = rollups.filter(category_id=category_id)
+
+    # Read the grain with exactly the dimensions grouped or filtered on
+    by_artist = group_by == 'artist' or bool(artist_id)
+    by_category = group_by == 'category' or bool(category_id)
+    rollups = rollups.filter(artist__isnull=not by_artist, category__isnull=not by_category)
+
+    fields, columns, ordering = REPORT_GROUPS[group_by]
+    return rollups.values(*fields, 'currency', **columns).annotate(
+        total_orders=Sum('orders_count'),
+        total_items_sold=Sum('items_sold'),
+        total_revenue=Sum('revenue'),
+    ).order_by(*ordering, 'currency')
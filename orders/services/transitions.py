@@ -0,0 +1,179 @@
+"""
+Order status transitions
+
+All order status changes go through this module so the allowed lifecycle is
+enforced in one place and every change gets an ``OrderStatusHistory`` row:
+
+    pending -> confirmed -> processing -> shipped -> delivered -> completed
+
+with cancellation possible until the order ships and refunds once it is
+paid. ``bulk_transition`` locks the orders, moves every eligible one with a
+single ``UPDATE`` and writes the history with one ``bulk_create``; orders in
+a status that can't move to the target, or unpaid orders asked to be
+confirmed, are skipped and reported.
+
+Side effects of a status are applied here too: confirming an order takes
+its held stock and adds it to the sales rollups; cancelling releases the
+held stock; cancelling or refunding takes the order out of the sales
+rollups and, if it was paid but not shipped yet, puts its committed stock
+back.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order, OrderStatusHistory
+from orders.services.inventory import commit_orders_stock, release_orders_stock, restock_orders_stock
+from orders.services.sales import record_orders_sales, remove_orders_sales
+from payments.models import Payment
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_TRANSITIONS = {
+    Order.PENDING: {Order.CONFIRMED, Order.CANCELLED},
+    Order.CONFIRMED: {Order.PROCESSING, Order.CANCELLED, Order.REFUNDED},
+    Order.PROCESSING: {Order.SHIPPED, Order.CANCELLED, Order.REFUNDED},
+    Order.SHIPPED: {Order.DELIVERED, Order.REFUNDED},
+    Order.DELIVERED: {Order.COMPLETED, Order.REFUNDED},
+    Order.COMPLETED: {Order.REFUNDED},
+    Order.CANCELLED: set(),
+    Order.REFUNDED: set(),
+}
+
+# Timestamp fields set when an order reaches a status
+STATUS_TIMESTAMPS = {
+    Order.SHIPPED: 'shipped_at',
+    Order.DELIVERED: 'delivered_at',
+}
+
+
+class InvalidTransitionError(Exception):
+    """Raised when an order can't move from its current status to the requested one"""
+
+    def __init__(self, order, current_status, new_status):
+        self.order = order
+        self.current_status = current_status
+        self.new_status = new_status
+        super().__init__(f"Order cannot move from '{current_status}' to '{new_status}'")
+
+
+@dataclass
+class TransitionResult:
+    updated: list = field(default_factory=list)
+    # order id -> current status (None if the order doesn't exist)
+    skipped: dict = field(default_factory=dict)
+
+
+def sources_for(new_status):
+    """Statuses an order may be in to move to ``new_status``"""
+    return [old for old, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+
+# Statuses in which an order's stock is committed but still on hand
+UNSHIPPED_PAID_STATUSES = {Order.CONFIRMED, Order.PROCESSING}
+
+
+def _apply_side_effects(old_statuses, new_status):
+    """
+    Apply the side effects of ``new_status`` to orders given as
+    {order_id: old_status}, with the same queries however many orders moved
+    """
+    if new_status not in (Order.CONFIRMED, Order.CANCELLED, Order.REFUNDED):
+        return
+    orders = list(Order.objects.filter(pk__in=list(old_statuses)))
+    if new_status == Order.CONFIRMED:
+        commit_orders_stock(orders)
+        record_orders_sales(orders)
+        return
+
+    release_orders_stock(orders)
+    restock_orders_stock([order for order in orders if old_statuses[order.pk] in UNSHIPPED_PAID_STATUSES])
+    remove_orders_sales(orders)
+
+
+def bulk_transition(order_ids, new_status, changed_by=None, notes=''):
+    """
+    Move the given orders to ``new_status``.
+
+    Orders whose current status allows the move are updated together; the
+    rest are left alone and returned in ``TransitionResult.skipped``. Only
+    orders with a completed payment can be confirmed.
+    """
+    if new_status not in ALLOWED_TRANSITIONS:
+        raise ValueError(f"Unknown order status '{new_status}'")
+
+    order_ids = list(dict.fromkeys(order_ids))
+    sources = sources_for(new_status)
+    result = TransitionResult()
+
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update().filter(pk__in=order_ids).values_list('id', 'status')
+        )
+        moving = {order_id: old for order_id, old in current.items() if old in sources}
+        if new_status == Order.CONFIRMED and moving:
+            # Confirming commits stock and records a sale, so only paid orders qualify
+            paid = set(Order.objects.filter(
+                pk__in=list(moving), payment__status=Payment.COMPLETED
+            ).values_list('id', flat=True))
+            moving = {order_id: old for order_id, old in moving.items() if order_id in paid}
+        for order_id in order_ids:
+            if order_id not in moving:
+                result.skipped[order_id] = current.get(order_id)
+
+        if not moving:
+            return result
+
+        now = timezone.now()
+        updates = {'status': new_status, 'updated_at': now}
+        if new_status in STATUS_TIMESTAMPS:
+            updates[STATUS_TIMESTAMPS[new_status]] = now
+        Order.objects.filter(pk__in=list(moving), status__in=sources).update(**updates)
+
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(
+                order_id=order_id,
+                old_status=old_status,
+                new_status=new_status,
+                notes=notes,
+                changed_by=changed_by,
+            )
+            for order_id, old_status in moving.items()
+        ])
+
+        _apply_side_effects(moving, new_status)
+
+    result.updated = list(moving)
+    logger.info(f"Moved {len(result.updated)} orders to {new_status} ({len(result.skipped)} skipped)")
+    return result
+
+
+def transition_order(order, new_status, changed_by=None, notes=''):
+    """
+    Move a single order to ``new_status`` and update the instance.
+
+    Raises ``InvalidTransitionError`` if the order's current status (read
+    under lock) doesn't allow it.
+    """
+    result = bulk_transition([order.pk], new_status, changed_by=changed_by, notes=notes)
+    if order.pk in result.skipped:
+        raise InvalidTransitionError(order, result.skipped[order.pk], new_status)
+
+    order.refresh_from_db(fields=['status', 'updated_at', *STATUS_TIMESTAMPS.values(), 'sales_recorded_at'])
+    return order
+
+
+def confirm_paid_order(order, notes='Payment completed'):
+    """
+    Confirm an order once its payment completes.
+
+    Payment notifications can arrive more than once or after the order was
+    cancelled, so an order that can't be confirmed is logged and left alone.
+    """
+    try:
+        return transition_order(order, Order.CONFIRMED, notes=notes)
+    except InvalidTransitionError as e:
+        logger.warning(f"Not confirming order {order.pk} after payment: {e}")
+        return None
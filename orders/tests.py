@@ -1,3 +1,870 @@
-from django.test import TestCase
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from artists.models import Artist
+from catalog.models import Artwork, Cart, CartItem, Category
+from payments.models import Payment
+from reviews.models import Review
+from shipping.models import ShippingMethod
+from .models import (
+    IdempotencyRecord, Order, OrderItem, OrderNumberSequence, OrderStatusHistory, SalesDailyRollup,
+    StockReservation
+)
+from .services import order_numbers
+from .services.archive import archive_orders
+from .services.export import COLUMNS, ITEMS, JSONL, ORDERS, iter_rows
+from .services.sales import rebuild_rollups, record_order_sales, sales_report
+from .services.checkout import EmptyCartError, create_order_from_cart
+from .services.inventory import (
+    InsufficientStockError, commit_order_stock, release_expired_holds, release_order_stock
+)
+from .services.transitions import InvalidTransitionError, bulk_transition, transition_order
+
+User = get_user_model()
+
+
+class CreateOrderFromCartTests(TestCase):
+    """Order creation from the cart"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com', username='buyer', password=None,
+            first_name='Buyer', last_name='One'
+        )
+        artist_user = User.objects.create_user(
+            email='artist@example.com', username='artist', password=None,
+            first_name='Asha', last_name='Msanii'
+        )
+        artist = Artist.objects.create(user=artist_user, display_name='Asha')
+        category = Category.objects.create(name='Masks', slug='masks')
+        cls.artworks = Artwork.objects.bulk_create([
+            Artwork(
+                artist=artist, category=category, title=f'Mask {i}', slug=f'mask-{i}',
+                description='Mask', material='Wood', dimensions='10 x 10 x 10',
+                price=Decimal('1000.00') * (i + 1), stock_quantity=10, status=Artwork.ACTIVE
+            )
+            for i in range(20)
+        ])
+        cls.shipping_method = ShippingMethod.objects.create(
+            name='Standard', carrier='DHL', base_cost=Decimal('5000.00'),
+            cost_per_kg=Decimal('2000.00'), min_delivery_days=3, max_delivery_days=7
+        )
+        cls.cart = Cart.objects.create(user=cls.user)
+
+    def fill_cart(self, count):
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, artwork=artwork, quantity=2, unit_price=artwork.price)
+            for artwork in self.artworks[:count]
+        ])
+
+    def checkout(self):
+        return create_order_from_cart(
+            self.user,
+            shipping_method=self.shipping_method,
+            shipping_address={'country': 'TZ'},
+            billing_address={'country': 'TZ'}
+        )
+
+    def count_checkout_queries(self, cart_size):
+        self.fill_cart(cart_size)
+        with CaptureQueriesContext(connection) as context:
+            self.checkout()
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        # First checkout of the year also creates the order number sequence row
+        self.count_checkout_queries(1)
+        self.assertEqual(self.count_checkout_queries(1), self.count_checkout_queries(20))
+
+    def test_creates_order_items_and_clears_cart(self):
+        self.fill_cart(3)
+        order = self.checkout()
+
+        self.assertEqual(order.status, Order.PENDING)
+        self.assertEqual(order.subtotal, Decimal('12000.00'))
+        self.assertEqual(order.total_amount, order.subtotal + order.shipping_cost)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 3)
+        self.assertEqual(order.items.first().snapshot['artist'], 'Asha Msanii')
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        self.assertEqual(order.status_history.count(), 1)
+
+    def test_empty_cart(self):
+        with self.assertRaises(EmptyCartError):
+            self.checkout()
+
+
+def create_catalog(stock):
+    artist_user = User.objects.create_user(
+        email='maker@example.com', username='maker', password=None,
+        first_name='Juma', last_name='Fundi'
+    )
+    artist = Artist.objects.create(user=artist_user, display_name='Juma')
+    category = Category.objects.create(name='Carvings', slug='carvings')
+    artwork = Artwork.objects.create(
+        artist=artist, category=category, title='Makonde Carving', slug='makonde-carving',
+        description='Carving', material='Ebony', dimensions='30 x 10 x 10',
+        price=Decimal('50000.00'), stock_quantity=stock, status=Artwork.ACTIVE
+    )
+    shipping_method = ShippingMethod.objects.create(
+        name='Standard', carrier='DHL', base_cost=Decimal('5000.00'),
+        cost_per_kg=Decimal('2000.00'), min_delivery_days=3, max_delivery_days=7
+    )
+    return artwork, shipping_method
+
+
+def create_buyer(index, artwork, quantity=1):
+    user = User.objects.create_user(
+        email=f'buyer{index}@example.com', username=f'buyer{index}', password=None
+    )
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.create(cart=cart, artwork=artwork, quantity=quantity, unit_price=artwork.price)
+    return user
+
+
+class StockReservationTests(TestCase):
+    """Stock holds taken at checkout"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=3)
+
+    def checkout(self, user):
+        return create_order_from_cart(
+            user,
+            shipping_method=self.shipping_method,
+            shipping_address={'country': 'TZ'},
+            billing_address={'country': 'TZ'}
+        )
+
+    def test_hold_reserves_without_decrementing_stock(self):
+        order = self.checkout(create_buyer(1, self.artwork, quantity=2))
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.stock_quantity, 3)
+        self.assertEqual(self.artwork.reserved_quantity, 2)
+        self.assertEqual(self.artwork.available_quantity, 1)
+        self.assertEqual(order.stock_reservations.get().status, StockReservation.HELD)
+
+    def test_insufficient_stock_rolls_back_checkout(self):
+        self.checkout(create_buyer(1, self.artwork, quantity=2))
+        buyer = create_buyer(2, self.artwork, quantity=2)
+
+        with self.assertRaises(InsufficientStockError) as raised:
+            self.checkout(buyer)
+
+        self.assertEqual(raised.exception.artworks, [self.artwork])
+        self.assertEqual(Order.objects.filter(user=buyer).count(), 0)
+        self.assertTrue(CartItem.objects.filter(cart__user=buyer).exists())
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.reserved_quantity, 2)
+
+    def test_commit_decrements_stock(self):
+        order = self.checkout(create_buyer(1, self.artwork, quantity=2))
+        commit_order_stock(order)
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.stock_quantity, 1)
+        self.assertEqual(self.artwork.reserved_quantity, 0)
+        self.assertEqual(order.stock_reservations.get().status, StockReservation.COMMITTED)
+
+        # Confirming twice must not take the stock twice
+        commit_order_stock(order)
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.stock_quantity, 1)
+
+    def test_cancel_releases_hold(self):
+        order = self.checkout(create_buyer(1, self.artwork, quantity=2))
+        release_order_stock(order)
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.reserved_quantity, 0)
+        self.assertEqual(order.stock_reservations.get().status, StockReservation.RELEASED)
+
+    def test_sweeper_releases_only_expired_holds(self):
+        expired = self.checkout(create_buyer(1, self.artwork, quantity=1))
+        active = self.checkout(create_buyer(2, self.artwork, quantity=1))
+        expired.stock_reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired_holds(), 1)
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.reserved_quantity, 1)
+        self.assertEqual(expired.stock_reservations.get().status, StockReservation.RELEASED)
+        self.assertEqual(active.stock_reservations.get().status, StockReservation.HELD)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Many buyers checking out the last units of one artwork at the same time"""
+
+    BUYERS = 12
+    STOCK = 3
+
+    def setUp(self):
+        self.artwork, self.shipping_method = create_catalog(stock=self.STOCK)
+        self.buyers = [create_buyer(i, self.artwork) for i in range(self.BUYERS)]
+
+    def test_no_oversell(self):
+        barrier = threading.Barrier(self.BUYERS)
+        results = []
+
+        def checkout(user):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        create_order_from_cart(
+                            user,
+                            shipping_method=self.shipping_method,
+                            shipping_address={'country': 'TZ'},
+                            billing_address={'country': 'TZ'}
+                        )
+                        results.append('ok')
+                        return
+                    except InsufficientStockError:
+                        results.append('sold out')
+                        return
+                    except OperationalError as e:
+                        # SQLite allows a single writer; retry when the database is locked
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in self.buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(results.count('ok'), self.STOCK)
+        self.assertEqual(results.count('sold out'), self.BUYERS - self.STOCK)
+        self.assertEqual(self.artwork.reserved_quantity, self.STOCK)
+        self.assertEqual(
+            StockReservation.objects.filter(artwork=self.artwork, status=StockReservation.HELD).count(),
+            self.STOCK
+        )
+
+
+class IdempotentCheckoutTests(APITestCase):
+    """Retried checkout requests with an Idempotency-Key"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=5)
+        cls.user = create_buyer(1, cls.artwork)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'shipping_address': {'country': 'TZ', 'city': 'Arusha'},
+            'billing_address': {'country': 'TZ', 'city': 'Arusha'},
+            'shipping_method_id': self.shipping_method.id,
+        }
+
+    def post(self, payload, key):
+        return self.client.post(
+            reverse('orders:order_create'), payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.post(self.payload, 'checkout-1')
+        retry = self.post(self.payload, 'checkout-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        self.post(self.payload, 'checkout-1')
+        response = self.post(dict(self.payload, customer_notes='Gift wrap'), 'checkout-1')
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_without_key_runs_every_time(self):
+        self.client.post(reverse('orders:order_create'), self.payload, format='json')
+        response = self.client.post(reverse('orders:order_create'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, 400)  # Cart was emptied by the first checkout
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+
+class OrderQueryPlanTests(APITestCase):
+    """Order list and detail endpoints load in a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=100)
+        cls.user = create_buyer(1, cls.artwork)
+        cls.artwork.likes.add(cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, item_count):
+        order = Order.objects.create(
+            user=self.user, subtotal=Decimal('1.00'), total_amount=Decimal('1.00'),
+            shipping_address={}, billing_address={}, shipping_method=self.shipping_method
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, artwork=self.artwork, quantity=1, unit_price=self.artwork.price, snapshot={})
+            for _ in range(item_count)
+        ])
+        order.status_history.create(new_status=Order.PENDING, notes='Order created')
+        return order
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_detail_query_count_does_not_depend_on_item_count(self):
+        small = self.create_order(1)
+        large = self.create_order(10)
+
+        small_queries, _ = self.count_queries(reverse('orders:order_detail', args=[small.id]))
+        large_queries, data = self.count_queries(reverse('orders:order_detail', args=[large.id]))
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(data['items_count'], 10)
+        self.assertTrue(data['items'][0]['artwork']['is_liked'])
+        self.assertEqual(len(data['status_history']), 1)
+
+    def test_list_reads_annotations(self):
+        self.create_order(2)
+        few_queries, _ = self.count_queries(reverse('orders:order_list'))
+        for _ in range(5):
+            self.create_order(3)
+        many_queries, data = self.count_queries(reverse('orders:order_list'))
+
+        self.assertEqual(few_queries, many_queries)
+        results = data['results']
+        self.assertEqual(sorted(order['items_count'] for order in results), [2, 3, 3, 3, 3, 3])
+        self.assertIsNone(results[0]['payment_status'])
+
+
+class OrderTransitionTests(APITestCase):
+    """Order status changes through the transition service"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=10)
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', username='staff', password=None, is_staff=True
+        )
+
+    def checkout(self, index, paid=False):
+        user = create_buyer(index, self.artwork)
+        order = create_order_from_cart(
+            user,
+            shipping_method=self.shipping_method,
+            shipping_address={'country': 'TZ'},
+            billing_address={'country': 'TZ'}
+        )
+        if paid:
+            Payment.objects.create(
+                order=order, provider=Payment.AZAMPAY, provider_ref=f'AZ-TRANSITION-{index}', method=Payment.MPESA,
+                amount=order.total_amount, currency=order.currency, status=Payment.COMPLETED
+            )
+        return order
+
+    def test_cancel_records_previous_status_and_releases_stock(self):
+        order = self.checkout(1)
+        self.client.force_authenticate(order.user)
+
+        response = self.client.post(reverse('orders:order_cancel', args=[order.id]))
+
+        self.assertEqual(response.status_code, 200)
+        history = order.status_history.get(new_status=Order.CANCELLED)
+        self.assertEqual(history.old_status, Order.PENDING)
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.reserved_quantity, 0)
+
+    def test_invalid_transition_is_rejected(self):
+        order = self.checkout(1)
+
+        with self.assertRaises(InvalidTransitionError):
+            transition_order(order, Order.SHIPPED)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.PENDING)
+
+    def sales_totals(self):
+        return list(sales_report('day').values_list('total_orders', 'total_items_sold', 'total_revenue'))
+
+    def test_cancel_or_refund_before_shipping_restocks_and_removes_sales(self):
+        for index, path in enumerate([
+            [Order.CONFIRMED, Order.CANCELLED],
+            [Order.CONFIRMED, Order.PROCESSING, Order.REFUNDED],
+        ]):
+            with self.subTest(path=path):
+                order = self.checkout(index, paid=True)
+                for new_status in path[:-1]:
+                    transition_order(order, new_status)
+                self.artwork.refresh_from_db()
+                self.assertEqual(self.artwork.stock_quantity, 9)
+                self.assertEqual(self.sales_totals(), [(1, 1, Decimal('50000.00'))])
+
+                transition_order(order, path[-1])
+
+                self.artwork.refresh_from_db()
+                self.assertEqual((self.artwork.stock_quantity, self.artwork.reserved_quantity), (10, 0))
+                self.assertEqual(order.stock_reservations.get().status, StockReservation.RELEASED)
+                self.assertIsNone(order.sales_recorded_at)
+                self.assertEqual(self.sales_totals(), [(0, 0, Decimal('0.00'))])
+
+    def test_refund_after_shipping_removes_sales_only(self):
+        order = self.checkout(1, paid=True)
+        other = self.checkout(2, paid=True)
+        for new_status in [Order.CONFIRMED, Order.PROCESSING, Order.SHIPPED]:
+            bulk_transition([order.pk, other.pk], new_status)
+
+        transition_order(order, Order.REFUNDED)
+
+        self.artwork.refresh_from_db()
+        self.assertEqual(self.artwork.stock_quantity, 8)
+        self.assertEqual(order.stock_reservations.get().status, StockReservation.COMMITTED)
+        self.assertEqual(self.sales_totals(), [(1, 1, Decimal('50000.00'))])
+
+    def test_bulk_transition_moves_eligible_orders_in_one_update(self):
+        orders = [self.checkout(index, paid=index < 3) for index in range(4)]
+        for order in orders[:3]:
+            transition_order(order, Order.CONFIRMED)
+        bulk_transition([order.id for order in orders[:3]], Order.PROCESSING)
+        self.client.force_authenticate(self.staff)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('orders:order_bulk_transition'),
+                {'order_ids': [str(order.id) for order in orders], 'status': Order.SHIPPED},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated_count'], 3)
+        self.assertEqual(response.json()['skipped'], [{'order_id': str(orders[3].id), 'status': Order.PENDING}])
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "orders"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Order.objects.filter(status=Order.SHIPPED, shipped_at__isnull=False).count(), 3)
+        self.assertEqual(OrderStatusHistory.objects.filter(new_status=Order.SHIPPED, changed_by=self.staff).count(), 3)
+
+
+    def test_bulk_confirm_skips_unpaid_orders(self):
+        paid = self.checkout(1, paid=True)
+        unpaid = self.checkout(2)
+
+        result = bulk_transition([paid.pk, unpaid.pk], Order.CONFIRMED)
+
+        self.assertEqual(result.updated, [paid.pk])
+        self.assertEqual(result.skipped, {unpaid.pk: Order.PENDING})
+        unpaid.refresh_from_db()
+        self.assertEqual(unpaid.status, Order.PENDING)
+        self.assertIsNone(unpaid.sales_recorded_at)
+        self.assertEqual(unpaid.stock_reservations.get().status, StockReservation.HELD)
+        self.assertEqual(self.sales_totals(), [(1, 1, Decimal('50000.00'))])
+
+    def count_bulk_queries(self, first, count, new_status):
+        orders = [self.checkout(index, paid=True) for index in range(first, first + count)]
+        if new_status != Order.CONFIRMED:
+            bulk_transition([order.pk for order in orders], Order.CONFIRMED)
+        with CaptureQueriesContext(connection) as context:
+            result = bulk_transition([order.pk for order in orders], new_status)
+        self.assertEqual(len(result.updated), count)
+        return len(context.captured_queries)
+
+    def test_bulk_side_effects_do_not_depend_on_order_count(self):
+        # The day's first sale creates the rollup rows
+        self.count_bulk_queries(0, 1, Order.CONFIRMED)
+        for first, new_status in [(1, Order.CONFIRMED), (10, Order.CANCELLED)]:
+            with self.subTest(new_status=new_status):
+                self.assertEqual(
+                    self.count_bulk_queries(first, 1, new_status),
+                    self.count_bulk_queries(first + 1, 3, new_status)
+                )
+        self.artwork.refresh_from_db()
+        self.assertEqual((self.artwork.stock_quantity, self.artwork.reserved_quantity), (5, 0))
+        self.assertEqual(self.sales_totals(), [(5, 5, Decimal('250000.00'))])
+
+
+class OrderArchiveTests(APITestCase):
+    """Old finished orders move to the archive and stay readable"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=10)
+
+    def test_archived_order_is_served_from_the_archive(self):
+        user = create_buyer(1, self.artwork, quantity=2)
+        order = create_order_from_cart(
+            user,
+            shipping_method=self.shipping_method,
+            shipping_address={'country': 'TZ'},
+            billing_address={'country': 'TZ'}
+        )
+        transition_order(order, Order.CANCELLED)
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        self.client.force_authenticate(user)
+        detail_url = reverse('orders:order_detail', args=[order.id])
+        before = self.client.get(detail_url).json()
+
+        self.assertEqual(archive_orders(older_than_days=365), 1)
+
+        # Items stay as the purchase record
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 1)
+        self.assertFalse(OrderStatusHistory.objects.filter(order=order).exists())
+        after = self.client.get(detail_url).json()
+        self.assertIsNotNone(after.pop('archived_at'))
+        self.assertEqual(after, before)
+        listed = self.client.get(reverse('orders:order_list')).json()['results']
+        self.assertEqual(listed[0]['items_count'], 1)
+        history = self.client.get(reverse('orders:order_history', args=[order.id])).json()
+        self.assertEqual([row['new_status'] for row in history['results']], [Order.PENDING, Order.CANCELLED])
+        self.assertEqual(archive_orders(older_than_days=365), 0)
+
+    def archive_completed_order(self):
+        user = create_buyer(2, self.artwork, quantity=2)
+        order = create_order_from_cart(
+            user,
+            shipping_method=self.shipping_method,
+            shipping_address={'country': 'TZ', 'city': 'Arusha'},
+            billing_address={'country': 'TZ'}
+        )
+        Payment.objects.create(
+            order=order, provider=Payment.AZAMPAY, provider_ref='AZ-ARCHIVE-1', method=Payment.MPESA,
+            amount=order.total_amount, currency=order.currency, status=Payment.COMPLETED
+        )
+        for new_status in [Order.CONFIRMED, Order.PROCESSING, Order.SHIPPED, Order.DELIVERED, Order.COMPLETED]:
+            transition_order(order, new_status)
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        archive_orders(older_than_days=365)
+        return user, order
+
+    def test_archived_orders_are_exported_from_the_archive(self):
+        user, order = self.archive_completed_order()
+
+        columns = [name for name, _ in COLUMNS[ORDERS]]
+        row = dict(zip(columns, next(iter_rows(ORDERS))))
+        self.assertEqual(row['order_number'], order.order_number)
+        # The address is cleared on the order row and read from the document
+        self.assertEqual(row['shipping_country'], 'TZ')
+        self.assertEqual(
+            (row['payment_provider'], row['payment_method'], row['payment_status'], row['payment_reference']),
+            (Payment.AZAMPAY, Payment.MPESA, Payment.COMPLETED, 'AZ-ARCHIVE-1')
+        )
+        items = list(iter_rows(ITEMS))
+        self.assertEqual(len(items), 1)
+        self.assertEqual(dict(zip([name for name, _ in COLUMNS[ITEMS]], items[0]))['payment_status'], Payment.COMPLETED)
+
+    def test_archived_orders_count_as_purchases(self):
+        user, order = self.archive_completed_order()
+
+        self.assertTrue(Order.objects.filter(
+            user=user, items__artwork=self.artwork, status__in=['completed', 'delivered']
+        ).exists())
+        review = Review.objects.create(user=user, artwork=self.artwork, order=order, rating=5)
+        self.assertTrue(review.is_verified_purchase)
+
+    def test_rollups_are_rebuilt_over_archived_orders(self):
+        _, order = self.archive_completed_order()
+        expected = [(1, 2, Decimal('100000.00'))]
+        totals = sales_report('day').values_list('total_orders', 'total_items_sold', 'total_revenue')
+        self.assertEqual(list(totals), expected)
+        rows = set(SalesDailyRollup.objects.values_list('artist_id', 'category_id', 'orders_count', 'revenue'))
+
+        day = timezone.localdate(order.created_at)
+        rebuild_rollups(day, day)
+        self.assertEqual(list(totals), expected)
+        self.assertEqual(
+            set(SalesDailyRollup.objects.values_list('artist_id', 'category_id', 'orders_count', 'revenue')), rows
+        )
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=5)
+class OrderNumberTests(TestCase):
+    """Order numbers from the per-year sequence row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+
+    def setUp(self):
+        order_numbers._blocks.clear()
+        self.addCleanup(order_numbers._blocks.clear)
+        self.year = timezone.now().year
+
+    def create_order(self, order_number):
+        return Order.objects.create(
+            user=self.user, order_number=order_number, subtotal=Decimal('1.00'),
+            total_amount=Decimal('1.00'), shipping_address={}, billing_address={}
+        )
+
+    def last_value(self):
+        return OrderNumberSequence.objects.get(year=self.year).last_value
+
+    def test_seed_compares_numbers_not_strings(self):
+        self.create_order(f'SC{self.year}999999')
+        self.create_order(f'SC{self.year}1000001')
+        self.create_order(f'SC{self.year}-LEGACY-1')
+
+        self.assertEqual(order_numbers._seed_value(self.year), 1000001)
+        value, _ = order_numbers.reserve_block(self.year, 1)
+        self.assertEqual(value, 1000002)
+
+    def test_single_number_inside_a_transaction(self):
+        with transaction.atomic():
+            first = order_numbers.next_order_number()
+            second = order_numbers.next_order_number()
+
+        self.assertEqual(
+            [first, second],
+            [order_numbers.format_order_number(self.year, 1), order_numbers.format_order_number(self.year, 2)]
+        )
+        self.assertEqual(self.last_value(), 2)
+        self.assertEqual(order_numbers._blocks, {})
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=5)
+class OrderNumberBlockTests(TransactionTestCase):
+    """Blocks of order numbers handed out from memory outside transactions"""
+
+    THREADS = 8
+    PER_THREAD = 10
+
+    def setUp(self):
+        order_numbers._blocks.clear()
+        self.addCleanup(order_numbers._blocks.clear)
+        self.year = timezone.now().year
+
+    def test_numbers_are_handed_out_from_a_block(self):
+        numbers = [order_numbers.next_order_number() for _ in range(7)]
+
+        self.assertEqual(numbers, [order_numbers.format_order_number(self.year, n) for n in range(1, 8)])
+        # Two blocks of five reserved
+        self.assertEqual(OrderNumberSequence.objects.get(year=self.year).last_value, 10)
+
+    def test_concurrent_numbers_are_unique(self):
+        barrier = threading.Barrier(self.THREADS)
+        numbers = []
+        errors = []
+
+        def allocate():
+            barrier.wait()
+            try:
+                for _ in range(self.PER_THREAD):
+                    while True:
+                        try:
+                            numbers.append(order_numbers.next_order_number())
+                            break
+                        except OperationalError as e:
+                            # SQLite allows a single writer; retry when the database is locked
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(0.01)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(numbers), self.THREADS * self.PER_THREAD)
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+
+class OrderExportTests(APITestCase):
+    """Keyset-paginated finance exports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.shipping_method = create_catalog(stock=10)
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.staff = User.objects.create_user(
+            email='finance@example.com', username='finance', password=None, is_staff=True
+        )
+        cls.orders = [
+            Order.objects.create(
+                user=cls.user, order_number=f'EXPORT{i:03d}', subtotal=Decimal('1.00'),
+                total_amount=Decimal('1.00'), shipping_address={'country': 'TZ'}, billing_address={},
+                shipping_method=cls.shipping_method
+            )
+            for i in range(7)
+        ]
+        # Orders created in the same instant straddle page boundaries
+        created = timezone.now() - timedelta(days=1)
+        for i, order in enumerate(cls.orders):
+            Order.objects.filter(pk=order.pk).update(created_at=created + timedelta(seconds=i // 3))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, artwork=cls.artwork, quantity=1, unit_price=cls.artwork.price, snapshot={})
+            for order in cls.orders for _ in range(2)
+        ])
+
+    def test_pages_neither_drop_nor_repeat_rows(self):
+        for chunk_size in (1, 2, 3, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                numbers = [row[0] for row in iter_rows(ORDERS, chunk_size=chunk_size)]
+                self.assertEqual(sorted(numbers), [order.order_number for order in self.orders])
+                self.assertEqual(len(numbers), len(set(numbers)))
+
+                items = list(iter_rows(ITEMS, chunk_size=chunk_size))
+                self.assertEqual(len(items), 2 * len(self.orders))
+
+    def test_export_view_streams_json_lines(self):
+        self.client.force_authenticate(self.staff)
+
+        response = self.client.get(reverse('orders:order_export'), {'dataset': ORDERS, 'file_format': JSONL})
+
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), len(self.orders))
+        self.assertEqual(rows[0]['shipping_country'], 'TZ')
+
+
+class SalesRollupTests(APITestCase):
+    """Daily sales rollups and the sales report"""
+
+    @classmethod
+    def setUpTestData(cls):
+        artists = [
+            Artist.objects.create(
+                user=User.objects.create_user(email=f'artist{i}@example.com', username=f'artist{i}', password=None),
+                display_name=name
+            )
+            for i, name in enumerate(['Asha', 'Juma'])
+        ]
+        cls.masks = Category.objects.create(name='Masks', slug='masks')
+        cls.carvings = Category.objects.create(name='Carvings', slug='carvings')
+        cls.artworks = [
+            Artwork.objects.create(
+                artist=artist, category=category, title=f'Piece {i}', slug=f'piece-{i}',
+                description='Piece', material='Wood', dimensions='10 x 10 x 10',
+                price=price, stock_quantity=10, status=Artwork.ACTIVE
+            )
+            for i, (artist, category, price) in enumerate([
+                (artists[0], cls.masks, Decimal('1000.00')),
+                (artists[1], cls.masks, Decimal('2000.00')),
+                (artists[0], cls.carvings, Decimal('3000.00')),
+            ])
+        ]
+        cls.asha, cls.juma = artists
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.staff = User.objects.create_user(
+            email='finance@example.com', username='finance', password=None, is_staff=True
+        )
+        # One order across two artists, one across two categories
+        cls.orders = [
+            cls.create_order('SALES001', [cls.artworks[0], cls.artworks[1]]),
+            cls.create_order('SALES002', [cls.artworks[0], cls.artworks[2]]),
+        ]
+
+    @classmethod
+    def create_order(cls, order_number, artworks):
+        order = Order.objects.create(
+            user=cls.user, order_number=order_number, status=Order.CONFIRMED, subtotal=Decimal('1.00'),
+            total_amount=Decimal('1.00'), shipping_address={'country': 'TZ'}, billing_address={}
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, artwork=artwork, quantity=1, unit_price=artwork.price, snapshot={})
+            for artwork in artworks
+        ])
+        return order
+
+    def report(self, group_by, **filters):
+        return [
+            (row[key], row['total_orders'], row['total_items_sold'], row['total_revenue'])
+            for row in sales_report(group_by, **filters)
+            for key in [{'day': 'date', 'artist': 'artist_id', 'category': 'category_id'}[group_by]]
+        ]
+
+    def assert_reports(self):
+        today = timezone.localdate()
+        self.assertEqual(self.report('day'), [(today, 2, 4, Decimal('7000.00'))])
+        self.assertEqual(self.report('artist'), [
+            (self.asha.pk, 2, 3, Decimal('5000.00')),
+            (self.juma.pk, 1, 1, Decimal('2000.00')),
+        ])
+        self.assertEqual(self.report('category'), [
+            (self.masks.pk, 2, 3, Decimal('4000.00')),
+            (self.carvings.pk, 1, 1, Decimal('3000.00')),
+        ])
+        self.assertEqual(self.report('day', artist_id=self.asha.pk), [(today, 2, 3, Decimal('5000.00'))])
+        self.assertCountEqual(self.report('artist', category_id=self.masks.pk), [
+            (self.asha.pk, 2, 2, Decimal('2000.00')),
+            (self.juma.pk, 1, 1, Decimal('2000.00')),
+        ])
+
+    def test_orders_spanning_artists_and_categories_are_counted_once(self):
+        for order in self.orders:
+            self.assertTrue(record_order_sales(order))
+        self.assertFalse(record_order_sales(self.orders[0]))
+
+        self.assert_reports()
+
+    def test_each_grain_allows_one_row_per_day_and_currency(self):
+        today = timezone.localdate()
+        for grain in [
+            {'artist': self.asha, 'category': self.masks},
+            {'artist': self.asha, 'category': None},
+            {'artist': None, 'category': self.masks},
+            {'artist': None, 'category': None},
+        ]:
+            with self.subTest(grain=grain):
+                SalesDailyRollup.objects.create(date=today, currency='TZS', **grain)
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    SalesDailyRollup.objects.create(date=today, currency='TZS', **grain)
+                SalesDailyRollup.objects.create(date=today, currency='USD', **grain)
+
+    def test_rebuild_command_matches_incremental_rollups(self):
+        for order in self.orders:
+            record_order_sales(order)
+        recorded = set(SalesDailyRollup.objects.values_list(
+            'date', 'artist_id', 'category_id', 'currency', 'orders_count', 'items_sold', 'revenue'
+        ))
+        SalesDailyRollup.objects.update(orders_count=99)
+
+        call_command('rebuild_sales_rollups', stdout=open(os.devnull, 'w'))
+
+        rebuilt = set(SalesDailyRollup.objects.values_list(
+            'date', 'artist_id', 'category_id', 'currency', 'orders_count', 'items_sold', 'revenue'
+        ))
+        self.assertEqual(rebuilt, recorded)
+        self.assert_reports()
+
+    def test_report_view(self):
+        for order in self.orders:
+            record_order_sales(order)
+        url = reverse('orders:sales_report')
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        rows = self.client.get(url, {'group_by': 'category'}).json()
+        self.assertEqual(
+            [(row['category_name'], row['total_orders'], row['total_revenue']) for row in rows],
+            [('Masks', 2, '4000.00'), ('Carvings', 1, '3000.00')]
+        )
+        response = self.client.get(url, {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
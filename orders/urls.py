@@ -7,6 +7,9 @@ urlpatterns = [
     # Order management
     path('create/', views.OrderCreateView.as_view(), name='order_create'),
     path('', views.OrderListView.as_view(), name='order_list'),
+    path('export/', views.OrderExportView.as_view(), name='order_export'),
+    path('bulk-transition/', views.OrderBulkTransitionView.as_view(), name='order_bulk_transition'),
+    path('analytics/sales/', views.SalesReportView.as_view(), name='sales_report'),
     path('<uuid:id>/', views.OrderDetailView.as_view(), name='order_detail'),
     path('<uuid:order_id>/cancel/', views.OrderCancelView.as_view(), name='order_cancel'),
     
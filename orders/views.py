@@ -1,18 +1,25 @@
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
-from decimal import Decimal
 
-from .models import Order, OrderItem, OrderStatusHistory
+from .models import ArchivedOrder, Order, OrderStatusHistory
 from .serializers import (
     OrderSerializer, OrderListSerializer, OrderCreateSerializer,
-    OrderItemSerializer, OrderStatusHistorySerializer
+    OrderItemSerializer, OrderStatusHistorySerializer, OrderExportQuerySerializer,
+    SalesReportQuerySerializer, SalesReportRowSerializer,
+    OrderBulkTransitionSerializer, OrderBulkTransitionResultSerializer
 )
-from catalog.models import Cart, CartItem
+from .services.checkout import EmptyCartError, ShippingUnavailableError, create_order_from_cart
+from .services.export import FORMATS, stream_export
+from .services.idempotency import idempotent
+from .services.sales import sales_report
+from .services.inventory import InsufficientStockError
+from .services.transitions import InvalidTransitionError, bulk_transition, transition_order
 from shipping.models import ShippingMethod
 from django.contrib.auth import get_user_model
 
@@ -28,16 +35,27 @@ class OrderCreateView(APIView):
     @extend_schema(
         summary="Create order from cart",
         description="Convert cart to order with shipping and billing information",
+        parameters=[
+            OpenApiParameter(
+                name='Idempotency-Key',
+                description='Unique key for this request; retries with the same key replay the first response',
+                required=False,
+                type=str,
+                location=OpenApiParameter.HEADER
+            ),
+        ],
         request=OrderCreateSerializer,
         responses={
             201: OrderSerializer,
             400: OpenApiResponse(description="Invalid input or empty cart"),
             404: OpenApiResponse(description="Shipping method not found"),
+            409: OpenApiResponse(description="Some items are no longer in stock"),
+            422: OpenApiResponse(description="Idempotency-Key reused for a different request"),
         }
     )
+    @idempotent('orders.create')
     def post(self, request):
         serializer = OrderCreateSerializer(data=request.data)
-        print(request.data)
         if serializer.is_valid():
             shipping_address = serializer.validated_data['shipping_address']
             billing_address = serializer.validated_data['billing_address']
@@ -50,87 +68,41 @@ class OrderCreateView(APIView):
                 billing_address = shipping_address
             
             try:
-                # Get user's cart
-                cart = Cart.objects.get(user=request.user)
-                cart_items = CartItem.objects.filter(cart=cart)
-                
-                if not cart_items.exists():
-                    return Response(
-                        {"error": "Cart is empty"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
                 # Get shipping method
                 shipping_method = ShippingMethod.objects.get(
                     id=shipping_method_id,
                     is_active=True
                 )
                 
-                # Calculate totals
-                subtotal = sum(item.total_price for item in cart_items)
-                
-                # Calculate shipping cost (you might want to get weight from cart items)
-                shipping_cost = shipping_method.calculate_cost(2.5)  # Default weight
-                
-                # For now, no tax or discount
-                tax_amount = Decimal('0.00')
-                discount_amount = Decimal('0.00')
-                
-                total_amount = subtotal + shipping_cost + tax_amount - discount_amount
-                
-                # Create order in a transaction
-                with transaction.atomic():
-                    order = Order.objects.create(
-                        user=request.user,
-                        currency='TZS',
-                        subtotal=subtotal,
-                        shipping_cost=shipping_cost,
-                        tax_amount=tax_amount,
-                        discount_amount=discount_amount,
-                        total_amount=total_amount,
-                        shipping_address=shipping_address,
-                        billing_address=billing_address,
-                        shipping_method=shipping_method,
-                        customer_notes=customer_notes,
-                        status='pending'
-                    )
-                    
-                    # Create order items from cart items
-                    for cart_item in cart_items:
-                        # Create snapshot of artwork data
-                        artwork_snapshot = {
-                            'title': cart_item.artwork.title,
-                            'artist': cart_item.artwork.artist.user.get_full_name() if cart_item.artwork.artist else 'Unknown',
-                            'price': str(cart_item.artwork.price),
-                            'currency': cart_item.artwork.currency
-                        }
-                        
-                        OrderItem.objects.create(
-                            order=order,
-                            artwork=cart_item.artwork,
-                            quantity=cart_item.quantity,
-                            unit_price=cart_item.artwork.price,
-                            tax_rate=Decimal('0.0000'),  # No tax for now
-                            snapshot=artwork_snapshot
-                        )
-                    
-                    # Create initial status history
-                    OrderStatusHistory.objects.create(
-                        order=order,
-                        new_status='pending',
-                        notes='Order created'
-                    )
-                    
-                    # Clear the cart
-                    cart_items.delete()
+                order = create_order_from_cart(
+                    request.user,
+                    shipping_method=shipping_method,
+                    shipping_address=shipping_address,
+                    billing_address=billing_address,
+                    customer_notes=customer_notes
+                )
                 
                 # Return the created order
+                order = Order.objects.for_detail().get(pk=order.pk)
                 order_serializer = OrderSerializer(order, context={'request': request})
                 return Response(order_serializer.data, status=status.HTTP_201_CREATED)
                 
-            except Cart.DoesNotExist:
+            except EmptyCartError:
                 return Response(
-                    {"error": "Cart not found"},
+                    {"error": "Cart is empty"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except InsufficientStockError as e:
+                return Response(
+                    {
+                        "error": str(e),
+                        "artwork_ids": [str(artwork.id) for artwork in e.artworks]
+                    },
+                    status=status.HTTP_409_CONFLICT
+                )
+            except ShippingUnavailableError:
+                return Response(
+                    {"error": "Shipping method not available for this destination or weight"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             except ShippingMethod.DoesNotExist:
@@ -174,7 +146,7 @@ class OrderListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
     
     def get_queryset(self):
-        queryset = Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user).for_list()
         
         # Filter by status if provided
         status_filter = self.request.query_params.get('status')
@@ -208,7 +180,15 @@ class OrderDetailView(generics.RetrieveAPIView):
         return super().get(request, *args, **kwargs)
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).for_detail()
+    
+    def retrieve(self, request, *args, **kwargs):
+        order = self.get_object()
+        if order.archived_at:
+            # Details of archived orders are served from the archive document
+            archived_at = serializers.DateTimeField().to_representation(order.archived_at)
+            return Response({**order.archive.document['order'], 'archived_at': archived_at})
+        return Response(self.get_serializer(order).data)
 
 
 class OrderCancelView(APIView):
@@ -244,17 +224,19 @@ class OrderCancelView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Cancel the order
-            order.status = 'cancelled'
-            order.save()
-            
-            # Add status history
-            OrderStatusHistory.objects.create(
-                order=order,
-                old_status=order.status,
-                new_status='cancelled',
-                notes='Order cancelled by customer'
-            )
+            # Cancel the order and give its stock back
+            try:
+                transition_order(
+                    order,
+                    Order.CANCELLED,
+                    changed_by=request.user,
+                    notes='Order cancelled by customer'
+                )
+            except InvalidTransitionError:
+                return Response(
+                    {"error": "Order cannot be cancelled"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response({"message": "Order cancelled successfully"})
             
@@ -278,3 +260,117 @@ class OrderStatusHistoryView(generics.ListAPIView):
             order__id=order_id,
             order__user=self.request.user
         ).order_by('changed_at')
+    
+    def list(self, request, *args, **kwargs):
+        archive = ArchivedOrder.objects.filter(
+            order_id=self.kwargs['order_id'],
+            order__user=request.user
+        ).only('document').first()
+        if archive is None:
+            return super().list(request, *args, **kwargs)
+        
+        history = archive.document['status_history']
+        page = self.paginate_queryset(history)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(history)
+
+
+class OrderExportView(APIView):
+    """
+    Stream orders for finance as CSV or JSON Lines (staff only)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @extend_schema(
+        summary="Export orders",
+        description="Stream orders (with payment and shipment) or order items as CSV or JSON Lines",
+        parameters=[OrderExportQuerySerializer],
+        responses={
+            200: OpenApiResponse(description="Streamed CSV or JSON Lines file"),
+            400: OpenApiResponse(description="Invalid filters"),
+        }
+    )
+    def get(self, request):
+        serializer = OrderExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = serializer.validated_data
+        file_format = params['file_format']
+        response = StreamingHttpResponse(
+            stream_export(
+                params['dataset'],
+                file_format,
+                date_from=params.get('date_from'),
+                date_to=params.get('date_to'),
+                statuses=params.get('status')
+            ),
+            content_type=FORMATS[file_format]
+        )
+        filename = f"{params['dataset']}-{timezone.localdate():%Y%m%d}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SalesReportView(APIView):
+    """
+    Sales totals from the daily rollups (staff only)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @extend_schema(
+        summary="Sales report",
+        description="Orders, items sold and revenue per day, artist or category, read from the daily sales rollups",
+        parameters=[SalesReportQuerySerializer],
+        responses={
+            200: SalesReportRowSerializer(many=True),
+            400: OpenApiResponse(description="Invalid filters"),
+        }
+    )
+    def get(self, request):
+        serializer = SalesReportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = sales_report(**serializer.validated_data)
+        return Response(SalesReportRowSerializer(rows, many=True).data)
+
+
+class OrderBulkTransitionView(APIView):
+    """
+    Move many orders to a new status at once (staff only)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @extend_schema(
+        summary="Bulk order status change",
+        description="Move orders to a new status in one update. Orders whose current status "
+                    "doesn't allow the change are skipped and listed with their status.",
+        request=OrderBulkTransitionSerializer,
+        responses={
+            200: OrderBulkTransitionResultSerializer,
+            400: OpenApiResponse(description="Invalid input"),
+        }
+    )
+    def post(self, request):
+        serializer = OrderBulkTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        result = bulk_transition(
+            data['order_ids'],
+            data['status'],
+            changed_by=request.user,
+            notes=data['notes']
+        )
+        
+        return Response(OrderBulkTransitionResultSerializer({
+            'updated_count': len(result.updated),
+            'updated': result.updated,
+            'skipped': [
+                {'order_id': str(order_id), 'status': current_status}
+                for order_id, current_status in result.skipped.items()
+            ],
+        }).data)
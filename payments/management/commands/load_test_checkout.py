@@ -0,0 +1,225 @@
+"""
+Management command to load-test checkout end to end against the Azam Pay simulator
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import close_old_connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from artists.models import Artist
+from catalog.models import Artwork, Cart, CartItem, Category
+from payments.models import Payment
+from payments.services.azam_pay import AzamPayAuth
+from payments.services.azam_pay_simulator import AzamPaySimulator
+from shipping.models import ShippingMethod
+
+User = get_user_model()
+
+STAGES = ['order', 'payment', 'confirmation', 'total']
+POLL_INTERVAL = 0.05  # seconds
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(ordered, percent):
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent checkouts (order, mobile payment, webhook confirmation) through the API '
+        'against a local Azam Pay simulator and report latency percentiles. Test data is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=50, help='Checkouts to run (default: 50)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Checkouts in flight at once (default: 10)')
+        parser.add_argument('--latency', type=float, default=0.2, help='Simulated checkout latency in seconds (default: 0.2)')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Random extra simulated latency (default: 0.1)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of checkouts the simulator rejects')
+        parser.add_argument('--decline-rate', type=float, default=0.0, help='Share of payments declined in the callback')
+        parser.add_argument('--webhook-delay', type=float, default=1.0, help='Seconds before the simulator calls back (default: 1)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for a payment to settle (default: 30)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🛒 Load testing checkout against the Azam Pay simulator...\n'))
+        simulator = AzamPaySimulator(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            failure_rate=options['failure_rate'],
+            decline_rate=options['decline_rate'],
+            webhook_delay=options['webhook_delay'],
+            webhook_token=getattr(settings, 'AZAM_PAY_WEBHOOK_TOKEN', ''),
+        )
+        simulator_url = simulator.start()
+
+        api = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        api.set_app(get_internal_wsgi_application())
+        threading.Thread(target=api.serve_forever, daemon=True).start()
+        api_url = f'http://127.0.0.1:{api.server_port}'
+        simulator.callback_url = api_url + reverse('payments:azam_pay_webhook')
+
+        fixtures = self.create_fixtures(options['checkouts'])
+        try:
+            with override_settings(AZAM_PAY_AUTH=simulator_url, AZAM_PAY_CHECKOUT_URL=simulator_url):
+                AzamPayAuth.clear_cached_token()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    results = list(pool.map(
+                        lambda buyer: self.checkout(api_url, buyer, fixtures['shipping_method'], options['timeout']),
+                        fixtures['buyers']
+                    ))
+                elapsed = time.perf_counter() - started
+                AzamPayAuth.clear_cached_token()
+        finally:
+            api.shutdown()
+            api.server_close()
+            simulator.stop()
+            self.delete_fixtures(fixtures)
+
+        self.report(results, elapsed, simulator.stats)
+
+    def checkout(self, api_url, buyer, shipping_method, timeout):
+        """Run one checkout and return ``(outcome, {stage: seconds})``"""
+        timings = {}
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {buyer["token"]}'
+        started = time.perf_counter()
+        try:
+            address = {'name': 'Load Test', 'city': 'Dar es Salaam', 'country': 'TZ'}
+            response = session.post(f'{api_url}/api/v1/orders/create/', json={
+                'shipping_address': address,
+                'same_as_shipping': True,
+                'billing_address': address,
+                'shipping_method_id': shipping_method.id,
+            }, timeout=timeout)
+            timings['order'] = time.perf_counter() - started
+            if response.status_code != 201:
+                return f'order {response.status_code}', timings
+
+            step = time.perf_counter()
+            response = session.post(f'{api_url}/api/v1/payments/process-mobile/', json={
+                'order_id': response.json()['id'],
+                'payment_method': {'provider': Payment.AZAMPAY, 'method': Payment.MPESA},
+                'phone_number': buyer['phone'],
+            }, timeout=timeout)
+            timings['payment'] = time.perf_counter() - step
+            if response.status_code != 200:
+                return f'payment {response.status_code}', timings
+
+            step = time.perf_counter()
+            payment_id = response.json()['payment_id']
+            deadline = step + timeout
+            while time.perf_counter() < deadline:
+                status = Payment.objects.filter(pk=payment_id).values_list('status', flat=True).first()
+                if status not in (Payment.PENDING, Payment.PROCESSING):
+                    timings['confirmation'] = time.perf_counter() - step
+                    timings['total'] = time.perf_counter() - started
+                    return status, timings
+                time.sleep(POLL_INTERVAL)
+            return 'timed out', timings
+        except requests.RequestException as e:
+            return type(e).__name__, timings
+        finally:
+            session.close()
+            close_old_connections()
+
+    def report(self, results, elapsed, simulator_stats):
+        outcomes = Counter(outcome for outcome, _ in results)
+        self.stdout.write(
+            f'{len(results)} checkouts in {elapsed:.1f}s ({len(results) / elapsed:.1f}/s): '
+            + ', '.join(f'{count} {outcome}' for outcome, count in outcomes.most_common())
+        )
+
+        self.stdout.write(f"\n{'stage':<14} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for stage in STAGES:
+            timings = sorted(stage_timings[stage] * 1000 for _, stage_timings in results if stage in stage_timings)
+            if not timings:
+                continue
+            self.stdout.write(
+                f'{stage:<14} {len(timings):>6} {percentile(timings, 50):>8.1f} {percentile(timings, 95):>8.1f} '
+                f'{percentile(timings, 99):>8.1f} {timings[-1]:>8.1f}'
+            )
+
+        self.stdout.write('\nSimulator: ' + ', '.join(f'{key} x{count}' for key, count in sorted(simulator_stats.items())))
+        self.stdout.write(self.style.SUCCESS('\n✅ Load test complete (test data deleted)'))
+
+    def create_fixtures(self, count):
+        suffix = uuid.uuid4().hex[:8]
+        artist_user = User.objects.create_user(
+            email=f'loadtest-artist-{suffix}@example.com',
+            username=f'loadtest-artist-{suffix}',
+            password=None,
+        )
+        artist = Artist.objects.create(user=artist_user, display_name=f'Load Test Artist {suffix}')
+        category = Category.objects.create(name=f'Load Test {suffix}', slug=f'loadtest-{suffix}')
+        artwork = Artwork.objects.create(
+            artist=artist,
+            category=category,
+            title=f'Load Test Artwork {suffix}',
+            slug=f'loadtest-artwork-{suffix}',
+            description='Load test artwork',
+            material='Wood',
+            dimensions='10 x 10 x 10',
+            weight=Decimal('1.000'),
+            price=Decimal('10000.00'),
+            stock_quantity=count,
+            status=Artwork.ACTIVE,
+        )
+        shipping_method = ShippingMethod.objects.create(
+            name=f'Load Test Shipping {suffix}',
+            carrier='Load Test',
+            base_cost=Decimal('5000.00'),
+            cost_per_kg=Decimal('1000.00'),
+            min_delivery_days=1,
+            max_delivery_days=3,
+        )
+
+        User.objects.bulk_create([
+            User(email=f'loadtest-{suffix}-{i}@example.com', username=f'loadtest-{suffix}-{i}')
+            for i in range(count)
+        ])
+        users = list(User.objects.filter(username__startswith=f'loadtest-{suffix}-').order_by('id'))
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartItem.objects.bulk_create([
+            CartItem(
+                cart=cart,
+                artwork=artwork,
+                quantity=1,
+                unit_price=artwork.price,
+                snapshot=CartItem.build_snapshot(artwork)
+            )
+            for cart in carts
+        ])
+        buyers = [
+            {'token': str(AccessToken.for_user(user)), 'phone': f'2557{i:08d}'}
+            for i, user in enumerate(users)
+        ]
+        return {
+            'users': [artist_user, *users],
+            'category': category,
+            'shipping_method': shipping_method,
+            'buyers': buyers,
+        }
+
+    def delete_fixtures(self, fixtures):
+        # Orders, payments, carts and the artist's artworks go with their users
+        User.objects.filter(pk__in=[user.pk for user in fixtures['users']]).delete()
+        fixtures['category'].delete()
+        fixtures['shipping_method'].delete()
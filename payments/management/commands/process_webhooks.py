@@ -0,0 +1,37 @@
+"""
+Management command to process stored payment webhooks
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services.webhooks import DEFAULT_BATCH_SIZE, process_pending_webhooks
+
+
+class Command(BaseCommand):
+    help = 'Process payment webhook events that were stored but not processed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Events read per query (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running and check for new events every SECONDS seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = process_pending_webhooks(batch_size=options['batch_size'])
+            if processed or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} webhook events ({failed} failed)'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,70 @@
+"""
+Management command to reconcile stale payments with their provider
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.models import Payment
+from payments.services.reconcile import DEFAULT_BATCH_SIZE, STATUS_CHECKERS, reconcile_payments
+
+
+class Command(BaseCommand):
+    help = 'Check payments stuck in processing with the provider and apply their status'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            choices=sorted(STATUS_CHECKERS),
+            default=Payment.AZAMPAY,
+            help='Payment provider to reconcile (default: azampay)',
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            metavar='MINUTES',
+            help='Only check payments processing for longer than this '
+                 f'(default: {settings.PAYMENT_RECONCILE_AFTER_MINUTES})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Payments read and updated per page (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help=f'Concurrent provider requests (default: {settings.PAYMENT_RECONCILE_WORKERS})',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help=f'Provider requests per second, 0 for no limit (default: {settings.PAYMENT_RECONCILE_RATE})',
+        )
+
+    def handle(self, *args, **options):
+        older_than = options['older_than']
+        result = reconcile_payments(
+            provider=options['provider'],
+            older_than=timedelta(minutes=older_than) if older_than is not None else None,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            rate=options['rate'],
+        )
+
+        updated = ', '.join(f'{count} {status}' for status, count in sorted(result.updated.items())) or 'none'
+        self.stdout.write(
+            f'Checked {result.checked} payments in {result.elapsed:.1f}s '
+            f'({result.throughput:.1f}/s): {result.unchanged} unchanged, {result.errors} errors'
+        )
+        if result.lags:
+            self.stdout.write(
+                f'Lag from payment start: p50 {result.lag_percentile(50):.0f}s, '
+                f'p95 {result.lag_percentile(95):.0f}s, max {max(result.lags):.0f}s'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Updated: {updated}'))
@@ -0,0 +1,38 @@
+"""
+Management command to reprocess failed payment webhooks
+"""
+from django.core.management.base import BaseCommand
+
+from payments.models import Payment
+from payments.services.webhooks import DEFAULT_BATCH_SIZE, process_pending_webhooks
+
+
+class Command(BaseCommand):
+    help = 'Reprocess payment webhook events whose processing failed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Events read per query (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--provider',
+            choices=[choice for choice, _ in Payment.PROVIDER_CHOICES],
+            help='Only replay events from this provider',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            help='Skip events that already failed this many times',
+        )
+
+    def handle(self, *args, **options):
+        processed, failed = process_pending_webhooks(
+            batch_size=options['batch_size'],
+            failed=True,
+            provider=options['provider'],
+            max_attempts=options['max_attempts']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Replayed {processed} webhook events ({failed} failed again)'))
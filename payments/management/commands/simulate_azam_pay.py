@@ -0,0 +1,52 @@
+"""
+Management command to run the local Azam Pay simulator
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.services.azam_pay_simulator import AzamPaySimulator
+
+
+class Command(BaseCommand):
+    help = 'Run a local Azam Pay simulator (set AZAM_PAY_AUTH and AZAM_PAY_CHECKOUT_URL to its URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+        parser.add_argument(
+            '--callback-url',
+            default='http://127.0.0.1:8000/api/v1/payments/webhooks/azam-pay/',
+            help='Webhook URL the simulator posts payment results to',
+        )
+        parser.add_argument('--latency', type=float, default=0.2, help='Checkout response time in seconds (default: 0.2)')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Random extra latency up to this many seconds (default: 0.1)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of checkouts rejected outright (default: 0)')
+        parser.add_argument('--decline-rate', type=float, default=0.0, help='Share of payments that fail in the callback (default: 0)')
+        parser.add_argument('--webhook-delay', type=float, default=2.0, help='Seconds before the callback is sent (default: 2)')
+
+    def handle(self, *args, **options):
+        simulator = AzamPaySimulator(
+            callback_url=options['callback_url'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            failure_rate=options['failure_rate'],
+            decline_rate=options['decline_rate'],
+            webhook_delay=options['webhook_delay'],
+            webhook_token=getattr(settings, 'AZAM_PAY_WEBHOOK_TOKEN', ''),
+        )
+        url = simulator.start(options['host'], options['port'])
+        self.stdout.write(self.style.SUCCESS(f'Azam Pay simulator running at {url}'))
+        self.stdout.write(f"Callbacks go to {options['callback_url']}; press Ctrl+C to stop")
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.stop()
+
+        for key, count in sorted(simulator.stats.items()):
+            self.stdout.write(f'{key}: {count}')
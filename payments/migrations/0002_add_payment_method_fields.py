@@ -23,10 +23,6 @@ class Migration(migrations.Migration):
             old_name="display_name",
             new_name="name",
         ),
-        migrations.AlterUniqueTogether(
-            name="paymentmethod",
-            unique_together={("provider", "method")},
-        ),
         migrations.AddField(
             model_name="paymentmethod",
             name="allowed_countries",
@@ -96,6 +92,10 @@ class Migration(migrations.Migration):
                 verbose_name="method",
             ),
         ),
+        migrations.AlterUniqueTogether(
+            name="paymentmethod",
+            unique_together={("provider", "method")},
+        ),
         migrations.AddField(
             model_name="paymentmethod",
             name="sort_order",
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_add_azampay_provider'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentwebhook',
+            name='event_id',
+            field=models.CharField(max_length=255, verbose_name='event ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentwebhook',
+            constraint=models.UniqueConstraint(fields=('provider', 'event_id'), name='payment_webhook_provider_event_unique'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 import uuid
@@ -108,6 +108,12 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment {self.id} - Order {self.order.order_number} - {self.status}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Push the status to clients waiting on the payment's event stream
+        from .services.events import publish_payment_status
+        transaction.on_commit(lambda: publish_payment_status(self))
+    
     @property
     def is_successful(self):
         return self.status == self.COMPLETED
@@ -222,6 +228,21 @@ class PaymentMethod(models.Model):
     def __str__(self):
         return f"{self.name} ({self.provider})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_method_index()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_method_index()
+        return result
+    
+    @staticmethod
+    def _invalidate_method_index():
+        # The methods endpoint is served from an in-memory eligibility index
+        from .services.methods import invalidate_method_index
+        invalidate_method_index()
+    
     def calculate_fee(self, amount):
         """Calculate fee for given amount"""
         percentage_fee = amount * (self.fee_percentage / 100)
@@ -243,7 +264,7 @@ class PaymentWebhook(models.Model):
     """Store webhook events from payment providers"""
     
     provider = models.CharField(_('provider'), max_length=20, choices=Payment.PROVIDER_CHOICES)
-    event_id = models.CharField(_('event ID'), max_length=255, unique=True)
+    event_id = models.CharField(_('event ID'), max_length=255)
     event_type = models.CharField(_('event type'), max_length=100)
     
     # Webhook data
@@ -271,6 +292,10 @@ class PaymentWebhook(models.Model):
         verbose_name = _('Payment Webhook')
         verbose_name_plural = _('Payment Webhooks')
         ordering = ['-created_at']
+        constraints = [
+            # Provider retries of the same event are dropped at insert time
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='payment_webhook_provider_event_unique'),
+        ]
         indexes = [
             models.Index(fields=['provider', 'event_type']),
             models.Index(fields=['processed']),
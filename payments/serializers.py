@@ -50,6 +50,7 @@ class MobilePaymentResponseSerializer(serializers.Serializer):
     instructions = serializers.CharField(required=False)
     timeout = serializers.IntegerField(required=False)
     status_check_url = serializers.CharField(required=False)
+    events_url = serializers.CharField(required=False)
 
 
 class PaymentStatusSerializer(serializers.Serializer):
@@ -1,14 +1,31 @@
 import json
 import requests
 import logging
+import time
+from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from authentication.models import AzamPayAuthToken
 from authentication.serializers import AzamPayAuthSerializer
+from payments.services.circuit import cache_is_shared
+from payments.services.http import get_client
+from payments.webhooks.azam_pay import STATUS_MAPPING
 
 logger = logging.getLogger(__name__)
 
 
+# Tokens are kept in process memory and in the shared cache, and refreshed
+# this many seconds before they expire
+TOKEN_CACHE_KEY = 'payments:azam_pay:token'
+TOKEN_REFRESH_LOCK_KEY = 'payments:azam_pay:token:refresh'
+TOKEN_REFRESH_LOCK_TIMEOUT = 30  # seconds
+TOKEN_POLL_INTERVAL = 0.1  # seconds
+
+_token = None  # {'access_token': ..., 'expires_at': ...}
+
+
 class AzamPayAuth:
     """Azam Pay Authentication Service"""
     
@@ -17,22 +34,102 @@ class AzamPayAuth:
         self.client_secret = settings.AZAM_PAY_CLIENT_SECRET
         self.app_name = settings.AZAM_PAY_APP_NAME
         self.auth_url = settings.AZAM_PAY_AUTH
+        self.http = get_client('azam_pay')
+    
+    @staticmethod
+    def clear_cached_token():
+        """Forget the token held in this process and in the shared cache"""
+        global _token
+        _token = None
+        cache.delete(TOKEN_CACHE_KEY)
+    
+    @staticmethod
+    def _is_fresh(token):
+        margin = timedelta(seconds=getattr(settings, 'AZAM_PAY_TOKEN_REFRESH_MARGIN', 300))
+        return token is not None and token['expires_at'] - margin > timezone.now()
+    
+    @staticmethod
+    def _is_valid(token):
+        return token is not None and token['expires_at'] > timezone.now()
+    
+    @staticmethod
+    def _remember(token):
+        global _token
+        _token = token
+        timeout = max(int((token['expires_at'] - timezone.now()).total_seconds()), 1)
+        cache.set(TOKEN_CACHE_KEY, token, timeout)
+        return token
+    
+    def _stored_token(self):
+        """Newest token from the shared cache or, failing that, the database"""
+        token = cache.get(TOKEN_CACHE_KEY)
+        if self._is_fresh(token):
+            return token
+        token_model = AzamPayAuthToken.objects.order_by('-created_at').first()
+        if token_model is None:
+            return None
+        return {'access_token': token_model.access_token.strip(), 'expires_at': token_model.expires_in}
     
     def get_token(self):
-        """Get valid authentication token"""
-        try:
-            # Check if we have a valid token
-            token_model = AzamPayAuthToken.objects.latest("created_at")
-            if token_model and not token_model.is_expired:
-                return token_model.access_token.strip()
-        except AzamPayAuthToken.DoesNotExist:
-            pass
+        """
+        Get valid authentication token.
+        
+        Only one refresh runs at a time across all workers and threads: the
+        one that takes the refresh lock requests a new token while the others
+        keep using the current token if it hasn't expired yet, or wait for
+        the new one. The lock lives in the shared cache; when the cache isn't
+        shared (e.g. the dummy cache) refreshes lock the newest token row
+        instead. No lock is held within the process while waiting.
+        """
+        token = _token
+        if self._is_fresh(token):
+            return token['access_token']
+        
+        stored = self._stored_token()
+        if self._is_fresh(stored):
+            return self._remember(stored)['access_token']
+        
+        if not cache_is_shared():
+            return self._remember(self._refresh_with_row_lock())['access_token']
+        
+        if cache.add(TOKEN_REFRESH_LOCK_KEY, True, TOKEN_REFRESH_LOCK_TIMEOUT):
+            try:
+                # A refresh may have finished between reading the token and taking the lock
+                current = cache.get(TOKEN_CACHE_KEY)
+                if self._is_fresh(current):
+                    return self._remember(current)['access_token']
+                return self._remember(self._request_new_token())['access_token']
+            finally:
+                cache.delete(TOKEN_REFRESH_LOCK_KEY)
+        
+        # Another worker is refreshing
+        if self._is_valid(stored):
+            return stored['access_token']
+        deadline = time.monotonic() + TOKEN_REFRESH_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(TOKEN_POLL_INTERVAL)
+            current = cache.get(TOKEN_CACHE_KEY)
+            if self._is_valid(current):
+                return self._remember(current)['access_token']
         
-        # Get new token
-        return self._request_new_token()
+        # The refresh never finished; get a token ourselves
+        return self._remember(self._request_new_token())['access_token']
+    
+    def _refresh_with_row_lock(self):
+        """
+        Refresh the token while holding a lock on the newest token row, so
+        workers that don't share a cache refresh one at a time; a worker that
+        waited for the lock uses the token stored meanwhile.
+        """
+        with transaction.atomic():
+            AzamPayAuthToken.objects.select_for_update().order_by('-created_at').first()
+            stored = self._stored_token()
+            if self._is_fresh(stored):
+                return stored
+            return self._request_new_token()
     
     def _request_new_token(self):
-        """Request new token from Azam Pay"""
+        """Request new token from Azam Pay and store it in the database"""
         url = f"{self.auth_url}/AppRegistration/GenerateToken"
         
         payload = {
@@ -44,7 +141,10 @@ class AzamPayAuth:
         headers = {"Content-Type": "application/json"}
         
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            # Asking for a token twice is harmless, so it can be retried
+            response = self.http.post(
+                url, operation='generate_token', idempotent=True, headers=headers, data=json.dumps(payload)
+            )
             response.raise_for_status()
             response_data = response.json()
             
@@ -62,7 +162,11 @@ class AzamPayAuth:
                 serializer = AzamPayAuthSerializer(data=serializer_data)
                 if serializer.is_valid():
                     token_instance = serializer.save()
-                    return token_instance.access_token.strip()
+                    logger.info("Azam Pay token refreshed")
+                    return {
+                        'access_token': token_instance.access_token.strip(),
+                        'expires_at': token_instance.expires_in,
+                    }
                 else:
                     logger.error(f"Token serialization error: {serializer.errors}")
                     raise Exception("Failed to save authentication token")
@@ -81,6 +185,7 @@ class AzamPayCheckout:
     def __init__(self):
         self.checkout_url = settings.AZAM_PAY_CHECKOUT_URL
         self.auth_service = AzamPayAuth()
+        self.http = get_client('azam_pay')
     
     def init_checkout(self, account_number, amount, external_id, provider="Airtel"):
         """Initialize checkout with Azam Pay"""
@@ -103,7 +208,7 @@ class AzamPayCheckout:
         }
         
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            response = self.http.post(url, operation='mno_checkout', headers=headers, data=json.dumps(payload))
             response.raise_for_status()
             return response.json()
             
@@ -111,14 +216,30 @@ class AzamPayCheckout:
             logger.error(f"Azam Pay checkout failed: {e}")
             raise Exception("Failed to initialize payment")
     
-    def check_payment_status(self, transaction_id):
-        """Check payment status"""
-        # Implementation depends on Azam Pay's status check endpoint
-        # This is a placeholder - update with actual Azam Pay status endpoint
+    def check_payment_status(self, reference, bank_name=None):
+        """
+        Look up a transaction with Azam Pay's transaction status API.
+        
+        ``reference`` is the Azam Pay transaction id or our external id.
+        Returns the provider's response body.
+        """
         token = self.auth_service.get_token()
         
-        # Add actual status check implementation here
-        pass
+        url = f"{self.checkout_url}/azampay/transactionstatus"
+        params = {"reference": reference}
+        if bank_name:
+            params["bankName"] = bank_name
+        
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        try:
+            response = self.http.get(url, operation='transaction_status', headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+            
+        except requests.RequestException as e:
+            logger.error(f"Azam Pay status check failed for {reference}: {e}")
+            raise Exception("Failed to check payment status")
     
     def process_mobile_payment(self, phone_number, amount, external_id, provider="Airtel"):
         """Process mobile money payment"""
@@ -173,3 +294,24 @@ class AzamPayService:
             )
         else:
             raise ValueError(f"Unsupported payment method: {method}")
+    
+    def get_payment_status(self, payment):
+        """
+        Current status of ``payment`` at Azam Pay.
+        
+        Returns a dict with our ``status`` (``None`` if Azam Pay doesn't
+        report a known one), the provider ``reference`` and ``message``.
+        """
+        provider_data = payment.provider_data or {}
+        reference = provider_data.get('transactionId') or provider_data.get('reference') or str(payment.id)
+        body = self.checkout.check_payment_status(reference)
+        
+        data = body.get('data') or {}
+        if isinstance(data, list):
+            data = data[0] if data else {}
+        status_value = str(data.get('transactionStatus') or data.get('status') or '').lower()
+        return {
+            'status': STATUS_MAPPING.get(status_value),
+            'reference': data.get('transactionId') or data.get('reference') or provider_data.get('transactionId'),
+            'message': data.get('message') or body.get('message', ''),
+        }
@@ -0,0 +1,220 @@
+"""
+Local Azam Pay simulator
+
+A small WSGI app that stands in for Azam Pay so checkout can be exercised
+and load-tested offline. It implements the endpoints ``AzamPayService``
+uses:
+
+    POST /AppRegistration/GenerateToken    issue a bearer token
+    POST /azampay/mno/checkout             accept a mobile money checkout
+    GET  /azampay/transactionstatus        look up a transaction
+
+Each accepted checkout is answered after a configurable latency, rejected
+at ``failure_rate``, and ``webhook_delay`` seconds later the outcome
+(declined at ``decline_rate``) is posted to ``callback_url`` the way Azam
+Pay calls ``AzamPayWebhookView``. Point ``AZAM_PAY_AUTH`` and
+``AZAM_PAY_CHECKOUT_URL`` at the simulator to use it; see the
+``simulate_azam_pay`` and ``load_test_checkout`` commands.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TOKEN_LIFETIME = 3600  # seconds
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class AzamPaySimulator:
+    """WSGI app simulating Azam Pay's token, checkout and callback behaviour"""
+
+    def __init__(self, callback_url='', latency=0.0, jitter=0.0, failure_rate=0.0,
+                 decline_rate=0.0, webhook_delay=1.0, webhook_token='', seed=None):
+        self.callback_url = callback_url
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.webhook_delay = webhook_delay
+        self.webhook_token = webhook_token
+
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.transactions = {}
+        self.stats = Counter()
+        self._timers = []
+        self._server = None
+        self._webhooks = requests.Session()
+
+    # WSGI entry point
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+
+        if method == 'POST' and path == '/AppRegistration/GenerateToken':
+            status, payload = self.generate_token()
+        elif method == 'POST' and path == '/azampay/mno/checkout':
+            status, payload = self.checkout(environ, body)
+        elif method == 'GET' and path == '/azampay/transactionstatus':
+            status, payload = self.transaction_status(environ)
+        else:
+            status, payload = 404, {'success': False, 'message': 'Not found'}
+
+        with self.lock:
+            self.stats[f'{path} {status}'] += 1
+        data = json.dumps(payload).encode()
+        start_response(f'{status} {"OK" if status < 400 else "Error"}', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(data))),
+        ])
+        return [data]
+
+    def _authorized(self, environ):
+        token = environ.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ').strip()
+        with self.lock:
+            return token in self.tokens
+
+    def _sleep(self):
+        delay = self.latency + self.random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def generate_token(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens.add(token)
+        return 200, {
+            'success': True,
+            'message': 'Token generated successfully',
+            'data': {
+                'accessToken': token,
+                'refreshToken': uuid.uuid4().hex,
+                'tokenType': 'Bearer',
+                'expire': str(int(time.time()) + TOKEN_LIFETIME),
+            },
+        }
+
+    def checkout(self, environ, body):
+        if not self._authorized(environ):
+            return 401, {'success': False, 'message': 'Invalid token'}
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'success': False, 'message': 'Invalid JSON'}
+        if not data.get('externalId') or not data.get('accountNumber'):
+            return 400, {'success': False, 'message': 'accountNumber and externalId are required'}
+
+        self._sleep()
+        if self.random.random() < self.failure_rate:
+            return 400, {'success': False, 'message': 'Simulated checkout failure'}
+
+        transaction_id = uuid.uuid4().hex[:20]
+        outcome = 'failed' if self.random.random() < self.decline_rate else 'success'
+        with self.lock:
+            self.transactions[transaction_id] = {
+                'transactionId': transaction_id,
+                'externalId': data['externalId'],
+                'amount': data.get('amount'),
+                'msisdn': data['accountNumber'],
+                'operator': data.get('provider'),
+                'transactionStatus': 'pending',
+                'outcome': outcome,
+            }
+            timer = threading.Timer(self.webhook_delay, self._complete, args=[transaction_id])
+            timer.daemon = True
+            self._timers = [pending for pending in self._timers if pending.is_alive()]
+            self._timers.append(timer)
+            timer.start()
+        return 200, {
+            'success': True,
+            'transactionId': transaction_id,
+            'message': 'Request in progress. You will receive a callback shortly',
+        }
+
+    def transaction_status(self, environ):
+        if not self._authorized(environ):
+            return 401, {'success': False, 'message': 'Invalid token'}
+        reference = parse_qs(environ.get('QUERY_STRING', '')).get('reference', [''])[0]
+        with self.lock:
+            transaction = self.transactions.get(reference) or next(
+                (t for t in self.transactions.values() if t['externalId'] == reference), None
+            )
+            transaction = dict(transaction) if transaction else None
+        if transaction is None:
+            return 404, {'success': False, 'message': 'Transaction not found'}
+        transaction.pop('outcome')
+        return 200, {'success': True, 'message': 'Transaction found', 'data': transaction}
+
+    def _complete(self, transaction_id):
+        """Settle a transaction and post the callback (if there is a callback URL)"""
+        with self.lock:
+            transaction = self.transactions[transaction_id]
+            transaction['transactionStatus'] = transaction['outcome']
+            payload = {
+                'externalId': transaction['externalId'],
+                'utilityref': transaction['externalId'],
+                'transactionId': transaction_id,
+                'reference': transaction_id,
+                'status': transaction['outcome'],
+                'transactionstatus': transaction['outcome'],
+                'amount': transaction['amount'],
+                'msisdn': transaction['msisdn'],
+                'operator': transaction['operator'],
+                'message': 'Payment successful' if transaction['outcome'] == 'success' else 'Insufficient balance',
+            }
+        if not self.callback_url:
+            return
+        headers = {'X-Webhook-Token': self.webhook_token} if self.webhook_token else {}
+        try:
+            response = self._webhooks.post(self.callback_url, json=payload, headers=headers, timeout=10)
+            key = f'callback {response.status_code}'
+        except requests.RequestException as e:
+            logger.warning(f"Simulator callback for {transaction_id} failed: {e}")
+            key = 'callback error'
+        with self.lock:
+            self.stats[key] += 1
+
+    # Serving
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve on a background thread and return the base URL"""
+        self._server = make_server(
+            host, port, self, server_class=ThreadingWSGIServer, handler_class=QuietWSGIRequestHandler
+        )
+        threading.Thread(target=self._server.serve_forever, daemon=True, name='azam-pay-simulator').start()
+        return f'http://{host}:{self._server.server_port}'
+
+    def stop(self):
+        with self.lock:
+            timers, self._timers = self._timers, []
+        for timer in timers:
+            timer.cancel()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
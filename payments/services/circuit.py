@@ -0,0 +1,171 @@
+"""
+Circuit breaker and bulkhead for payment provider calls
+
+When a provider degrades, calls to it should fail fast instead of tying up
+app server threads. Two guards sit in front of every ``ProviderHTTPClient``
+call:
+
+* ``CircuitBreaker`` counts calls and failures (errors, 5xx responses and
+  calls slower than ``PAYMENT_CIRCUIT_SLOW_CALL_SECONDS``) per provider in
+  fixed windows in the shared cache, so every worker sees the same state.
+  Once at least ``PAYMENT_CIRCUIT_MIN_CALLS`` calls in a window fail at
+  ``PAYMENT_CIRCUIT_ERROR_RATE`` or more, the circuit opens and calls are
+  refused for ``PAYMENT_CIRCUIT_COOLDOWN`` seconds. After that one trial
+  call is let through (half open): success closes the circuit, failure
+  opens it again. The breaker needs a shared cache; with the dummy cache it
+  never opens.
+* ``Bulkhead`` caps the calls in flight to a provider from one worker
+  process at ``PAYMENT_PROVIDER_MAX_CONCURRENCY``; callers wait at most
+  ``PAYMENT_BULKHEAD_WAIT`` seconds for a slot.
+
+Both raise ``ProviderUnavailable``, which views turn into a 503 with
+``Retry-After``.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+STATE_KEY = 'payments:circuit:{provider}:state'
+TRIAL_KEY = 'payments:circuit:{provider}:trial'
+COUNTER_KEY = 'payments:circuit:{provider}:{window}:{counter}'
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider that is failing or saturated"""
+
+    def __init__(self, provider, reason, retry_after=1):
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = max(int(retry_after), 1)
+        super().__init__(f"{provider} unavailable ({reason}), retry after {self.retry_after}s")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_is_shared():
+    """Whether the default cache is shared between worker processes (not the dummy or local-memory cache)"""
+    return not isinstance(caches['default'], (DummyCache, LocMemCache))
+
+
+class CircuitBreaker:
+    """Error-rate and latency circuit breaker with its state in the shared cache"""
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    @property
+    def window(self):
+        return _setting('PAYMENT_CIRCUIT_WINDOW', 60)
+
+    @property
+    def cooldown(self):
+        return _setting('PAYMENT_CIRCUIT_COOLDOWN', 30)
+
+    def _counter_key(self, counter, window=None):
+        window = window if window is not None else int(time.time() // self.window)
+        return COUNTER_KEY.format(provider=self.provider, window=window, counter=counter)
+
+    def _incr(self, key):
+        try:
+            cache.add(key, 0, self.window * 2)
+            return cache.incr(key)
+        except ValueError:
+            return None  # The cache doesn't keep values (dummy cache)
+
+    def state(self):
+        """``(state, seconds until a trial call is allowed)``"""
+        circuit = cache.get(STATE_KEY.format(provider=self.provider))
+        if not circuit:
+            return CLOSED, 0
+        remaining = circuit['opened_at'] + self.cooldown - time.time()
+        if remaining > 0:
+            return OPEN, remaining
+        return HALF_OPEN, 0
+
+    def before_call(self):
+        """
+        Check the circuit before calling the provider.
+
+        Returns whether this call is the half-open trial; raises
+        ``ProviderUnavailable`` while the circuit is open.
+        """
+        state, remaining = self.state()
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and cache.add(TRIAL_KEY.format(provider=self.provider), True, self.cooldown):
+            return True
+        # Open, or half open with another worker's trial call under way
+        raise ProviderUnavailable(self.provider, 'circuit open', retry_after=remaining if state == OPEN else 1)
+
+    def record(self, failed, trial=False):
+        """Count the outcome of a call and open or close the circuit"""
+        if trial:
+            cache.delete(TRIAL_KEY.format(provider=self.provider))
+            if failed:
+                self.open()
+            else:
+                self.close()
+            return
+
+        window = int(time.time() // self.window)
+        calls = self._incr(self._counter_key('calls', window))
+        if not failed or calls is None:
+            return
+        failures = self._incr(self._counter_key('failures', window))
+        if calls >= _setting('PAYMENT_CIRCUIT_MIN_CALLS', 10) and \
+                failures / calls >= _setting('PAYMENT_CIRCUIT_ERROR_RATE', 0.5):
+            self.open()
+
+    def open(self):
+        cache.set(STATE_KEY.format(provider=self.provider), {'opened_at': time.time()}, None)
+        logger.warning(f"{self.provider} circuit opened")
+
+    def close(self):
+        window = int(time.time() // self.window)
+        cache.delete_many([
+            STATE_KEY.format(provider=self.provider),
+            self._counter_key('calls', window),
+            self._counter_key('failures', window),
+        ])
+        logger.info(f"{self.provider} circuit closed")
+
+    def is_slow(self, latency):
+        return latency >= _setting('PAYMENT_CIRCUIT_SLOW_CALL_SECONDS', 5)
+
+
+class Bulkhead:
+    """Caps concurrent calls to one provider from this process"""
+
+    def __init__(self, provider, limit=None, wait=None):
+        self.provider = provider
+        self.limit = limit or _setting('PAYMENT_PROVIDER_MAX_CONCURRENCY', 10)
+        self.wait = wait if wait is not None else _setting('PAYMENT_BULKHEAD_WAIT', 0.5)
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def __enter__(self):
+        if not self._slots.acquire(timeout=self.wait):
+            raise ProviderUnavailable(self.provider, 'too many calls in flight')
+        with self._lock:
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+        return False
@@ -0,0 +1,145 @@
+"""
+Payment status events
+
+Instead of polling ``PaymentStatusView``, clients can open the
+``payments/<id>/events/`` stream, which pushes the payment's status as
+server-sent events and closes once the payment is finished.
+
+Status changes are published to a per-payment cache key when a ``Payment``
+is saved, so whichever worker applies the webhook notifies streams held open
+by any other worker. Waiting streams only read that key, and also re-read
+the payment from the database: every ``PAYMENT_EVENTS_DB_INTERVAL`` seconds
+when the cache isn't shared between workers, and otherwise only as a safety
+net for lost updates, with the interval doubling after each read.
+
+Holding a stream open is only cheap under ASGI. A WSGI worker would buffer
+the whole stream and be tied up until it ends, so requests served over WSGI
+get the current status once with a ``retry`` hint instead, and EventSource
+clients reconnect every ``PAYMENT_EVENTS_RETRY`` seconds.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+
+from payments.models import Payment
+from payments.services.circuit import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_KEY = 'payments:events:{payment_id}'
+
+FINAL_STATUSES = {
+    Payment.COMPLETED, Payment.FAILED, Payment.CANCELLED,
+    Payment.REFUNDED, Payment.PARTIALLY_REFUNDED,
+}
+
+
+def payment_status_data(payment):
+    """The status payload returned by ``PaymentStatusView`` and pushed on the stream"""
+    if payment.status == Payment.COMPLETED:
+        return {
+            'payment_id': str(payment.id),
+            'status': payment.status,
+            'order_id': str(payment.order_id),
+            'amount': str(payment.amount),
+            'currency': payment.currency,
+            'provider_ref': payment.provider_ref,
+            'processed_at': payment.processed_at.isoformat() if payment.processed_at else None,
+            'receipt_url': f"https://payments.example.com/receipt/{payment.id}"
+        }
+    if payment.status == Payment.FAILED:
+        return {
+            'payment_id': str(payment.id),
+            'status': payment.status,
+            'order_id': str(payment.order_id),
+            'failure_reason': 'Insufficient funds',  # This would come from provider
+            'failure_code': 'INSUFFICIENT_FUNDS',
+            'retry_allowed': True
+        }
+    return {
+        'payment_id': str(payment.id),
+        'status': payment.status,
+        'order_id': str(payment.order_id),
+    }
+
+
+def publish_payment_status(payment):
+    """Notify streams waiting on this payment of its current status"""
+    try:
+        cache.set(
+            CHANNEL_KEY.format(payment_id=payment.id),
+            payment_status_data(payment),
+            getattr(settings, 'PAYMENT_EVENTS_TIMEOUT', 300) * 2
+        )
+    except Exception as e:
+        # Streams fall back to reading the database
+        logger.warning(f"Could not publish status of payment {payment.id}: {e}")
+
+
+def streams_events(request):
+    """Whether ``request`` is served over ASGI, where an event stream doesn't hold a worker"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def _message(event, data, retry=None):
+    retry_line = f"retry: {int(retry * 1000)}\n" if retry is not None else ''
+    return f"{retry_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def payment_status_event(payment):
+    """The current status as a single event, for clients that can't be streamed to"""
+    return _message('status', payment_status_data(payment), retry=getattr(settings, 'PAYMENT_EVENTS_RETRY', 5))
+
+
+async def payment_event_stream(payment):
+    """
+    Yield server-sent events for ``payment`` until it is finished.
+
+    The current status is sent straight away and again on every change. A
+    ``timeout`` event ends the stream after ``PAYMENT_EVENTS_TIMEOUT``
+    seconds; comment lines keep idle connections open through proxies.
+    """
+    poll_interval = getattr(settings, 'PAYMENT_EVENTS_POLL_INTERVAL', 0.5)
+    db_interval = getattr(settings, 'PAYMENT_EVENTS_DB_INTERVAL', 5)
+    keepalive = getattr(settings, 'PAYMENT_EVENTS_KEEPALIVE', 15)
+    key = CHANNEL_KEY.format(payment_id=payment.id)
+
+    data = payment_status_data(payment)
+    yield _message('status', data)
+    if data['status'] in FINAL_STATUSES:
+        return
+
+    # With a shared cache the published status arrives there; back off the database reads
+    back_off = cache_is_shared()
+    started = last_db_check = last_sent = time.monotonic()
+    deadline = started + getattr(settings, 'PAYMENT_EVENTS_TIMEOUT', 300)
+    while True:
+        await asyncio.sleep(poll_interval)
+        now = time.monotonic()
+        if now >= deadline:
+            yield _message('timeout', {'payment_id': str(payment.id), 'status': data['status']})
+            return
+
+        latest = await cache.aget(key)
+        if (latest is None or latest['status'] == data['status']) and now - last_db_check >= db_interval:
+            last_db_check = now
+            if back_off:
+                db_interval *= 2
+            current = await Payment.objects.filter(pk=payment.id).afirst()
+            if current is not None:
+                latest = payment_status_data(current)
+
+        if latest is not None and latest['status'] != data['status']:
+            data = latest
+            last_sent = now
+            yield _message('status', data)
+            if data['status'] in FINAL_STATUSES:
+                return
+        elif now - last_sent >= keepalive:
+            last_sent = now
+            yield ": keep-alive\n\n"
@@ -0,0 +1,250 @@
+"""
+HTTP client for payment providers
+
+Each provider gets one shared ``ProviderHTTPClient`` (see ``get_client``)
+with a ``requests.Session`` whose connection pool keeps connections to the
+provider alive between payments. Every call has connect and read timeouts,
+so a slow provider can't hold a worker indefinitely.
+
+Failed calls are retried with jittered exponential backoff when it is safe
+to do so: failures to connect (the request never reached the provider) are
+always retried; other connection errors, timeouts and 502/503/504 responses
+only for idempotent calls. Latency and errors are recorded per provider and
+operation in ``metrics``.
+
+Calls also go through the provider's circuit breaker and bulkhead (see
+``payments.services.circuit``); when either refuses a call it raises
+``ProviderUnavailable`` without contacting the provider.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from payments.services.circuit import Bulkhead, CircuitBreaker, ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUSES = {502, 503, 504}
+MAX_BACKOFF = 5.0  # seconds
+LATENCY_SAMPLES = 500
+
+
+class ProviderMetrics:
+    """In-process latency and error counters per (provider, operation)"""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self._stats = {}
+
+    def _entry(self, key):
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = {
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'rejected': 0,
+                'statuses': defaultdict(int),
+                'latencies': deque(maxlen=self._samples),
+            }
+        return entry
+
+    def record(self, provider, operation, latency, status=None, error=None):
+        with self._lock:
+            entry = self._entry((provider, operation))
+            entry['calls'] += 1
+            entry['latencies'].append(latency)
+            if error is not None:
+                entry['errors'] += 1
+                entry['statuses'][type(error).__name__] += 1
+            else:
+                entry['statuses'][str(status)] += 1
+
+    def record_retry(self, provider, operation):
+        with self._lock:
+            self._entry((provider, operation))['retries'] += 1
+
+    def record_rejection(self, provider, operation, reason):
+        with self._lock:
+            entry = self._entry((provider, operation))
+            entry['rejected'] += 1
+            entry['statuses'][reason] += 1
+
+    def snapshot(self):
+        """Counters and latency percentiles (in milliseconds) for every operation"""
+        with self._lock:
+            stats = {key: dict(entry, latencies=sorted(entry['latencies'])) for key, entry in self._stats.items()}
+
+        result = []
+        for (provider, operation), entry in sorted(stats.items()):
+            latencies = entry['latencies']
+            result.append({
+                'provider': provider,
+                'operation': operation,
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'retries': entry['retries'],
+                'rejected': entry['rejected'],
+                'statuses': dict(entry['statuses']),
+                'p50_ms': _percentile(latencies, 50),
+                'p95_ms': _percentile(latencies, 95),
+                'p99_ms': _percentile(latencies, 99),
+                'max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+            })
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+def _never_sent(error):
+    """Whether the request failed before reaching the provider (always safe to retry)"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 1)
+
+
+metrics = ProviderMetrics()
+
+
+class ProviderHTTPClient:
+    """Pooled, guarded HTTP client with timeouts, retries and latency metrics for one provider"""
+
+    def __init__(self, provider, base_url='', connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff=None, pool_size=None, max_concurrency=None):
+        self.provider = provider
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout or getattr(settings, 'PAYMENT_HTTP_CONNECT_TIMEOUT', 3.05)
+        self.read_timeout = read_timeout or getattr(settings, 'PAYMENT_HTTP_READ_TIMEOUT', 15)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'PAYMENT_HTTP_MAX_RETRIES', 2)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'PAYMENT_HTTP_BACKOFF', 0.3)
+        pool_size = pool_size or getattr(settings, 'PAYMENT_HTTP_POOL_SIZE', 10)
+        self.circuit = CircuitBreaker(provider)
+        self.bulkhead = Bulkhead(provider, limit=max_concurrency)
+
+        self.session = requests.Session()
+        # Retries are handled here, so the adapter must not retry on its own
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _url(self, path):
+        if path.startswith(('http://', 'https://')) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: sleep a random time up to the exponential backoff
+        time.sleep(random.uniform(0, min(MAX_BACKOFF, self.backoff * (2 ** attempt))))
+
+    def request(self, method, path, operation=None, idempotent=None, timeout=None, **kwargs):
+        """
+        Send a request and return the ``requests.Response``.
+
+        ``idempotent`` defaults to whether the HTTP method is idempotent;
+        pass ``True`` for POSTs the provider can safely receive twice.
+        ``requests`` exceptions are raised once retries run out, and
+        ``ProviderUnavailable`` if the circuit is open or the bulkhead full.
+        """
+        method = method.upper()
+        operation = operation or f"{method} {path}"
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        try:
+            with self.bulkhead:
+                return self._send(method, self._url(path), operation, idempotent, timeout, **kwargs)
+        except ProviderUnavailable as e:
+            metrics.record_rejection(self.provider, operation, e.reason)
+            logger.warning(f"{self.provider} {operation} refused: {e}")
+            raise
+
+    def _send(self, method, url, operation, idempotent, timeout, **kwargs):
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+
+        attempt = 0
+        while True:
+            trial = self.circuit.before_call()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as error:
+                metrics.record(self.provider, operation, time.monotonic() - started, error=error)
+                self.circuit.record(failed=True, trial=trial)
+                retryable = _never_sent(error) or (
+                    idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+                )
+                if not retryable or attempt >= self.max_retries:
+                    logger.warning(f"{self.provider} {operation} failed: {error}")
+                    raise
+            else:
+                latency = time.monotonic() - started
+                metrics.record(self.provider, operation, latency, status=response.status_code)
+                self.circuit.record(
+                    failed=response.status_code >= 500 or self.circuit.is_slow(latency), trial=trial
+                )
+                if not (idempotent and response.status_code in RETRY_STATUSES and attempt < self.max_retries):
+                    return response
+                response.close()
+
+            attempt += 1
+            metrics.record_retry(self.provider, operation)
+            self._sleep_before_retry(attempt - 1)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, base_url=''):
+    """The shared client for a provider (one connection pool per process)"""
+    key = (provider, base_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = ProviderHTTPClient(provider, base_url)
+    return client
+
+
+def provider_status():
+    """Circuit state and in-flight calls for every provider client in this process"""
+    with _clients_lock:
+        clients = list(_clients.values())
+
+    result = []
+    for client in clients:
+        state, retry_after = client.circuit.state()
+        result.append({
+            'provider': client.provider,
+            'circuit': state,
+            'retry_after': round(retry_after, 1),
+            'in_flight': client.bulkhead.in_flight,
+            'max_concurrency': client.bulkhead.limit,
+        })
+    return result
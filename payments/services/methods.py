@@ -0,0 +1,105 @@
+"""
+Payment method eligibility index
+
+Active payment methods are loaded into an in-process index that maps every
+(country, currency) pair to the serialized methods available for it, in
+display order, with their fees already rendered. ``PaymentMethodsView``
+answers with a single dict lookup.
+
+Countries and currencies that no method mentions behave alike (only
+unrestricted methods match them), so they share one ``OTHER`` entry and the
+table stays as small as the configured lists. An empty country or currency
+means "don't filter".
+
+The index is rebuilt when a method is saved or deleted (a version number in
+the shared cache tells other processes to reload) and at least every
+``PAYMENT_METHOD_INDEX_TTL`` seconds.
+"""
+import logging
+import threading
+import time
+from itertools import product
+
+from django.conf import settings
+from django.core.cache import cache
+
+from payments.models import PaymentMethod
+from payments.serializers import PaymentMethodSerializer
+
+logger = logging.getLogger(__name__)
+
+METHOD_INDEX_VERSION_KEY = 'payments:method_index:version'
+ANY = ''
+OTHER = None
+
+_lock = threading.Lock()
+_index = None
+
+
+class MethodIndex:
+    """Serialized active payment methods by (country, currency)"""
+
+    def __init__(self, methods, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.countries = {country for method in methods for country in method.allowed_countries or []}
+        self.currencies = {currency for method in methods for currency in method.supported_currencies or []}
+
+        entries = list(zip(methods, PaymentMethodSerializer(methods, many=True).data))
+        self.table = {}
+        for country, currency in product(self.countries | {ANY, OTHER}, self.currencies | {ANY, OTHER}):
+            self.table[(country, currency)] = tuple(
+                data for method, data in entries
+                if self._matches(method.allowed_countries, country)
+                and self._matches(method.supported_currencies, currency)
+            )
+
+    @staticmethod
+    def _matches(allowed, value):
+        # An empty list places no restriction; an empty value asks for none
+        return not allowed or value == ANY or value in allowed
+
+    @classmethod
+    def load(cls, version):
+        methods = list(PaymentMethod.objects.filter(is_active=True).order_by('sort_order', 'name'))
+        return cls(methods, version)
+
+    def lookup(self, country, currency):
+        """Serialized methods available for ``country`` and ``currency``"""
+        country = country if country == ANY or country in self.countries else OTHER
+        currency = currency if currency == ANY or currency in self.currencies else OTHER
+        return self.table[(country, currency)]
+
+
+def get_method_index():
+    """Return the current method index, reloading it if it changed or expired"""
+    global _index
+
+    version = cache.get(METHOD_INDEX_VERSION_KEY)
+    ttl = getattr(settings, 'PAYMENT_METHOD_INDEX_TTL', 300)
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.loaded_at < ttl:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.loaded_at >= ttl:
+            index = _index = MethodIndex.load(version)
+            logger.debug(f"Loaded payment method index (version {version})")
+    return index
+
+
+def invalidate_method_index():
+    """Drop this process's index and tell other processes to reload theirs"""
+    global _index
+
+    _index = None
+    try:
+        cache.incr(METHOD_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(METHOD_INDEX_VERSION_KEY, 1, None)
+
+
+def available_methods(country, currency):
+    """Serialized payment methods for a country and currency, in display order"""
+    return get_method_index().lookup(country, currency)
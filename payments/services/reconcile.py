@@ -0,0 +1,180 @@
+"""
+Payment reconciliation against provider status
+
+Payments whose webhook never arrives would stay ``processing`` forever.
+``reconcile_payments`` pages through payments that have been processing for
+a while (keyset pagination over the ``(provider, status)`` index), asks the
+provider for each one's status on a bounded thread pool under a request rate
+limit, and applies the changes a page at a time: one ``bulk_update`` for the
+payments and one ``bulk_transition`` confirming the paid orders.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from orders.models import Order
+from orders.services.transitions import bulk_transition
+from payments.models import Payment
+from payments.services.events import publish_payment_status
+
+logger = logging.getLogger(__name__)
+
+# provider -> service class with ``get_payment_status(payment)``
+STATUS_CHECKERS = {
+    Payment.AZAMPAY: 'payments.services.azam_pay.AzamPayService',
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+UPDATE_FIELDS = ['status', 'provider_ref', 'processed_at', 'failure_reason', 'failure_code', 'updated_at']
+
+
+class RateLimiter:
+    """Spaces out calls across threads to at most ``rate`` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@dataclass
+class ReconcileResult:
+    checked: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    updated: Counter = field(default_factory=Counter)
+    lags: list = field(default_factory=list)  # seconds from payment start to reconciliation
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self):
+        """Payments checked per second"""
+        return self.checked / self.elapsed if self.elapsed else 0.0
+
+    def lag_percentile(self, percent):
+        if not self.lags:
+            return None
+        ordered = sorted(self.lags)
+        return ordered[min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))]
+
+
+def stale_payments(provider, older_than):
+    """Payments with ``provider`` still processing and not touched for ``older_than``"""
+    return Payment.objects.filter(
+        provider=provider, status=Payment.PROCESSING, updated_at__lt=timezone.now() - older_than
+    )
+
+
+def _check(service, limiter, payment):
+    limiter.wait()
+    try:
+        return service.get_payment_status(payment)
+    except Exception as e:
+        logger.warning(f"Status check failed for payment {payment.id}: {e}")
+        return None
+    finally:
+        close_old_connections()
+
+
+def _apply(payments, statuses, result):
+    """Save the status changes for one page and confirm the paid orders"""
+    now = timezone.now()
+    changes = {
+        payment.pk: status for payment, status in zip(payments, statuses)
+        if status and status['status'] and status['status'] != payment.status
+    }
+    result.unchanged += sum(1 for status in statuses if status is not None) - len(changes)
+    if not changes:
+        return
+
+    with transaction.atomic():
+        # A webhook may have landed since the page was read
+        locked = list(Payment.objects.select_for_update().filter(pk__in=list(changes), status=Payment.PROCESSING))
+        for payment in locked:
+            status = changes[payment.pk]
+            payment.status = status['status']
+            payment.updated_at = now
+            if payment.status == Payment.COMPLETED:
+                payment.provider_ref = status['reference'] or payment.provider_ref
+                payment.processed_at = now
+            elif payment.status == Payment.FAILED:
+                payment.failure_reason = status['message'] or 'Payment failed'
+                payment.failure_code = 'RECONCILED'
+        Payment.objects.bulk_update(locked, UPDATE_FIELDS)
+
+        paid_orders = [payment.order_id for payment in locked if payment.status == Payment.COMPLETED]
+        if paid_orders:
+            bulk_transition(paid_orders, Order.CONFIRMED, notes='Payment completed (reconciled)')
+
+        for payment in locked:
+            transaction.on_commit(lambda payment=payment: publish_payment_status(payment))
+
+    for payment in locked:
+        result.updated[payment.status] += 1
+        result.lags.append((now - payment.created_at).total_seconds())
+
+
+def reconcile_payments(provider=Payment.AZAMPAY, older_than=None, batch_size=DEFAULT_BATCH_SIZE,
+                       workers=None, rate=None):
+    """
+    Check stale processing payments with their provider and apply the results.
+
+    ``older_than`` (a ``timedelta``) defaults to
+    ``PAYMENT_RECONCILE_AFTER_MINUTES``; ``workers`` and ``rate`` (provider
+    requests per second, 0 for no limit) to ``PAYMENT_RECONCILE_WORKERS``
+    and ``PAYMENT_RECONCILE_RATE``. Returns a ``ReconcileResult``.
+    """
+    if older_than is None:
+        older_than = timedelta(minutes=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 10))
+    workers = workers or getattr(settings, 'PAYMENT_RECONCILE_WORKERS', 8)
+    if rate is None:
+        rate = getattr(settings, 'PAYMENT_RECONCILE_RATE', 10)
+
+    service = import_string(STATUS_CHECKERS[provider])()
+    limiter = RateLimiter(rate)
+    payments = stale_payments(provider, older_than)
+    result = ReconcileResult()
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment-reconcile') as pool:
+        last_id = None
+        while True:
+            page = payments.order_by('pk')
+            if last_id is not None:
+                page = page.filter(pk__gt=last_id)
+            page = list(page[:batch_size])
+            if not page:
+                break
+
+            statuses = list(pool.map(lambda payment: _check(service, limiter, payment), page))
+            result.checked += len(page)
+            result.errors += statuses.count(None)
+            _apply(page, statuses, result)
+            last_id = page[-1].pk
+
+    result.elapsed = time.monotonic() - started
+    logger.info(
+        f"Reconciled {result.checked} {provider} payments: {dict(result.updated)} updated, "
+        f"{result.errors} errors in {result.elapsed:.1f}s"
+    )
+    return result
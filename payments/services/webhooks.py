@@ -0,0 +1,153 @@
+"""
+Payment webhook intake and processing
+
+Provider callbacks only verify and store the raw event, then acknowledge.
+Events are unique on (provider, event_id), so a provider retrying the same
+callback is dropped by the insert itself. Stored events are processed after
+the request on a small in-process worker pool; the ``process_webhooks``
+command picks up anything a worker didn't get to (for example after a
+restart) and ``replay_webhooks`` reprocesses failed events.
+
+Processing is claimed under a row lock and marked done with ``processed``,
+so an event is applied at most once even when several workers see it.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from payments.models import Payment, PaymentWebhook
+
+logger = logging.getLogger(__name__)
+
+# provider -> function applying a stored ``PaymentWebhook`` event
+WEBHOOK_HANDLERS = {
+    Payment.AZAMPAY: 'payments.webhooks.azam_pay.process_event',
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def store_webhook(provider, event_id, event_type, payload):
+    """
+    Persist a webhook event, ignoring it if it was already received.
+
+    Returns ``(webhook_id, pending)``; ``pending`` is false when the event is
+    a duplicate that has already been processed.
+    """
+    PaymentWebhook.objects.bulk_create(
+        [PaymentWebhook(provider=provider, event_id=event_id, event_type=event_type, raw_data=payload)],
+        ignore_conflicts=True
+    )
+    webhook_id, processed = PaymentWebhook.objects.filter(
+        provider=provider, event_id=event_id
+    ).values_list('id', 'processed').get()
+    return webhook_id, not processed
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PAYMENT_WEBHOOK_WORKERS', 2),
+                    thread_name_prefix='payment-webhooks'
+                )
+    return _executor
+
+
+def _process_in_worker(webhook_id):
+    try:
+        process_webhook(webhook_id)
+    except Exception:
+        logger.exception(f"Webhook {webhook_id} processing crashed")
+    finally:
+        close_old_connections()
+
+
+def enqueue_webhook(webhook_id):
+    """Process the event on the worker pool once the current transaction commits"""
+    if not getattr(settings, 'PAYMENT_WEBHOOK_ASYNC', True):
+        transaction.on_commit(lambda: process_webhook(webhook_id))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_process_in_worker, webhook_id))
+
+
+def process_webhook(webhook_id):
+    """
+    Apply a stored event with its provider's handler.
+
+    Returns ``True`` if the event was processed, ``False`` if the handler
+    failed and ``None`` if it was already processed or is being processed
+    by another worker.
+    """
+    try:
+        with transaction.atomic():
+            webhook = PaymentWebhook.objects.select_for_update(skip_locked=True).filter(
+                pk=webhook_id, processed=False
+            ).first()
+            if webhook is None:
+                return None
+
+            handler = import_string(WEBHOOK_HANDLERS[webhook.provider])
+            handler(webhook)
+
+            webhook.processed = True
+            webhook.processed_at = timezone.now()
+            webhook.processing_attempts = F('processing_attempts') + 1
+            webhook.last_processing_error = ''
+            webhook.save(update_fields=[
+                'processed', 'processed_at', 'processing_attempts', 'last_processing_error', 'payment'
+            ])
+    except Exception as e:
+        logger.warning(f"Webhook {webhook_id} processing failed: {e}")
+        PaymentWebhook.objects.filter(pk=webhook_id).update(
+            processing_attempts=F('processing_attempts') + 1,
+            last_processing_error=str(e)[:2000]
+        )
+        return False
+
+    return True
+
+
+def process_pending_webhooks(batch_size=DEFAULT_BATCH_SIZE, failed=False, provider=None, max_attempts=None):
+    """
+    Process unprocessed events in ``id`` order, ``batch_size`` at a time.
+
+    By default only events that were never attempted are picked up;
+    ``failed=True`` reprocesses events that failed before (up to
+    ``max_attempts`` attempts). Returns ``(processed, failed)`` counts.
+    """
+    events = PaymentWebhook.objects.filter(processed=False)
+    if failed:
+        events = events.filter(processing_attempts__gt=0)
+        if max_attempts:
+            events = events.filter(processing_attempts__lt=max_attempts)
+    else:
+        events = events.filter(processing_attempts=0)
+    if provider:
+        events = events.filter(provider=provider)
+
+    done = errors = 0
+    last_id = 0
+    while True:
+        ids = list(events.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        for webhook_id in ids:
+            result = process_webhook(webhook_id)
+            if result:
+                done += 1
+            elif result is False:
+                errors += 1
+        last_id = ids[-1]
+    return done, errors
@@ -1,20 +1,29 @@
 """
 Test Azam Pay Integration
 """
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from django.test import TestCase, override_settings
 from django.conf import settings
-from payments.services.azam_pay import AzamPayAuth, AzamPayCheckout, AzamPayService
+from django.core.cache import cache
+from django.utils import timezone
+from payments.services.azam_pay import (
+    TOKEN_CACHE_KEY, TOKEN_REFRESH_LOCK_KEY, AzamPayAuth, AzamPayCheckout, AzamPayService
+)
 from authentication.models import AzamPayAuthToken
 from unittest.mock import patch, MagicMock
 
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'azam-pay-token'}}
+
 
 class AzamPayAuthTest(TestCase):
     """Test Azam Pay Authentication"""
     
     def setUp(self):
         self.auth_service = AzamPayAuth()
+        AzamPayAuth.clear_cached_token()
     
-    @patch('payments.services.azam_pay.requests.post')
+    @patch('payments.services.http.ProviderHTTPClient.post')
     def test_get_new_token(self, mock_post):
         """Test getting new authentication token"""
         # Mock successful response
@@ -41,6 +50,86 @@ class AzamPayAuthTest(TestCase):
         # Check if token was saved to database
         saved_token = AzamPayAuthToken.objects.latest('created_at')
         self.assertEqual(saved_token.access_token, "test_access_token_123")
+    
+    @patch('payments.services.http.ProviderHTTPClient.post')
+    def test_token_is_reused_until_refresh_margin(self, mock_post):
+        """Test cached token is reused and refreshed before it expires"""
+        expires_at = timezone.now() + timedelta(hours=1)
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "success": True,
+            "data": {"accessToken": "first_token", "expire": str(int(expires_at.timestamp()))}
+        }
+        mock_response.raise_for_status.return_value = None
+        mock_post.return_value = mock_response
+        
+        self.assertEqual(self.auth_service.get_token(), "first_token")
+        self.assertEqual(self.auth_service.get_token(), "first_token")
+        self.assertEqual(mock_post.call_count, 1)
+        
+        # Inside the refresh margin a new token is requested and old rows are pruned
+        mock_response.json.return_value = {
+            "success": True,
+            "data": {"accessToken": "second_token", "expire": str(int(expires_at.timestamp()) + 3600)}
+        }
+        with override_settings(AZAM_PAY_TOKEN_REFRESH_MARGIN=2 * 3600):
+            self.assertEqual(self.auth_service.get_token(), "second_token")
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(
+            list(AzamPayAuthToken.objects.values_list('access_token', flat=True)), ["second_token"]
+        )
+    
+    @patch('payments.services.http.ProviderHTTPClient.post')
+    def test_refresh_without_shared_cache_uses_token_stored_while_waiting(self, mock_post):
+        """Test a worker that waited for the token row lock doesn't refresh again"""
+        stale = {'access_token': 'stale_token', 'expires_at': timezone.now() + timedelta(seconds=10)}
+        fresh = {'access_token': 'fresh_token', 'expires_at': timezone.now() + timedelta(hours=1)}
+        
+        # The dummy cache isn't shared, so the refresh goes through the row lock;
+        # the token is read once before taking it and once after
+        with patch.object(AzamPayAuth, '_stored_token', side_effect=[stale, fresh]), \
+                patch('payments.services.azam_pay.cache.add') as mock_add:
+            self.assertEqual(self.auth_service.get_token(), 'fresh_token')
+        
+        mock_add.assert_not_called()
+        mock_post.assert_not_called()
+    
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @patch('payments.services.azam_pay.cache_is_shared', return_value=True)
+    @patch('payments.services.http.ProviderHTTPClient.post')
+    def test_refresh_lock_winner_uses_token_cached_meanwhile(self, mock_post, mock_shared):
+        """Test a worker taking the refresh lock after another refresh finished doesn't refresh again"""
+        cache.clear()
+        stale = {'access_token': 'stale_token', 'expires_at': timezone.now() + timedelta(seconds=10)}
+        fresh = {'access_token': 'fresh_token', 'expires_at': timezone.now() + timedelta(hours=1)}
+        
+        def refreshed_meanwhile():
+            cache.set(TOKEN_CACHE_KEY, fresh)
+            return stale
+        
+        with patch.object(AzamPayAuth, '_stored_token', side_effect=refreshed_meanwhile):
+            self.assertEqual(self.auth_service.get_token(), 'fresh_token')
+        
+        mock_post.assert_not_called()
+        self.assertIsNone(cache.get(TOKEN_REFRESH_LOCK_KEY))
+    
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @patch('payments.services.azam_pay.TOKEN_POLL_INTERVAL', 0.01)
+    @patch('payments.services.azam_pay.cache_is_shared', return_value=True)
+    @patch('payments.services.http.ProviderHTTPClient.post')
+    def test_waits_for_token_refreshed_by_another_worker(self, mock_post, mock_shared):
+        """Test a worker without a valid token waits for the refresh holding the lock"""
+        fresh = {'access_token': 'fresh_token', 'expires_at': timezone.now() + timedelta(hours=1)}
+        cache.clear()
+        cache.add(TOKEN_REFRESH_LOCK_KEY, True)
+        
+        finish_refresh = threading.Timer(0.05, cache.set, [TOKEN_CACHE_KEY, fresh])
+        finish_refresh.start()
+        self.addCleanup(finish_refresh.cancel)
+        with patch.object(AzamPayAuth, '_stored_token', return_value=None):
+            self.assertEqual(self.auth_service.get_token(), 'fresh_token')
+        
+        mock_post.assert_not_called()
 
 
 class AzamPayCheckoutTest(TestCase):
@@ -50,7 +139,7 @@ class AzamPayCheckoutTest(TestCase):
         self.checkout_service = AzamPayCheckout()
     
     @patch('payments.services.azam_pay.AzamPayAuth.get_token')
-    @patch('payments.services.azam_pay.requests.post')
+    @patch('payments.services.http.ProviderHTTPClient.post')
     def test_mobile_payment(self, mock_post, mock_get_token):
         """Test mobile money payment"""
         # Mock token
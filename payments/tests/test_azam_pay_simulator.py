@@ -0,0 +1,54 @@
+"""
+Test the Azam Pay client against the local simulator
+"""
+import time
+import uuid
+
+from django.test import TestCase, override_settings
+
+from payments.models import Payment
+from payments.services.azam_pay import AzamPayAuth, AzamPayService
+from payments.services.azam_pay_simulator import AzamPaySimulator
+
+
+class AzamPaySimulatorTest(TestCase):
+    """Test token, checkout and status lookups end to end"""
+
+    def setUp(self):
+        self.simulator = AzamPaySimulator(webhook_delay=0, seed=1)
+        url = self.simulator.start()
+        self.addCleanup(self.simulator.stop)
+        settings_override = override_settings(AZAM_PAY_AUTH=url, AZAM_PAY_CHECKOUT_URL=url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        AzamPayAuth.clear_cached_token()
+        self.addCleanup(AzamPayAuth.clear_cached_token)
+
+    def test_checkout_settles(self):
+        """Test a checkout is accepted and later reported as paid"""
+        external_id = str(uuid.uuid4())
+        service = AzamPayService()
+
+        response = service.process_payment({
+            'method': 'mpesa', 'phone_number': '+255712345678', 'amount': 1000.0, 'external_id': external_id,
+        })
+        self.assertTrue(response['success'])
+        transaction = self.simulator.transactions[response['transactionId']]
+        self.assertEqual((transaction['msisdn'], transaction['operator']), ('255712345678', 'Vodacom'))
+
+        time.sleep(0.1)
+        payment = Payment(id=external_id, provider_data=response)
+        status = service.get_payment_status(payment)
+        self.assertEqual(status['status'], Payment.COMPLETED)
+        self.assertEqual(status['reference'], response['transactionId'])
+        self.assertEqual(self.simulator.stats['/AppRegistration/GenerateToken 200'], 1)
+
+    def test_rejected_checkout_raises(self):
+        """Test simulated provider failures surface as payment errors"""
+        self.simulator.failure_rate = 1
+
+        with self.assertRaises(Exception):
+            AzamPayService().process_payment({
+                'method': 'mpesa', 'phone_number': '0712345678', 'amount': 1000.0, 'external_id': 'order-1',
+            })
+        self.assertEqual(self.simulator.stats['/azampay/mno/checkout 400'], 1)
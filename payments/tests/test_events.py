@@ -0,0 +1,139 @@
+"""
+Test the payment status event stream
+"""
+import asyncio
+import json
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from orders.models import Order
+from payments.models import Payment
+from payments.services import events
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'payment-events'}}
+
+
+def parse_events(chunks):
+    events = []
+    for message in ''.join(chunks).split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+        if lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE, PAYMENT_EVENTS_POLL_INTERVAL=0.01,
+    PAYMENT_EVENTS_DB_INTERVAL=60, PAYMENT_EVENTS_TIMEOUT=5
+)
+class PaymentEventStreamTest(TestCase):
+    """Test status changes are pushed to waiting clients"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        order = Order.objects.create(
+            user=self.user, subtotal=Decimal('1000.00'), total_amount=Decimal('1000.00'),
+            shipping_address={}, billing_address={}
+        )
+        self.payment = Payment.objects.create(
+            order=order, provider=Payment.AZAMPAY, provider_ref=f'PENDING-{uuid.uuid4()}',
+            method='mpesa', amount=Decimal('1000.00'), currency='TZS', status=Payment.PROCESSING
+        )
+        self.url = reverse('payments:payment_events', args=[self.payment.id])
+        self.auth = {'AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def complete_payment(self):
+        self.payment.status = Payment.COMPLETED
+        with self.captureOnCommitCallbacks(execute=True):
+            self.payment.save()
+
+    async def read_stream(self, response):
+        return [chunk.decode() async for chunk in response.streaming_content]
+
+    async def test_status_change_is_pushed(self):
+        """Test the stream sends the current status, then the update, then closes"""
+        response = await self.async_client.get(self.url, headers=self.auth)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        async def complete_later():
+            await asyncio.sleep(0.05)
+            await sync_to_async(self.complete_payment)()
+
+        chunks, _ = await asyncio.gather(self.read_stream(response), complete_later())
+
+        events = parse_events(chunks)
+        self.assertEqual([data['status'] for _, data in events], [Payment.PROCESSING, Payment.COMPLETED])
+        self.assertEqual(events[-1][1]['receipt_url'], f"https://payments.example.com/receipt/{self.payment.id}")
+
+    async def test_finished_payment_closes_immediately(self):
+        """Test a finished payment gets one event"""
+        await sync_to_async(self.complete_payment)()
+
+        response = await self.async_client.get(self.url, headers=self.auth)
+        events = parse_events(await self.read_stream(response))
+
+        self.assertEqual(events, [('status', events[0][1])])
+        self.assertEqual(events[0][1]['status'], Payment.COMPLETED)
+
+    async def count_database_reads(self, shared):
+        with override_settings(PAYMENT_EVENTS_DB_INTERVAL=0.02, PAYMENT_EVENTS_TIMEOUT=0.6), \
+                patch.object(events, 'cache_is_shared', return_value=shared), \
+                patch.object(Payment.objects, 'filter', wraps=Payment.objects.filter) as reads:
+            response = await self.async_client.get(self.url, headers=self.auth)
+            events_sent = parse_events(await self.read_stream(response))
+        self.assertEqual([event for event, _ in events_sent], ['status', 'timeout'])
+        return reads.call_count
+
+    async def test_database_reads_back_off_with_a_shared_cache(self):
+        """Test the database is polled at a fixed interval only when the cache isn't shared"""
+        self.assertGreaterEqual(await self.count_database_reads(shared=False), 15)
+        # The view's lookup, then reads 0.02, 0.04, 0.08 and 0.16 seconds apart
+        self.assertLessEqual(await self.count_database_reads(shared=True), 6)
+
+    async def test_unpublished_change_is_read_from_the_database(self):
+        """Test a status written without publishing reaches the stream"""
+        response = await self.async_client.get(self.url, headers=self.auth)
+
+        async def complete_later():
+            await asyncio.sleep(0.05)
+            await Payment.objects.filter(pk=self.payment.pk).aupdate(status=Payment.COMPLETED)
+
+        with override_settings(PAYMENT_EVENTS_DB_INTERVAL=0.02):
+            chunks, _ = await asyncio.gather(self.read_stream(response), complete_later())
+
+        self.assertEqual([data['status'] for _, data in parse_events(chunks)], [Payment.PROCESSING, Payment.COMPLETED])
+
+    async def test_stream_requires_owner(self):
+        """Test other users and anonymous clients can't open the stream"""
+        other = await sync_to_async(User.objects.create_user)(email='other@example.com', username='other', password=None)
+
+        response = await self.async_client.get(self.url, headers={'AUTHORIZATION': f'Bearer {AccessToken.for_user(other)}'})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+
+    def test_wsgi_request_gets_one_event_and_a_retry_hint(self):
+        """Test a request served over WSGI isn't held open while the payment is pending"""
+        with override_settings(PAYMENT_EVENTS_RETRY=3):
+            response = self.client.get(self.url, headers=self.auth)
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('retry: 3000\n', response.content.decode())
+        events_sent = parse_events([response.content.decode()])
+        self.assertEqual([(event, data['status']) for event, data in events_sent], [('status', Payment.PROCESSING)])
+
+    def test_only_asgi_requests_are_streamed(self):
+        """Test ``events_url`` is only offered to requests that can be streamed to"""
+        self.assertFalse(events.streams_events(RequestFactory().get(self.url)))
+        self.assertTrue(events.streams_events(AsyncRequestFactory().get(self.url)))
@@ -0,0 +1,224 @@
+"""
+Test the payment provider HTTP client against a local stub server
+"""
+import socket
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from orders.models import Order
+from payments.models import Payment
+from payments.services.circuit import ProviderUnavailable
+from payments.services.http import ProviderHTTPClient, metrics
+
+User = get_user_model()
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Replies with the next scripted (status, delay) for each request"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            status, delay = server.script.pop(0) if server.script else (200, 0)
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        time.sleep(delay)
+        body = b'{"success": true}'
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up waiting
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProviderHTTPClientTest(SimpleTestCase):
+    """Test pooling, timeouts, retries and metrics"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.client_ports = set()
+        self.server.script = []
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = ProviderHTTPClient(
+            'stub', f'http://127.0.0.1:{self.server.server_port}',
+            connect_timeout=1, read_timeout=0.2, max_retries=2, backoff=0.01
+        )
+        metrics.reset()
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """Test keep-alive connection reuse"""
+        for _ in range(5):
+            self.assertEqual(self.client.get('/status').status_code, 200)
+
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_idempotent_call_is_retried(self):
+        """Test GET is retried after a 503 and a read timeout"""
+        self.server.script = [(503, 0), (200, 0.5)]
+
+        response = self.client.get('/status', operation='status')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+        stats = metrics.snapshot()[0]
+        self.assertEqual((stats['operation'], stats['calls'], stats['errors'], stats['retries']), ('status', 3, 1, 2))
+
+    def test_non_idempotent_call_is_not_retried(self):
+        """Test POST is not retried after a 503 or a read timeout"""
+        self.server.script = [(503, 0)]
+        self.assertEqual(self.client.post('/checkout').status_code, 503)
+
+        self.server.script = [(200, 0.5)]
+        with self.assertRaises(requests.ReadTimeout):
+            self.client.post('/checkout')
+
+        self.assertEqual(self.server.requests, 2)
+
+    def test_failed_connect_is_retried_for_any_call(self):
+        """Test POST is retried when the provider can't be reached"""
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        client = ProviderHTTPClient('stub', f'http://127.0.0.1:{port}', max_retries=2, backoff=0.01)
+
+        with self.assertRaises(requests.ConnectionError):
+            client.post('/checkout', operation='checkout')
+
+        self.assertEqual(metrics.snapshot()[0]['calls'], 3)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'provider-circuit'}},
+    PAYMENT_CIRCUIT_MIN_CALLS=4, PAYMENT_CIRCUIT_ERROR_RATE=0.5, PAYMENT_CIRCUIT_COOLDOWN=1,
+    PAYMENT_CIRCUIT_SLOW_CALL_SECONDS=0.3,
+)
+class ProviderCircuitTest(SimpleTestCase):
+    """Test the circuit breaker and bulkhead in front of provider calls"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.client_ports = set()
+        self.server.script = []
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = ProviderHTTPClient(
+            'stub', f'http://127.0.0.1:{self.server.server_port}', read_timeout=1, max_retries=0
+        )
+        metrics.reset()
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_circuit_opens_and_recovers(self):
+        """Test errors and slow calls open the circuit, and a good trial call closes it"""
+        self.server.script = [(200, 0), (503, 0), (200, 0.4), (500, 0)]
+        for _ in range(4):
+            self.client.get('/status')
+
+        with self.assertRaises(ProviderUnavailable) as raised:
+            self.client.get('/status')
+        self.assertEqual(raised.exception.retry_after, 1)
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(provider_state(self.client), 'open')
+        self.assertEqual(metrics.snapshot()[0]['rejected'], 1)
+
+        time.sleep(1.1)
+        self.assertEqual(self.client.get('/status').status_code, 200)
+        self.assertEqual(provider_state(self.client), 'closed')
+        self.assertEqual(self.server.requests, 5)
+
+    def test_failed_trial_reopens_circuit(self):
+        """Test a failing trial call keeps the circuit open"""
+        cache.set('payments:circuit:stub:state', {'opened_at': time.time() - 2}, None)
+        self.server.script = [(503, 0)]
+
+        self.client.get('/status')
+
+        self.assertEqual(provider_state(self.client), 'open')
+        with self.assertRaises(ProviderUnavailable):
+            self.client.get('/status')
+
+    def test_bulkhead_limits_calls_in_flight(self):
+        """Test calls beyond the concurrency cap are refused"""
+        client = ProviderHTTPClient(
+            'stub', f'http://127.0.0.1:{self.server.server_port}', max_retries=0, max_concurrency=1
+        )
+        client.bulkhead.wait = 0.05
+        self.server.script = [(200, 0.3)]
+        slow_call = threading.Thread(target=client.get, args=['/slow'])
+        slow_call.start()
+        time.sleep(0.1)
+
+        with self.assertRaises(ProviderUnavailable) as raised:
+            client.get('/status')
+        self.assertEqual(raised.exception.reason, 'too many calls in flight')
+        slow_call.join()
+        self.assertEqual(client.get('/status').status_code, 200)
+        client.session.close()
+
+
+
+class MobilePaymentUnavailableTest(APITestCase):
+    """Test a refused provider call is answered with a retryable 503"""
+
+    @patch('payments.views.AzamPayService.process_payment', side_effect=ProviderUnavailable('azam_pay', 'circuit open', 12))
+    def test_refused_payment_stays_pending(self, process_payment):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        order = Order.objects.create(
+            user=user, subtotal=Decimal('1000.00'), total_amount=Decimal('1000.00'),
+            shipping_address={}, billing_address={}
+        )
+        self.client.force_authenticate(user)
+
+        response = self.client.post(reverse('payments:process_mobile_payment'), {
+            'order_id': str(order.id),
+            'payment_method': {'provider': 'azampay', 'method': 'mpesa'},
+            'phone_number': '+255712345678',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '12')
+        self.assertEqual(Payment.objects.get(order=order).status, Payment.PENDING)
+
+
+def provider_state(client):
+    return client.circuit.state()[0]
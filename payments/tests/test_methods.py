@@ -0,0 +1,67 @@
+"""
+Test the payment method eligibility index
+"""
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from payments.models import PaymentMethod
+from payments.services.methods import invalidate_method_index
+
+User = get_user_model()
+
+
+class PaymentMethodsViewTest(APITestCase):
+    """Test methods are filtered by country and currency from the index"""
+
+    def setUp(self):
+        invalidate_method_index()
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        self.client.force_authenticate(user)
+        self.url = reverse('payments:payment_methods')
+
+        PaymentMethod.objects.create(
+            provider='azampay', method='mpesa', name='M-Pesa', sort_order=1,
+            supported_currencies=['TZS'], allowed_countries=['TZ'], fee_percentage='1.50'
+        )
+        PaymentMethod.objects.create(
+            provider='paypal', method='paypal', name='PayPal', sort_order=2,
+            supported_currencies=['USD', 'EUR'], allowed_countries=[], fixed_fee_amount='0.30'
+        )
+        PaymentMethod.objects.create(
+            provider='stripe', method='card', name='Card', sort_order=0, supported_currencies=[]
+        )
+        PaymentMethod.objects.create(
+            provider='dpo', method='card', name='DPO Card', is_active=False, supported_currencies=[]
+        )
+
+    def names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [method['name'] for method in response.data]
+
+    def test_methods_are_filtered(self):
+        """Test country and currency restrictions, defaults and ordering"""
+        self.assertEqual(self.names(), ['Card', 'M-Pesa'])
+        self.assertEqual(self.names(country='US', currency='USD'), ['Card', 'PayPal'])
+        self.assertEqual(self.names(country='KE', currency='TZS'), ['Card'])
+        self.assertEqual(self.names(country='FR', currency='XOF'), ['Card'])
+        self.assertEqual(self.names(country='', currency=''), ['Card', 'M-Pesa', 'PayPal'])
+
+    def test_fees_are_included(self):
+        """Test the precomputed fees match the method"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data[1]['fees'], {'percentage': 1.5, 'fixed_amount': '0.00'})
+
+    def test_saving_a_method_refreshes_the_index(self):
+        """Test changes show up without waiting for the index to expire"""
+        self.assertEqual(self.names(country='KE'), ['Card'])
+
+        method = PaymentMethod.objects.get(name='M-Pesa')
+        method.allowed_countries = ['TZ', 'KE']
+        method.save()
+        self.assertEqual(self.names(country='KE'), ['Card', 'M-Pesa'])
+
+        method.delete()
+        self.assertEqual(self.names(), ['Card'])
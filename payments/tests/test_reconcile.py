@@ -0,0 +1,126 @@
+"""
+Test payment reconciliation against a local Azam Pay stub
+"""
+import json
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from orders.models import Order
+from payments.models import Payment
+from payments.services.azam_pay import AzamPayAuth
+from payments.services.reconcile import reconcile_payments
+
+User = get_user_model()
+
+
+class StubAzamPayHandler(BaseHTTPRequestHandler):
+    """Answers transaction status lookups from ``server.statuses``"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        reference = parse_qs(url.query).get('reference', [''])[0]
+        with self.server.lock:
+            self.server.lookups.append(reference)
+        status = self.server.statuses.get(reference)
+        if url.path != '/azampay/transactionstatus' or status is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({
+            'success': True,
+            'data': {'transactionId': f'TXN-{reference}', 'transactionStatus': status, 'message': status},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaymentReconcileTest(TestCase):
+    """Test stale payments are resolved from the provider's status"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubAzamPayHandler)
+        self.server.lock = threading.Lock()
+        self.server.lookups = []
+        self.server.statuses = {}
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        settings_override = override_settings(AZAM_PAY_CHECKOUT_URL=f'http://127.0.0.1:{self.server.server_port}')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        AzamPayAuth._remember({'access_token': 'stub-token', 'expires_at': timezone.now() + timedelta(hours=1)})
+        self.addCleanup(AzamPayAuth.clear_cached_token)
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_payment(self, provider_status, minutes_ago=30):
+        order = Order.objects.create(
+            user=self.user, subtotal=Decimal('1000.00'), total_amount=Decimal('1000.00'),
+            shipping_address={}, billing_address={}
+        )
+        reference = uuid.uuid4().hex
+        payment = Payment.objects.create(
+            order=order, provider=Payment.AZAMPAY, provider_ref=f'PENDING-{reference}',
+            method='mpesa', amount=Decimal('1000.00'), currency='TZS', status=Payment.PROCESSING,
+            provider_data={'transactionId': reference}
+        )
+        Payment.objects.filter(pk=payment.pk).update(updated_at=timezone.now() - timedelta(minutes=minutes_ago))
+        if provider_status:
+            self.server.statuses[reference] = provider_status
+        return payment
+
+    def test_stale_payments_are_reconciled(self):
+        """Test completed and failed payments are applied in pages"""
+        paid = [self.create_payment('success') for _ in range(3)]
+        failed = self.create_payment('failed')
+        pending = self.create_payment('pending')
+        unknown = self.create_payment(None)
+        recent = self.create_payment('success', minutes_ago=1)
+
+        result = reconcile_payments(older_than=timedelta(minutes=10), batch_size=2, workers=3, rate=0)
+
+        self.assertEqual(result.checked, 6)
+        self.assertEqual(result.updated, {Payment.COMPLETED: 3, Payment.FAILED: 1})
+        self.assertEqual((result.unchanged, result.errors), (1, 1))
+        self.assertEqual(len(self.server.lookups), 6)
+        for payment in paid:
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, Payment.COMPLETED)
+            self.assertEqual(payment.provider_ref, f"TXN-{payment.provider_data['transactionId']}")
+            self.assertEqual(payment.order.status, Order.CONFIRMED)
+            self.assertTrue(payment.order.status_history.filter(new_status=Order.CONFIRMED).exists())
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.order.status), (Payment.FAILED, Order.PENDING))
+        for payment in (pending, unknown, recent):
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, Payment.PROCESSING)
+
+    def test_command_reports_throughput(self):
+        """Test the command prints the counts and lag"""
+        self.create_payment('success')
+        out = StringIO()
+
+        call_command('reconcile_payments', '--older-than', '10', '--rate', '0', stdout=out)
+
+        self.assertIn('Checked 1 payments', out.getvalue())
+        self.assertIn('Lag from payment start', out.getvalue())
+        self.assertIn('Updated: 1 completed', out.getvalue())
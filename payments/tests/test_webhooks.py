@@ -0,0 +1,97 @@
+"""
+Test payment webhook intake and processing
+"""
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from orders.models import Order
+from payments.models import Payment, PaymentWebhook
+from payments.services.webhooks import process_pending_webhooks
+
+User = get_user_model()
+
+
+@override_settings(PAYMENT_WEBHOOK_ASYNC=False, AZAM_PAY_WEBHOOK_TOKEN='')
+class AzamPayWebhookIntakeTest(APITestCase):
+    """Test webhooks are stored once, acknowledged and processed"""
+
+    def setUp(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        self.order = Order.objects.create(
+            user=user, subtotal=Decimal('1000.00'), total_amount=Decimal('1000.00'),
+            shipping_address={}, billing_address={}
+        )
+        self.payment = Payment.objects.create(
+            order=self.order, provider=Payment.AZAMPAY, provider_ref=f'PENDING-{uuid.uuid4()}',
+            method='mpesa', amount=Decimal('1000.00'), currency='TZS', status=Payment.PROCESSING
+        )
+        self.url = reverse('payments:azam_pay_webhook')
+
+    def callback(self, payment_id, status='success'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                self.url,
+                {'externalId': str(payment_id), 'transactionId': 'TXN123', 'status': status},
+                format='json'
+            )
+
+    def test_duplicate_callbacks_are_processed_once(self):
+        """Test provider retries are dropped at insert"""
+        for _ in range(3):
+            self.assertEqual(self.callback(self.payment.id).status_code, 200)
+
+        self.assertEqual(PaymentWebhook.objects.count(), 1)
+        webhook = PaymentWebhook.objects.get()
+        self.assertTrue(webhook.processed)
+        self.assertEqual(webhook.processing_attempts, 1)
+        self.assertEqual(webhook.payment, self.payment)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.COMPLETED)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.CONFIRMED)
+        self.assertEqual(self.order.status_history.filter(new_status=Order.CONFIRMED).count(), 1)
+
+    def test_late_callbacks_do_not_move_a_payment_back(self):
+        """Test a "processing" callback after "success" is ignored"""
+        self.assertEqual(self.callback(self.payment.id, 'success').status_code, 200)
+        self.assertEqual(self.callback(self.payment.id, 'processing').status_code, 200)
+        self.assertEqual(self.callback(self.payment.id, 'failed').status_code, 200)
+
+        self.assertEqual(PaymentWebhook.objects.filter(processed=True).count(), 3)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.COMPLETED)
+        self.assertEqual(self.payment.provider_ref, 'TXN123')
+        self.assertEqual(self.payment.failure_reason, '')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.CONFIRMED)
+
+    def test_failed_events_are_replayed(self):
+        """Test an event that failed is reprocessed by the replay"""
+        missing_id = uuid.uuid4()
+        self.assertEqual(self.callback(missing_id).status_code, 200)
+        webhook = PaymentWebhook.objects.get()
+        self.assertFalse(webhook.processed)
+        self.assertEqual(webhook.processing_attempts, 1)
+
+        self.payment.delete()
+        Payment.objects.create(
+            id=missing_id, order=self.order, provider=Payment.AZAMPAY, provider_ref='PENDING-2',
+            method='mpesa', amount=Decimal('1000.00'), currency='TZS', status=Payment.PROCESSING
+        )
+
+        self.assertEqual(process_pending_webhooks(failed=True), (1, 0))
+        webhook.refresh_from_db()
+        self.assertTrue(webhook.processed)
+        self.assertEqual(webhook.processing_attempts, 2)
+
+    def test_callback_without_external_id_is_rejected(self):
+        """Test invalid callbacks are not stored"""
+        response = self.client.post(self.url, {'status': 'success'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentWebhook.objects.exists())
@@ -14,6 +14,10 @@ urlpatterns = [
     
     # Payment status
     path('<uuid:payment_id>/status/', views.PaymentStatusView.as_view(), name='payment_status'),
+    path('<uuid:payment_id>/events/', views.payment_events, name='payment_events'),
+    
+    # Provider health
+    path('provider-metrics/', views.ProviderMetricsView.as_view(), name='provider_metrics'),
     
     # Payment history
     path('', views.PaymentListView.as_view(), name='payment_list'),
@@ -3,14 +3,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import models
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from datetime import datetime, timedelta
 import uuid
 import logging
 
-from .models import Payment, PaymentMethod
+from .models import Payment
 from orders.models import Order
+from orders.services.idempotency import idempotent
+from orders.services.transitions import confirm_paid_order
 from .serializers import (
     PaymentMethodSerializer, PaymentInitializationSerializer,
     PaymentInitializationResponseSerializer, MobilePaymentSerializer,
@@ -18,6 +25,10 @@ from .serializers import (
     PaymentSerializer
 )
 from .services.azam_pay import AzamPayService
+from .services.circuit import ProviderUnavailable
+from .services.events import payment_event_stream, payment_status_data, payment_status_event, streams_events
+from .services.http import metrics, provider_status
+from .services.methods import available_methods
 
 logger = logging.getLogger(__name__)
 
@@ -50,30 +61,11 @@ class PaymentMethodsView(APIView):
         }
     )
     def get(self, request):
-        # Get payment methods from database
+        # Served from the in-memory eligibility index
         country = request.query_params.get('country', 'TZ')
         currency = request.query_params.get('currency', 'TZS')
         
-        queryset = PaymentMethod.objects.filter(is_active=True)
-        
-        # For SQLite compatibility, we'll filter in Python instead of using contains lookup
-        payment_methods = []
-        
-        for method in queryset.order_by('sort_order', 'name'):
-            # Check country restriction
-            if country and method.allowed_countries:
-                if country not in method.allowed_countries:
-                    continue
-            
-            # Check currency support
-            if currency and method.supported_currencies:
-                if currency not in method.supported_currencies:
-                    continue
-            
-            payment_methods.append(method)
-        
-        serializer = PaymentMethodSerializer(payment_methods, many=True)
-        return Response(serializer.data)
+        return Response(available_methods(country, currency))
 
 
 class PaymentInitializationView(APIView):
@@ -110,7 +102,8 @@ class PaymentInitializationView(APIView):
                     currency=order.currency,
                     provider=payment_method['provider'],
                     method=payment_method['method'],
-                    status='pending'
+                    status='pending',
+                    provider_ref=f"PENDING-{uuid.uuid4().hex}"
                 )
                 
                 # Simulate payment provider integration
@@ -173,13 +166,25 @@ class MobilePaymentView(APIView):
     @extend_schema(
         summary="Process mobile money payment",
         description="Process mobile money payments (M-Pesa, Airtel Money, etc.)",
+        parameters=[
+            OpenApiParameter(
+                name='Idempotency-Key',
+                description='Unique key for this request; retries with the same key replay the first response',
+                required=False,
+                type=str,
+                location=OpenApiParameter.HEADER
+            ),
+        ],
         request=MobilePaymentSerializer,
         responses={
             200: MobilePaymentResponseSerializer,
             400: OpenApiResponse(description="Invalid input"),
             404: OpenApiResponse(description="Order not found"),
+            422: OpenApiResponse(description="Idempotency-Key reused for a different request"),
+            503: OpenApiResponse(description="Payment provider unavailable; retry after the Retry-After header"),
         }
     )
+    @idempotent('payments.mobile')
     def post(self, request):
         serializer = MobilePaymentSerializer(data=request.data)
         if serializer.is_valid():
@@ -198,7 +203,9 @@ class MobilePaymentView(APIView):
                     defaults={
                         'amount': order.total_amount,
                         'currency': order.currency,
-                        'status': 'pending'
+                        'status': 'pending',
+                        # provider_ref is unique; replaced once the provider settles the payment
+                        'provider_ref': f"PENDING-{uuid.uuid4().hex}"
                     }
                 )
                 
@@ -234,9 +241,20 @@ class MobilePaymentView(APIView):
                             'timeout': 300,
                             'status_check_url': f"/api/v1/payments/{payment.id}/status/"
                         }
+                        if streams_events(request):
+                            response_data['events_url'] = f"/api/v1/payments/{payment.id}/events/"
                         
                         return Response(response_data)
                         
+                    except ProviderUnavailable as e:
+                        # Nothing was sent; the payment stays pending so the client can retry
+                        response = Response(
+                            {"error": "Payment provider is temporarily unavailable, please try again shortly"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE
+                        )
+                        response['Retry-After'] = str(e.retry_after)
+                        return response
+                        
                     except Exception as e:
                         logger.error(f"Azam Pay payment failed: {e}")
                         payment.status = 'failed'
@@ -263,6 +281,8 @@ class MobilePaymentView(APIView):
                         'timeout': 300,
                         'status_check_url': f"/api/v1/payments/{payment.id}/status/"
                     }
+                    if streams_events(request):
+                        response_data['events_url'] = f"/api/v1/payments/{payment.id}/events/"
                     
                     return Response(response_data)
                 
@@ -305,38 +325,10 @@ class PaymentStatusView(APIView):
                 payment.provider_ref = f"TXN{uuid.uuid4().hex[:10].upper()}"
                 payment.save()
                 
-                # Update order status
-                payment.order.status = 'confirmed'
-                payment.order.save()
-            
-            if payment.status == 'completed':
-                response_data = {
-                    'payment_id': str(payment.id),
-                    'status': payment.status,
-                    'order_id': str(payment.order.id),
-                    'amount': str(payment.amount),
-                    'currency': payment.currency,
-                    'provider_ref': payment.provider_ref,
-                    'processed_at': payment.processed_at.isoformat() if payment.processed_at else None,
-                    'receipt_url': f"https://payments.example.com/receipt/{payment.id}"
-                }
-            elif payment.status == 'failed':
-                response_data = {
-                    'payment_id': str(payment.id),
-                    'status': payment.status,
-                    'order_id': str(payment.order.id),
-                    'failure_reason': 'Insufficient funds',  # This would come from provider
-                    'failure_code': 'INSUFFICIENT_FUNDS',
-                    'retry_allowed': True
-                }
-            else:
-                response_data = {
-                    'payment_id': str(payment.id),
-                    'status': payment.status,
-                    'order_id': str(payment.order.id),
-                }
+                # Update order status and take the held stock
+                confirm_paid_order(payment.order)
             
-            return Response(response_data)
+            return Response(payment_status_data(payment))
             
         except Payment.DoesNotExist:
             return Response(
@@ -345,6 +337,40 @@ class PaymentStatusView(APIView):
             )
 
 
+@require_GET
+async def payment_events(request, payment_id):
+    """
+    Stream the status of a payment as server-sent events
+
+    Replaces polling ``PaymentStatusView``: the current status is sent at
+    once and again when the payment changes, and the stream closes when the
+    payment is finished. Authenticate with the usual JWT bearer token.
+
+    Only requests served through ``settings.asgi`` are streamed. Over WSGI
+    the current status is sent once and EventSource clients reconnect after
+    ``PAYMENT_EVENTS_RETRY`` seconds, so no worker is held for the wait.
+    """
+    try:
+        authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"error": str(e.detail)}, status=401)
+    if authenticated is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+    user = authenticated[0]
+
+    payment = await Payment.objects.filter(id=payment_id, order__user=user).afirst()
+    if payment is None:
+        return JsonResponse({"error": "Payment not found"}, status=404)
+
+    if streams_events(request):
+        response = StreamingHttpResponse(payment_event_stream(payment), content_type='text/event-stream')
+    else:
+        response = HttpResponse(payment_status_event(payment), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
 class PaymentListView(generics.ListAPIView):
     """
     List payments for the authenticated user
@@ -354,3 +380,24 @@ class PaymentListView(generics.ListAPIView):
     
     def get_queryset(self):
         return Payment.objects.filter(order__user=self.request.user).order_by('-created_at')
+
+
+class ProviderMetricsView(APIView):
+    """
+    Payment provider health for operators
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @extend_schema(
+        summary="Payment provider metrics",
+        description="Circuit breaker state, in-flight calls and per-operation latency and errors "
+                    "for payment provider calls made by this worker",
+        responses={
+            200: OpenApiResponse(description="Provider status and call metrics"),
+        }
+    )
+    def get(self, request):
+        return Response({
+            'providers': provider_status(),
+            'operations': metrics.snapshot(),
+        })
@@ -1,113 +1,151 @@
 """
 Azam Pay webhook handlers
+
+The views only verify and store the callback and acknowledge it; the event
+is applied to the payment and order by ``process_event`` on the webhook
+workers (see ``payments.services.webhooks``).
 """
+import hmac
 import json
 import logging
+from django.conf import settings
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.db import transaction
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
-from payments.models import Payment, PaymentWebhook
+from payments.models import Payment
+from payments.services.events import publish_payment_status
+from payments.services.webhooks import enqueue_webhook, store_webhook
+from orders.services.transitions import confirm_paid_order
 
 logger = logging.getLogger(__name__)
 
+EVENT_TYPE = 'payment_status_update'
+
+# Map Azam Pay status to our payment status
+STATUS_MAPPING = {
+    'success': Payment.COMPLETED,
+    'successful': Payment.COMPLETED,
+    'completed': Payment.COMPLETED,
+    'failed': Payment.FAILED,
+    'pending': Payment.PROCESSING,
+    'processing': Payment.PROCESSING,
+    'cancelled': Payment.CANCELLED,
+    'canceled': Payment.CANCELLED,
+}
+
+# Callbacks only move payments out of these statuses; a late or replayed
+# callback (e.g. "processing" after "success") must not undo a final status
+OPEN_STATUSES = [Payment.PENDING, Payment.PROCESSING]
+
+
+class InvalidWebhook(Exception):
+    """Raised when a callback fails verification"""
+
+
+def _event_status(webhook_data):
+    return webhook_data.get('status') or webhook_data.get('transactionStatus') or ''
+
+
+def receive_webhook(request, webhook_data):
+    """
+    Verify and store an Azam Pay callback and queue it for processing.
+
+    Raises ``InvalidWebhook`` if the callback can't be accepted.
+    """
+    secret = getattr(settings, 'AZAM_PAY_WEBHOOK_TOKEN', '')
+    if secret:
+        supplied = request.headers.get('X-Webhook-Token') or request.GET.get('token', '')
+        if not hmac.compare_digest(supplied, secret):
+            raise InvalidWebhook("Invalid webhook token")
+
+    if not isinstance(webhook_data, dict):
+        raise InvalidWebhook("Invalid webhook payload")
+    external_id = webhook_data.get('externalId')
+    if not external_id:
+        raise InvalidWebhook("Missing external_id")
+
+    # One event per transaction and status, so retries of the same
+    # callback are duplicates but later status changes are not
+    reference = webhook_data.get('transactionId') or f"azam_{external_id}"
+    event_id = f"{reference}:{_event_status(webhook_data).lower()}"
+
+    webhook_id, pending = store_webhook(Payment.AZAMPAY, event_id, EVENT_TYPE, webhook_data)
+    if pending:
+        enqueue_webhook(webhook_id)
+    else:
+        logger.info(f"Duplicate Azam Pay webhook {event_id} ignored")
+    return webhook_id
+
+
+def process_event(webhook):
+    """Apply a stored Azam Pay callback to its payment and order"""
+    webhook_data = webhook.raw_data
+    transaction_id = webhook_data.get('transactionId')
+    external_id = webhook_data.get('externalId')
+    status_value = _event_status(webhook_data)
+
+    # Find the payment by external_id (which should be the payment ID)
+    payment = Payment.objects.select_for_update().select_related('order').filter(id=external_id).first()
+    if payment is None:
+        raise ValueError(f"Payment not found for external_id: {external_id}")
+    webhook.payment = payment
+
+    # Update payment status based on webhook
+    if not status_value:
+        return
+
+    old_status = payment.status
+    new_status = STATUS_MAPPING.get(status_value.lower(), payment.status)
+    if new_status == old_status:
+        return
+
+    changes = {'status': new_status, 'updated_at': timezone.now()}
+    if new_status == Payment.COMPLETED:
+        changes['provider_ref'] = transaction_id or payment.provider_ref
+        changes['processed_at'] = timezone.now()
+    elif new_status == Payment.FAILED:
+        changes['failure_reason'] = webhook_data.get('message', 'Payment failed')
+        changes['failure_code'] = webhook_data.get('errorCode', 'UNKNOWN')
+
+    if not Payment.objects.filter(pk=payment.pk, status__in=OPEN_STATUSES).update(**changes):
+        logger.info(f"Ignoring Azam Pay '{status_value}' callback for payment {payment.id}: already {old_status}")
+        return
+    for field, value in changes.items():
+        setattr(payment, field, value)
+    transaction.on_commit(lambda: publish_payment_status(payment))
+
+    # Update order status
+    if new_status == Payment.COMPLETED and payment.order:
+        confirm_paid_order(payment.order)
+
+    logger.info(f"Payment {payment.id} status updated: {old_status} -> {new_status}")
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class AzamPayWebhookView(APIView):
     """Handle Azam Pay webhook callbacks"""
-    
+
     permission_classes = []  # No authentication required for webhooks
-    
+
     def post(self, request):
-        """Process Azam Pay webhook"""
+        """Store Azam Pay webhook and acknowledge it"""
         try:
-            # Get webhook data
-            webhook_data = request.data if hasattr(request, 'data') else json.loads(request.body)
-            
-            # Log webhook for debugging
+            webhook_data = request.data
             logger.info(f"Azam Pay webhook received: {webhook_data}")
-            
-            # Extract relevant fields
-            transaction_id = webhook_data.get('transactionId')
-            external_id = webhook_data.get('externalId')
-            status_value = webhook_data.get('status') or webhook_data.get('transactionStatus')
-            amount = webhook_data.get('amount')
-            
-            if not external_id:
-                logger.error("No external_id found in webhook data")
-                return Response({"error": "Missing external_id"}, status=400)
-            
-            # Find the payment by external_id (which should be the payment ID)
-            try:
-                payment = Payment.objects.get(id=external_id)
-            except Payment.DoesNotExist:
-                logger.error(f"Payment not found for external_id: {external_id}")
-                return Response({"error": "Payment not found"}, status=404)
-            
-            # Store webhook event
-            webhook_event = PaymentWebhook.objects.create(
-                provider='azampay',
-                event_id=transaction_id or f"azam_{external_id}",
-                event_type='payment_status_update',
-                raw_data=webhook_data,
-                payment=payment
-            )
-            
-            # Update payment status based on webhook
-            if status_value:
-                old_status = payment.status
-                
-                # Map Azam Pay status to our payment status
-                status_mapping = {
-                    'success': 'completed',
-                    'successful': 'completed',
-                    'completed': 'completed',
-                    'failed': 'failed',
-                    'pending': 'processing',
-                    'processing': 'processing',
-                    'cancelled': 'cancelled',
-                    'canceled': 'cancelled',
-                }
-                
-                new_status = status_mapping.get(status_value.lower(), payment.status)
-                
-                if new_status != old_status:
-                    payment.status = new_status
-                    
-                    if new_status == 'completed':
-                        payment.provider_ref = transaction_id
-                        payment.processed_at = timezone.now()
-                        
-                        # Update order status
-                        if payment.order:
-                            payment.order.status = 'confirmed'
-                            payment.order.save()
-                    
-                    elif new_status == 'failed':
-                        payment.failure_reason = webhook_data.get('message', 'Payment failed')
-                        payment.failure_code = webhook_data.get('errorCode', 'UNKNOWN')
-                    
-                    payment.save()
-                    
-                    logger.info(f"Payment {payment.id} status updated: {old_status} -> {new_status}")
-            
-            # Mark webhook as processed
-            webhook_event.processed = True
-            webhook_event.processed_at = timezone.now()
-            webhook_event.save()
-            
+            receive_webhook(request, webhook_data)
             return Response({"status": "success"}, status=200)
-            
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in webhook data")
-            return Response({"error": "Invalid JSON"}, status=400)
-        
+
+        except InvalidWebhook as e:
+            logger.error(f"Rejected Azam Pay webhook: {e}")
+            return Response({"error": str(e)}, status=400)
+
         except Exception as e:
-            logger.error(f"Webhook processing error: {e}")
+            logger.error(f"Webhook intake error: {e}")
             return Response({"error": "Internal server error"}, status=500)
 
 
@@ -117,32 +155,17 @@ def azam_pay_webhook_simple(request):
     """Simple function-based webhook handler"""
     try:
         webhook_data = json.loads(request.body)
-        
+
         # Log for debugging
         logger.info(f"Azam Pay webhook (simple): {webhook_data}")
-        
-        # Process webhook (simplified version)
-        external_id = webhook_data.get('externalId')
-        if external_id:
-            try:
-                payment = Payment.objects.get(id=external_id)
-                status_value = webhook_data.get('status', '').lower()
-                
-                if status_value in ['success', 'successful', 'completed']:
-                    payment.status = 'completed'
-                    payment.provider_ref = webhook_data.get('transactionId')
-                    payment.save()
-                    
-                    # Update order
-                    if payment.order:
-                        payment.order.status = 'confirmed'
-                        payment.order.save()
-                
-            except Payment.DoesNotExist:
-                pass
-        
+
+        receive_webhook(request, webhook_data)
         return HttpResponse("OK", status=200)
-        
+
+    except (json.JSONDecodeError, InvalidWebhook) as e:
+        logger.error(f"Rejected Azam Pay webhook (simple): {e}")
+        return HttpResponse("Bad Request", status=400)
+
     except Exception as e:
         logger.error(f"Simple webhook error: {e}")
         return HttpResponse("Error", status=500)
@@ -0,0 +1,19 @@
+"""
+Management command to recompute artwork rating aggregates from reviews
+"""
+from django.core.management.base import BaseCommand
+
+from reviews.services.ratings import recompute_artwork_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute average rating, review count and star counts on artworks from approved reviews (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('artwork_ids', nargs='*', help='Artworks to recompute (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Artworks per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recomputing artwork ratings...')
+        repaired = recompute_artwork_ratings(options['artwork_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected {repaired} artworks'))
@@ -0,0 +1,19 @@
+"""
+Management command to recount review helpfulness votes
+"""
+from django.core.management.base import BaseCommand
+
+from reviews.services.helpfulness import reconcile_helpfulness_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount helpful and not helpful votes on reviews and fix counters that have drifted (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('review_ids', nargs='*', type=int, help='Reviews to recount (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Reviews per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling review helpfulness counts...')
+        corrected = reconcile_helpfulness_counts(options['review_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} reviews'))
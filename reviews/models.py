@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -70,26 +70,40 @@ class Review(models.Model):
             if self.order.items.filter(artwork=self.artwork).exists():
                 self.is_verified_purchase = True
         
-        super().save(*args, **kwargs)
-        
-        # Update artwork rating after saving review
-        self.update_artwork_rating()
-    
-    def update_artwork_rating(self):
-        """Update the artwork's average rating"""
-        from django.db.models import Avg
-        
-        avg_rating = Review.objects.filter(
-            artwork=self.artwork,
-            is_approved=True
-        ).aggregate(avg_rating=Avg('rating'))['avg_rating']
-        
-        if avg_rating:
-            # Update artwork rating (you'd need to add this field to Artwork model)
-            # self.artwork.average_rating = round(avg_rating, 2)
-            # self.artwork.review_count = self.artwork.reviews.filter(is_approved=True).count()
-            # self.artwork.save(update_fields=['average_rating', 'review_count'])
-            pass
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'artwork_id', 'rating', 'is_approved'
+                ).first()
+            
+            super().save(*args, **kwargs)
+            
+            # Keep the artwork's rating aggregates and cached stats in step
+            self.update_artwork_rating(previous, (self.artwork_id, self.rating, self.is_approved))
+            self.clear_review_stats(self.artwork_id, *(previous[:1] if previous else ()))
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = Review.objects.select_for_update().filter(pk=self.pk).values_list(
+                'artwork_id', 'rating', 'is_approved'
+            ).first()
+            result = super().delete(*args, **kwargs)
+            self.update_artwork_rating(previous, None)
+            self.clear_review_stats(self.artwork_id)
+        return result
+    
+    @staticmethod
+    def update_artwork_rating(previous, current):
+        """Apply a review change to the artwork's average rating and star counts"""
+        from reviews.services.ratings import review_rating_changed
+        review_rating_changed(previous, current)
+    
+    @staticmethod
+    def clear_review_stats(*artwork_ids):
+        """Drop the cached review stats of these artworks once the change commits"""
+        from reviews.services.stats import invalidate_review_stats
+        transaction.on_commit(lambda: invalidate_review_stats(*set(artwork_ids)))
 
 
 class ReviewHelpfulness(models.Model):
@@ -122,26 +136,32 @@ class ReviewHelpfulness(models.Model):
         return f"{self.user.email} found review {self.review.id} {self.vote}"
     
     def save(self, *args, **kwargs):
-        # Update review helpfulness counts
-        old_vote = None
-        if self.pk:
-            old_vote = ReviewHelpfulness.objects.get(pk=self.pk).vote
-        
-        super().save(*args, **kwargs)
-        
-        # Update counts on the review
-        if old_vote != self.vote:
-            if old_vote == self.HELPFUL:
-                self.review.helpful_count = max(0, self.review.helpful_count - 1)
-            elif old_vote == self.NOT_HELPFUL:
-                self.review.not_helpful_count = max(0, self.review.not_helpful_count - 1)
+        with transaction.atomic():
+            old_vote = None
+            if self.pk:
+                old_vote = ReviewHelpfulness.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'vote', flat=True
+                ).first()
             
-            if self.vote == self.HELPFUL:
-                self.review.helpful_count += 1
-            elif self.vote == self.NOT_HELPFUL:
-                self.review.not_helpful_count += 1
+            super().save(*args, **kwargs)
             
-            self.review.save(update_fields=['helpful_count', 'not_helpful_count'])
+            # Move the review's counters by this vote
+            self.update_review_counts(self.review_id, added=self.vote, removed=old_vote)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            old_vote = ReviewHelpfulness.objects.select_for_update().filter(pk=self.pk).values_list(
+                'vote', flat=True
+            ).first()
+            result = super().delete(*args, **kwargs)
+            self.update_review_counts(self.review_id, removed=old_vote)
+        return result
+    
+    @staticmethod
+    def update_review_counts(review_id, added=None, removed=None):
+        """Apply a vote change to the review's helpful and not helpful counts"""
+        from reviews.services.helpfulness import apply_vote_change
+        apply_vote_change(review_id, added=added, removed=removed)
 
 
 class ReviewResponse(models.Model):
@@ -1,10 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Count, Avg
-from django.db import models
 from catalog.models import Artwork
 from orders.models import Order
 from .models import Review, ReviewHelpfulness, ReviewResponse, ReviewReport
+from .services.helpfulness import cast_vote
+from .services.stats import get_review_stats
 
 User = get_user_model()
 
@@ -37,12 +37,8 @@ class ReviewHelpfulnessSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         review = self.context['review']
         
-        # Check if user already voted on this review
-        helpfulness, created = ReviewHelpfulness.objects.update_or_create(
-            review=review,
-            user=user,
-            defaults={'vote': validated_data['vote']}
-        )
+        # Replaces the user's earlier vote on this review, if any
+        helpfulness, created = cast_vote(review, user, validated_data['vote'])
         return helpfulness
 
 
@@ -100,6 +96,40 @@ class ReviewReportSerializer(serializers.ModelSerializer):
         )
 
 
+def remember_review_votes(context, review_ids):
+    """
+    Look up in one query the requesting user's helpfulness votes on
+    ``review_ids``.
+
+    Results are stored in the serializer context so ``user_vote`` fields
+    don't need a query per review.
+    """
+    votes = context.setdefault('review_votes', {})
+    pending = {review_id for review_id in review_ids if review_id not in votes}
+    if not pending:
+        return
+
+    request = context.get('request')
+    user_votes = {}
+    if request and request.user.is_authenticated:
+        user_votes = dict(
+            ReviewHelpfulness.objects.filter(
+                user_id=request.user.id, review_id__in=pending
+            ).values_list('review_id', 'vote')
+        )
+    for review_id in pending:
+        votes[review_id] = user_votes.get(review_id)
+
+
+class ReviewListListSerializer(serializers.ListSerializer):
+    """Resolves ``user_vote`` for the whole page with a single query"""
+    
+    def to_representation(self, data):
+        reviews = list(data.all() if hasattr(data, 'all') else data)
+        remember_review_votes(self.context, [review.pk for review in reviews])
+        return super().to_representation(reviews)
+
+
 class ReviewListSerializer(serializers.ModelSerializer):
     """Serializer for listing reviews (minimal data)"""
     
@@ -119,6 +149,7 @@ class ReviewListSerializer(serializers.ModelSerializer):
             'id', 'user', 'is_verified_purchase', 'helpful_count', 
             'not_helpful_count', 'created_at', 'updated_at'
         ]
+        list_serializer_class = ReviewListListSerializer
     
     def get_helpfulness_score(self, obj):
         """Calculate helpfulness score (helpful votes - not helpful votes)"""
@@ -126,6 +157,9 @@ class ReviewListSerializer(serializers.ModelSerializer):
     
     def get_user_vote(self, obj):
         """Get current user's vote on this review"""
+        votes = self.context.get('review_votes', {})
+        if obj.pk in votes:
+            return votes[obj.pk]
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             vote = ReviewHelpfulness.objects.filter(
@@ -251,46 +285,13 @@ class ReviewStatsSerializer(serializers.Serializer):
     verified_purchase_count = serializers.IntegerField()
     
     def to_representation(self, instance):
-        """Calculate review statistics for an artwork"""
+        """Return the (cached) review statistics for an artwork"""
         artwork_id = instance.get('artwork_id')
         
         if not artwork_id:
             return super().to_representation(instance)
         
-        reviews = Review.objects.filter(
-            artwork_id=artwork_id,
-            is_approved=True
-        )
-        
-        # Calculate statistics
-        total_reviews = reviews.count()
-        
-        if total_reviews == 0:
-            return {
-                'total_reviews': 0,
-                'average_rating': 0,
-                'rating_distribution': {str(i): 0 for i in range(1, 6)},
-                'verified_purchase_count': 0
-            }
-        
-        # Rating statistics
-        rating_stats = reviews.aggregate(
-            avg_rating=models.Avg('rating'),
-            verified_count=Count('id', filter=Q(is_verified_purchase=True))
-        )
-        
-        # Rating distribution
-        rating_distribution = {}
-        for i in range(1, 6):
-            count = reviews.filter(rating=i).count()
-            rating_distribution[str(i)] = count
-        
-        return {
-            'total_reviews': total_reviews,
-            'average_rating': round(rating_stats['avg_rating'] or 0, 2),
-            'rating_distribution': rating_distribution,
-            'verified_purchase_count': rating_stats['verified_count']
-        }
+        return get_review_stats(artwork_id)
 
 
 class ReviewModerationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,119 @@
+"""
+Review helpfulness votes and counters
+
+``Review.helpful_count`` and ``Review.not_helpful_count`` are adjusted with
+F() deltas in the same transaction as the vote row they follow, so
+concurrent votes on one review never overwrite each other's counts.
+``cast_vote`` and ``remove_vote`` do the upsert and delete for the API;
+``ReviewHelpfulness.save`` and ``delete`` apply the deltas.
+``reconcile_helpfulness_counts`` recounts the votes for periodic repairs
+(e.g. votes removed by cascade deletes, which skip
+``ReviewHelpfulness.delete``).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from reviews.models import Review, ReviewHelpfulness
+
+COUNT_FIELDS = {
+    ReviewHelpfulness.HELPFUL: 'helpful_count',
+    ReviewHelpfulness.NOT_HELPFUL: 'not_helpful_count',
+}
+
+
+def apply_vote_change(review_id, added=None, removed=None):
+    """
+    Move the review's counters by one vote in a single UPDATE.
+
+    ``added`` and ``removed`` are vote values (or ``None``); changing a vote
+    passes both.
+    """
+    if added == removed:
+        return
+    updates = {}
+    if removed is not None:
+        field = COUNT_FIELDS[removed]
+        updates[field] = Greatest(F(field) - 1, 0)
+    if added is not None:
+        field = COUNT_FIELDS[added]
+        updates[field] = F(field) + 1
+    Review.objects.filter(pk=review_id).update(**updates)
+
+
+def cast_vote(review, user, vote):
+    """
+    Record ``user``'s vote on ``review``, replacing any earlier vote.
+
+    Returns ``(helpfulness, created)``.
+    """
+    with transaction.atomic():
+        helpfulness = ReviewHelpfulness.objects.select_for_update().filter(review=review, user=user).first()
+        if helpfulness is None:
+            try:
+                with transaction.atomic():
+                    return ReviewHelpfulness.objects.create(review=review, user=user, vote=vote), True
+            except IntegrityError:
+                # The same user voted concurrently (e.g. a double click)
+                helpfulness = ReviewHelpfulness.objects.select_for_update().get(review=review, user=user)
+
+        if helpfulness.vote != vote:
+            helpfulness.vote = vote
+            helpfulness.save(update_fields=['vote'])
+        return helpfulness, False
+
+
+def remove_vote(review, user):
+    """Delete ``user``'s vote on ``review``; returns whether there was one"""
+    with transaction.atomic():
+        helpfulness = ReviewHelpfulness.objects.select_for_update().filter(review=review, user=user).first()
+        if helpfulness is None:
+            return False
+        helpfulness.delete()
+        return True
+
+
+def _vote_count(vote):
+    """Subquery counting the outer review's votes of one kind"""
+    return Coalesce(Subquery(
+        ReviewHelpfulness.objects.filter(review_id=OuterRef('pk'), vote=vote).order_by().values('review_id').annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_helpfulness_counts(review_ids=None, batch_size=500):
+    """
+    Recount the votes of ``review_ids`` (all reviews by default) and fix
+    counters that have drifted. Returns the number of reviews corrected.
+    """
+    reviews = Review.objects.order_by('pk')
+    if review_ids is not None:
+        reviews = reviews.filter(pk__in=review_ids)
+
+    corrected = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            reviews.filter(pk__gt=last_pk).values('pk', 'helpful_count', 'not_helpful_count').annotate(
+                helpful_votes=Count('helpfulness_votes', filter=Q(helpfulness_votes__vote=ReviewHelpfulness.HELPFUL)),
+                not_helpful_votes=Count(
+                    'helpfulness_votes', filter=Q(helpfulness_votes__vote=ReviewHelpfulness.NOT_HELPFUL)
+                ),
+            )[:batch_size]
+        )
+        if not rows:
+            return corrected
+        last_pk = rows[-1]['pk']
+
+        stale = [
+            row['pk'] for row in rows
+            if (row['helpful_count'], row['not_helpful_count']) != (row['helpful_votes'], row['not_helpful_votes'])
+        ]
+        if stale:
+            # Recount inside the UPDATE so votes cast since the read aren't lost
+            Review.objects.filter(pk__in=stale).update(
+                helpful_count=_vote_count(ReviewHelpfulness.HELPFUL),
+                not_helpful_count=_vote_count(ReviewHelpfulness.NOT_HELPFUL),
+            )
+            corrected += len(stale)
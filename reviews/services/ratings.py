@@ -0,0 +1,134 @@
+"""
+Rating aggregates on artworks
+
+``Artwork`` carries ``review_count``, ``average_rating`` and one
+``rating_<n>_count`` per star, covering approved reviews only, so listings
+can show and sort by rating without aggregating reviews. ``Review.save`` and
+``Review.delete`` apply the change as deltas in a single UPDATE (no
+read-modify-write, so concurrent reviews don't lose counts) and then derive
+the average from the stored counts in the same transaction.
+``recompute_artwork_ratings`` rebuilds the aggregates from the reviews for
+backfills and repairs (e.g. reviews removed by cascade deletes, which skip
+``Review.delete``).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from catalog.models import Artwork
+
+STARS = range(1, 6)
+RATING_FIELDS = ['review_count', 'average_rating'] + [f'rating_{star}_count' for star in STARS]
+
+
+def star_field(star):
+    return f'rating_{star}_count'
+
+
+def average_from_counts(counts):
+    """Average rating from ``{star: count}``, rounded to two places"""
+    total = sum(counts.values())
+    if not total:
+        return Decimal('0.00')
+    average = Decimal(sum(star * count for star, count in counts.items())) / total
+    return average.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def apply_rating_change(artwork_id, added=None, removed=None):
+    """
+    Add and/or remove one approved rating on an artwork.
+
+    ``added`` and ``removed`` are star values (or ``None``); changing a
+    review's rating passes both.
+    """
+    deltas = {}
+    if removed is not None:
+        deltas[star_field(removed)] = -1
+    if added is not None:
+        deltas[star_field(added)] = deltas.get(star_field(added), 0) + 1
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    review_delta = sum(deltas.values())
+    if review_delta:
+        deltas['review_count'] = review_delta
+
+    updates = {
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+    with transaction.atomic():
+        if not Artwork.objects.filter(pk=artwork_id).update(**updates):
+            return
+        # The row is locked by the update, so the counts read back are ours
+        counts = Artwork.objects.filter(pk=artwork_id).values(*(star_field(star) for star in STARS)).get()
+        Artwork.objects.filter(pk=artwork_id).update(
+            average_rating=average_from_counts({star: counts[star_field(star)] for star in STARS})
+        )
+
+
+def review_rating_changed(previous, current):
+    """
+    Update the aggregates after a review is created, edited, (un)approved
+    or deleted.
+
+    ``previous`` and ``current`` are ``(artwork_id, rating, is_approved)``
+    tuples, or ``None`` for a review that didn't exist before or doesn't
+    any more.
+    """
+    removed = previous if previous and previous[2] else None
+    added = current if current and current[2] else None
+    if removed and added and removed[0] != added[0]:
+        # Moved to another artwork
+        apply_rating_change(removed[0], removed=removed[1])
+        apply_rating_change(added[0], added=added[1])
+    elif removed or added:
+        apply_rating_change(
+            (added or removed)[0],
+            added=added[1] if added else None,
+            removed=removed[1] if removed else None,
+        )
+
+
+def recompute_artwork_ratings(artwork_ids=None, batch_size=500):
+    """
+    Recompute the aggregates from approved reviews for ``artwork_ids`` (all
+    artworks by default). Returns the number of artworks that were out of
+    date and have been corrected.
+    """
+    artworks = Artwork.objects.order_by('pk').only('pk', *RATING_FIELDS)
+    if artwork_ids is not None:
+        artworks = artworks.filter(pk__in=artwork_ids)
+
+    repaired = 0
+    last_pk = None
+    while True:
+        page = artworks.filter(pk__gt=last_pk) if last_pk is not None else artworks
+        batch = list(page[:batch_size])
+        if not batch:
+            return repaired
+        last_pk = batch[-1].pk
+
+        rows = Artwork.objects.filter(pk__in=[artwork.pk for artwork in batch]).values('pk').annotate(**{
+            f'stars_{star}': Count('reviews', filter=Q(reviews__is_approved=True, reviews__rating=star))
+            for star in STARS
+        })
+        counts = {row['pk']: {star: row[f'stars_{star}'] for star in STARS} for row in rows}
+
+        stale = []
+        for artwork in batch:
+            stars = counts[artwork.pk]
+            expected = {star_field(star): stars[star] for star in STARS}
+            expected['review_count'] = sum(stars.values())
+            expected['average_rating'] = average_from_counts(stars)
+            if any(getattr(artwork, field) != value for field, value in expected.items()):
+                for field, value in expected.items():
+                    setattr(artwork, field, value)
+                stale.append(artwork)
+
+        if stale:
+            Artwork.objects.bulk_update(stale, RATING_FIELDS)
+            repaired += len(stale)
@@ -0,0 +1,79 @@
+"""
+Review statistics per artwork
+
+Total, average, star distribution and verified purchase count over approved
+reviews, computed for any number of artworks in one grouped conditional
+aggregate and cached per artwork for ``REVIEW_STATS_CACHE_TTL`` seconds.
+``Review.save`` and ``Review.delete`` drop the artwork's entry once the
+change commits.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from reviews.models import Review
+from reviews.services.ratings import STARS
+
+STATS_CACHE_KEY = 'reviews:stats:{artwork_id}'
+
+
+def _cache_key(artwork_id):
+    return STATS_CACHE_KEY.format(artwork_id=artwork_id)
+
+
+def empty_stats():
+    return {
+        'total_reviews': 0,
+        'average_rating': 0,
+        'rating_distribution': {str(star): 0 for star in STARS},
+        'verified_purchase_count': 0,
+    }
+
+
+def compute_review_stats(artwork_ids):
+    """Stats for each of ``artwork_ids`` from the database, in one query"""
+    rows = Review.objects.filter(artwork_id__in=artwork_ids, is_approved=True).values('artwork_id').annotate(
+        total_reviews=Count('id'),
+        avg_rating=Avg('rating'),
+        verified_count=Count('id', filter=Q(is_verified_purchase=True)),
+        **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in STARS}
+    ).order_by()
+
+    stats = {artwork_id: empty_stats() for artwork_id in artwork_ids}
+    requested = {str(artwork_id): artwork_id for artwork_id in artwork_ids}
+    for row in rows:
+        stats[requested[str(row['artwork_id'])]] = {
+            'total_reviews': row['total_reviews'],
+            'average_rating': round(row['avg_rating'] or 0, 2),
+            'rating_distribution': {str(star): row[f'stars_{star}'] for star in STARS},
+            'verified_purchase_count': row['verified_count'],
+        }
+    return stats
+
+
+def get_review_stats_many(artwork_ids):
+    """``{artwork_id: stats}`` for ``artwork_ids``, from the cache where possible"""
+    artwork_ids = list(dict.fromkeys(artwork_ids))
+    cached = cache.get_many([_cache_key(artwork_id) for artwork_id in artwork_ids])
+    stats = {
+        artwork_id: cached[_cache_key(artwork_id)]
+        for artwork_id in artwork_ids if _cache_key(artwork_id) in cached
+    }
+
+    missing = [artwork_id for artwork_id in artwork_ids if artwork_id not in stats]
+    if missing:
+        computed = compute_review_stats(missing)
+        cache.set_many(
+            {_cache_key(artwork_id): data for artwork_id, data in computed.items()},
+            getattr(settings, 'REVIEW_STATS_CACHE_TTL', 300)
+        )
+        stats.update(computed)
+    return {artwork_id: stats[artwork_id] for artwork_id in artwork_ids}
+
+
+def get_review_stats(artwork_id):
+    return get_review_stats_many([artwork_id])[artwork_id]
+
+
+def invalidate_review_stats(*artwork_ids):
+    cache.delete_many([_cache_key(artwork_id) for artwork_id in artwork_ids])
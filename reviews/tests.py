@@ -1,3 +1,334 @@
-from django.test import TestCase
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from artists.models import Artist
+from catalog.models import Artwork, Category
+from .models import Review, ReviewHelpfulness
+from .services.helpfulness import cast_vote, reconcile_helpfulness_counts
+from .services.ratings import recompute_artwork_ratings
+from .services.stats import invalidate_review_stats
+
+User = get_user_model()
+
+
+def create_artworks(count):
+    artist_user = User.objects.create_user(email='artist@example.com', username='artist', password=None)
+    artist = Artist.objects.create(user=artist_user, display_name='Asha')
+    category = Category.objects.create(name='Masks', slug='masks')
+    return Artwork.objects.bulk_create([
+        Artwork(
+            artist=artist, category=category, title=f'Mask {i}', slug=f'mask-{i}',
+            description='Mask', material='Wood', dimensions='10 x 10 x 10',
+            price=Decimal('1000.00'), stock_quantity=10, status=Artwork.ACTIVE
+        )
+        for i in range(count)
+    ])
+
+
+def create_reviewers(count):
+    return [
+        User.objects.create_user(email=f'reviewer{i}@example.com', username=f'reviewer{i}', password=None)
+        for i in range(count)
+    ]
+
+
+class ArtworkRatingTests(TestCase):
+    """Rating aggregates kept on the artwork"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artwork, cls.other_artwork = create_artworks(2)
+        cls.reviewers = create_reviewers(3)
+
+    def assertRatings(self, artwork, average, stars):
+        artwork.refresh_from_db()
+        self.assertEqual(artwork.average_rating, Decimal(average))
+        self.assertEqual(artwork.review_count, sum(stars))
+        self.assertEqual([getattr(artwork, f'rating_{star}_count') for star in range(1, 6)], stars)
+
+    def test_reviews_update_the_aggregates(self):
+        first = Review.objects.create(user=self.reviewers[0], artwork=self.artwork, rating=5)
+        Review.objects.create(user=self.reviewers[1], artwork=self.artwork, rating=4)
+        third = Review.objects.create(user=self.reviewers[2], artwork=self.artwork, rating=4)
+        self.assertRatings(self.artwork, '4.33', [0, 0, 0, 2, 1])
+
+        first.rating = 1
+        first.save()
+        self.assertRatings(self.artwork, '3.00', [1, 0, 0, 2, 0])
+
+        third.is_approved = False
+        third.save()
+        self.assertRatings(self.artwork, '2.50', [1, 0, 0, 1, 0])
+
+        third.is_approved = True
+        third.save()
+        self.assertRatings(self.artwork, '3.00', [1, 0, 0, 2, 0])
+
+        first.delete()
+        self.assertRatings(self.artwork, '4.00', [0, 0, 0, 2, 0])
+        self.assertRatings(self.other_artwork, '0.00', [0, 0, 0, 0, 0])
+
+    def test_unapproved_reviews_are_not_counted(self):
+        Review.objects.create(user=self.reviewers[0], artwork=self.artwork, rating=2, is_approved=False)
+
+        self.assertRatings(self.artwork, '0.00', [0, 0, 0, 0, 0])
+
+    def test_recompute_repairs_drift(self):
+        Review.objects.create(user=self.reviewers[0], artwork=self.artwork, rating=3)
+        Review.objects.create(user=self.reviewers[1], artwork=self.artwork, rating=5)
+        # Bulk and cascade deletes skip Review.delete
+        Review.objects.filter(user=self.reviewers[1]).delete()
+        Artwork.objects.filter(pk=self.other_artwork.pk).update(review_count=7, rating_2_count=7)
+
+        self.assertEqual(recompute_artwork_ratings(), 2)
+        self.assertRatings(self.artwork, '3.00', [0, 0, 1, 0, 0])
+        self.assertRatings(self.other_artwork, '0.00', [0, 0, 0, 0, 0])
+        self.assertEqual(recompute_artwork_ratings(), 0)
+
+    def test_recompute_command(self):
+        Artwork.objects.filter(pk=self.artwork.pk).update(review_count=1, rating_5_count=1)
+
+        call_command('recompute_artwork_ratings', str(self.artwork.pk), stdout=StringIO())
+        self.assertRatings(self.artwork, '0.00', [0, 0, 0, 0, 0])
+
+
+class ArtworkRatingOrderingTests(APITestCase):
+    """Artwork list ordering by stored rating"""
+
+    def test_order_by_rating(self):
+        artworks = create_artworks(3)
+        reviewers = create_reviewers(2)
+        for reviewer, rating in zip(reviewers, [3, 5]):
+            Review.objects.create(user=reviewer, artwork=artworks[1], rating=rating)
+        Review.objects.create(user=reviewers[0], artwork=artworks[2], rating=5)
+
+        response = self.client.get(reverse('catalog:artwork_list'), {'ordering': '-rating'})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([artwork['title'] for artwork in results], ['Mask 2', 'Mask 1', 'Mask 0'])
+        self.assertEqual(results[1]['average_rating'], '4.00')
+        self.assertEqual(results[1]['review_count'], 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ReviewStatsTests(APITestCase):
+    """Cached review statistics, one artwork or many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artworks = create_artworks(3)
+        cls.reviewers = create_reviewers(3)
+        for reviewer, rating in zip(cls.reviewers, [5, 4, 4]):
+            Review.objects.create(user=reviewer, artwork=cls.artworks[0], rating=rating)
+        Review.objects.create(user=cls.reviewers[0], artwork=cls.artworks[1], rating=2, is_verified_purchase=True)
+
+    def setUp(self):
+        invalidate_review_stats(*(artwork.pk for artwork in self.artworks))
+
+    def stats(self, artwork):
+        return self.client.get(reverse('reviews:api-artwork-review-stats', args=[artwork.pk]))
+
+    def test_stats_are_computed_once_and_cached(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.stats(self.artworks[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'total_reviews': 3,
+            'average_rating': 4.33,
+            'rating_distribution': {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1},
+            'verified_purchase_count': 0,
+        })
+        # Artwork lookup and one aggregate
+        self.assertEqual(len(context.captured_queries), 2)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.stats(self.artworks[0]).data, response.data)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_review_changes_invalidate_the_stats(self):
+        self.assertEqual(self.stats(self.artworks[0]).data['total_reviews'], 3)
+
+        review = Review.objects.get(user=self.reviewers[0], artwork=self.artworks[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            review.rating = 1
+            review.save()
+        self.assertEqual(self.stats(self.artworks[0]).data['rating_distribution']['1'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        self.assertEqual(self.stats(self.artworks[0]).data['total_reviews'], 2)
+
+    def test_batch_stats(self):
+        url = reverse('reviews:api-artwork-review-stats-batch')
+        ids = [str(artwork.pk) for artwork in self.artworks]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'ids': ','.join(ids)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(list(response.data), ids)
+        self.assertEqual(response.data[ids[0]]['total_reviews'], 3)
+        self.assertEqual(response.data[ids[1]]['verified_purchase_count'], 1)
+        self.assertEqual(response.data[ids[2]]['total_reviews'], 0)
+
+        self.assertEqual(self.client.get(url, {'ids': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class ReviewListVoteTests(APITestCase):
+    """The requesting user's votes are resolved once per page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artworks = create_artworks(1)
+        cls.reviewers = create_reviewers(6)
+        cls.reviews = [
+            Review.objects.create(user=reviewer, artwork=cls.artworks[0], rating=4)
+            for reviewer in cls.reviewers
+        ]
+        cls.voter = cls.reviewers[0]
+        ReviewHelpfulness.objects.create(review=cls.reviews[1], user=cls.voter, vote=ReviewHelpfulness.HELPFUL)
+        ReviewHelpfulness.objects.create(review=cls.reviews[2], user=cls.voter, vote=ReviewHelpfulness.NOT_HELPFUL)
+        # Someone else's vote must not leak into the voter's page
+        ReviewHelpfulness.objects.create(review=cls.reviews[3], user=cls.reviewers[1], vote=ReviewHelpfulness.HELPFUL)
+
+    def list_reviews(self, count):
+        Review.objects.filter(pk__in=[review.pk for review in self.reviews[count:]]).update(is_approved=False)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('reviews:api-review-list'))
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return results, len(context.captured_queries)
+
+    def test_user_votes(self):
+        self.client.force_authenticate(self.voter)
+        results, _ = self.list_reviews(6)
+
+        votes = {review['id']: review['user_vote'] for review in results}
+        self.assertEqual(votes[self.reviews[1].pk], ReviewHelpfulness.HELPFUL)
+        self.assertEqual(votes[self.reviews[2].pk], ReviewHelpfulness.NOT_HELPFUL)
+        self.assertIsNone(votes[self.reviews[3].pk])
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.client.force_authenticate(self.voter)
+        _, six_reviews = self.list_reviews(6)
+        _, two_reviews = self.list_reviews(2)
+
+        self.assertEqual(six_reviews, two_reviews)
+
+
+class ReviewHelpfulnessTests(APITestCase):
+    """Helpfulness votes and the counters on the review"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artworks = create_artworks(1)
+        cls.author, cls.voter, cls.other_voter = create_reviewers(3)
+        cls.review = Review.objects.create(user=cls.author, artwork=cls.artworks[0], rating=4)
+
+    def setUp(self):
+        self.url = reverse('reviews:api-review-helpfulness', args=[self.review.pk])
+        self.client.force_authenticate(self.voter)
+
+    def assertCounts(self, helpful, not_helpful):
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.helpful_count, self.review.not_helpful_count), (helpful, not_helpful))
+
+    def test_vote_change_and_remove(self):
+        self.assertEqual(self.client.post(self.url, {'vote': 'helpful'}).status_code, 201)
+        self.assertCounts(1, 0)
+        self.assertEqual(self.client.post(self.url, {'vote': 'helpful'}).status_code, 200)
+        self.assertCounts(1, 0)
+        self.assertEqual(self.client.post(self.url, {'vote': 'not_helpful'}).status_code, 200)
+        self.assertCounts(0, 1)
+
+        cast_vote(self.review, self.other_voter, ReviewHelpfulness.NOT_HELPFUL)
+        self.assertCounts(0, 2)
+
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertCounts(0, 1)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+
+    def test_cannot_vote_on_own_review(self):
+        self.client.force_authenticate(self.author)
+
+        self.assertEqual(self.client.post(self.url, {'vote': 'helpful'}).status_code, 400)
+        self.assertCounts(0, 0)
+
+    def test_reconcile_fixes_drift(self):
+        cast_vote(self.review, self.voter, ReviewHelpfulness.HELPFUL)
+        cast_vote(self.review, self.other_voter, ReviewHelpfulness.NOT_HELPFUL)
+        Review.objects.filter(pk=self.review.pk).update(helpful_count=5, not_helpful_count=0)
+
+        self.assertEqual(reconcile_helpfulness_counts(), 1)
+        self.assertCounts(1, 1)
+        self.assertEqual(reconcile_helpfulness_counts(), 0)
+
+        # Cascade deletes skip ReviewHelpfulness.delete
+        ReviewHelpfulness.objects.filter(user=self.voter).delete()
+        call_command('reconcile_review_helpfulness', str(self.review.pk), stdout=StringIO())
+        self.assertCounts(0, 1)
+
+
+class ConcurrentHelpfulnessTests(TransactionTestCase):
+    """Many users voting on one review at the same time"""
+
+    VOTERS = 12
+    ROUNDS = 3
+
+    def setUp(self):
+        artwork, = create_artworks(1)
+        author, *self.voters = create_reviewers(self.VOTERS + 1)
+        self.review = Review.objects.create(user=author, artwork=artwork, rating=5)
+
+    def test_no_lost_updates(self):
+        barrier = threading.Barrier(self.VOTERS)
+        errors = []
+
+        def vote(index, user):
+            barrier.wait()
+            try:
+                # Flip the vote a few times, ending on helpful for even voters
+                for step in range(self.ROUNDS):
+                    helpful = (index + step + self.ROUNDS - 1) % 2 == 0
+                    while True:
+                        try:
+                            cast_vote(
+                                self.review, user,
+                                ReviewHelpfulness.HELPFUL if helpful else ReviewHelpfulness.NOT_HELPFUL
+                            )
+                            break
+                        except OperationalError as e:
+                            # SQLite allows a single writer; retry when the database is locked
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(0.01)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=vote, args=(index, user)) for index, user in enumerate(self.voters)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.review.refresh_from_db()
+        helpful = ReviewHelpfulness.objects.filter(review=self.review, vote=ReviewHelpfulness.HELPFUL).count()
+        self.assertEqual(helpful, self.VOTERS // 2)
+        self.assertEqual(self.review.helpful_count, helpful)
+        self.assertEqual(self.review.not_helpful_count, self.VOTERS - helpful)
+        self.assertEqual(reconcile_helpfulness_counts(), 0)
@@ -10,7 +10,7 @@ urlpatterns = [
     path('<int:pk>/', views.ReviewDetailView.as_view(), name='api-review-detail'),
     
     # Review CRUD (authenticated users)
-    path('artwork/<int:artwork_id>/create/', views.ReviewCreateView.as_view(), name='api-review-create'),
+    path('artwork/<uuid:artwork_id>/create/', views.ReviewCreateView.as_view(), name='api-review-create'),
     path('<int:pk>/update/', views.ReviewUpdateView.as_view(), name='api-review-update'),
     path('<int:pk>/delete/', views.ReviewDeleteView.as_view(), name='api-review-delete'),
     
@@ -20,7 +20,8 @@ urlpatterns = [
     path('<int:review_id>/report/', views.ReviewReportCreateView.as_view(), name='api-review-report'),
     
     # Statistics and user reviews
-    path('artwork/<int:artwork_id>/stats/', views.ArtworkReviewStatsView.as_view(), name='api-artwork-review-stats'),
+    path('artwork/<uuid:artwork_id>/stats/', views.ArtworkReviewStatsView.as_view(), name='api-artwork-review-stats'),
+    path('artwork/stats/', views.ArtworkReviewStatsBatchView.as_view(), name='api-artwork-review-stats-batch'),
     path('user/', views.UserReviewsView.as_view(), name='api-my-reviews'),
     path('user/<int:user_id>/', views.UserReviewsView.as_view(), name='api-user-reviews'),
     
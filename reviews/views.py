@@ -9,6 +9,8 @@ API Documentation: /api/docs/
 Base URL: /api/v1/reviews/
 """
 
+import uuid
+
 from rest_framework import generics, permissions, status, filters, serializers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -20,12 +22,17 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
 
 from catalog.models import Artwork
 from orders.models import Order
-from .models import Review, ReviewHelpfulness, ReviewResponse, ReviewReport
+from .models import Review, ReviewResponse, ReviewReport
 from .serializers import (
     ReviewListSerializer, ReviewDetailSerializer, ReviewCreateSerializer, 
     ReviewUpdateSerializer, ReviewHelpfulnessSerializer, ReviewResponseSerializer,
     ReviewReportSerializer, ReviewStatsSerializer, ReviewModerationSerializer
 )
+from .services.helpfulness import cast_vote, remove_vote
+from .services.stats import get_review_stats_many
+
+# Most artworks one batch stats request may ask for
+MAX_STATS_BATCH = 100
 
 
 class ReviewListView(generics.ListAPIView):
@@ -40,9 +47,10 @@ class ReviewListView(generics.ListAPIView):
     ordering = ['-created_at']
     
     def get_queryset(self):
+        # The requesting user's votes are looked up per page by the serializer
         queryset = Review.objects.filter(is_approved=True).select_related(
             'user', 'artwork'
-        ).prefetch_related('helpfulness_votes')
+        )
         
         # Filter by artwork if specified
         artwork_id = self.request.query_params.get('artwork')
@@ -83,10 +91,7 @@ class ReviewDetailView(generics.RetrieveAPIView):
     
     queryset = Review.objects.filter(is_approved=True).select_related(
         'user', 'artwork'
-    ).prefetch_related(
-        'response',
-        'helpfulness_votes'
-    )
+    ).prefetch_related('response')
     serializer_class = ReviewDetailSerializer
     permission_classes = [permissions.AllowAny]
     
@@ -191,35 +196,11 @@ class ReviewHelpfulnessView(APIView):
         )
         
         if serializer.is_valid():
-            # Check if user already has a vote
-            existing_vote = ReviewHelpfulness.objects.filter(
-                review=review, 
-                user=request.user
-            ).first()
-            
-            if existing_vote:
-                # Update existing vote
-                existing_vote.vote = serializer.validated_data['vote']
-                existing_vote.save()
-                
-                # Update review helpfulness counts
-                self._update_helpfulness_counts(review)
-                
-                return Response(
-                    ReviewHelpfulnessSerializer(existing_vote).data,
-                    status=status.HTTP_200_OK
-                )
-            else:
-                # Create new vote
-                helpfulness = serializer.save()
-                
-                # Update review helpfulness counts
-                self._update_helpfulness_counts(review)
-                
-                return Response(
-                    ReviewHelpfulnessSerializer(helpfulness).data,
-                    status=status.HTTP_201_CREATED
-                )
+            helpfulness, created = cast_vote(review, request.user, serializer.validated_data['vote'])
+            return Response(
+                ReviewHelpfulnessSerializer(helpfulness).data,
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -230,37 +211,13 @@ class ReviewHelpfulnessView(APIView):
     def delete(self, request, review_id):
         review = get_object_or_404(Review, id=review_id)
         
-        vote = ReviewHelpfulness.objects.filter(
-            review=review, 
-            user=request.user
-        ).first()
-        
-        if vote:
-            vote.delete()
-            # Update review helpfulness counts
-            self._update_helpfulness_counts(review)
+        if remove_vote(review, request.user):
             return Response(status=status.HTTP_204_NO_CONTENT)
         
         return Response(
             {'error': 'Vote not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    
-    def _update_helpfulness_counts(self, review):
-        """Update helpfulness counts on the review"""
-        helpful_count = ReviewHelpfulness.objects.filter(
-            review=review, 
-            vote='helpful'
-        ).count()
-        
-        not_helpful_count = ReviewHelpfulness.objects.filter(
-            review=review, 
-            vote='not_helpful'
-        ).count()
-        
-        review.helpful_count = helpful_count
-        review.not_helpful_count = not_helpful_count
-        review.save(update_fields=['helpful_count', 'not_helpful_count'])
 
 
 class ReviewResponseCreateView(generics.CreateAPIView):
@@ -331,6 +288,40 @@ class ArtworkReviewStatsView(APIView):
         return Response(serializer.data)
 
 
+class ArtworkReviewStatsBatchView(APIView):
+    """Get review statistics for several artworks at once"""
+    
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        summary="Get review statistics for several artworks",
+        description=(
+            f"Review statistics keyed by artwork ID for up to {MAX_STATS_BATCH} artworks, "
+            "e.g. to show ratings on a list page. Unknown artworks get empty statistics."
+        ),
+        parameters=[
+            OpenApiParameter(name='ids', description='Comma-separated artwork IDs', required=True, type=str),
+        ],
+        responses={200: OpenApiResponse(description='Statistics keyed by artwork ID')}
+    )
+    def get(self, request):
+        raw_ids = [value.strip() for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        if not raw_ids:
+            return Response({'error': 'ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw_ids) > MAX_STATS_BATCH:
+            return Response(
+                {'error': f'At most {MAX_STATS_BATCH} artwork IDs per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            artwork_ids = [uuid.UUID(value) for value in raw_ids]
+        except ValueError:
+            return Response({'error': 'ids must be artwork UUIDs'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        stats = get_review_stats_many(artwork_ids)
+        return Response({str(artwork_id): data for artwork_id, data in stats.items()})
+
+
 class UserReviewsView(generics.ListAPIView):
     """Get reviews by a specific user"""
     
@@ -309,4 +309,69 @@ AZAM_PAY_CHECKOUT_URL = config("AZAM_PAY_CHECKOUT_URL", default="no_checkout_url
 AZAM_PAY_APP_NAME = config("AZAM_PAY_APP_NAME", default="no_app_name")
 AZAM_PAY_CLIENT_ID = config("AZAM_PAY_CLIENT_ID", default="no_client_id")
 AZAM_PAY_CLIENT_SECRET = config("AZAM_PAY_CLIENT_SECRET", default="no_client_secret")
-TOKEN = config("TOKEN", default="no_token")
\ No newline at end of file
+TOKEN = config("TOKEN", default="no_token")
+# Refresh the cached Azam Pay token this many seconds before it expires
+AZAM_PAY_TOKEN_REFRESH_MARGIN = config("AZAM_PAY_TOKEN_REFRESH_MARGIN", default=300, cast=int)
+
+# Payment provider HTTP calls
+PAYMENT_HTTP_CONNECT_TIMEOUT = config("PAYMENT_HTTP_CONNECT_TIMEOUT", default=3.05, cast=float)
+PAYMENT_HTTP_READ_TIMEOUT = config("PAYMENT_HTTP_READ_TIMEOUT", default=15, cast=float)
+PAYMENT_HTTP_MAX_RETRIES = config("PAYMENT_HTTP_MAX_RETRIES", default=2, cast=int)
+PAYMENT_HTTP_BACKOFF = config("PAYMENT_HTTP_BACKOFF", default=0.3, cast=float)
+PAYMENT_HTTP_POOL_SIZE = config("PAYMENT_HTTP_POOL_SIZE", default=10, cast=int)
+# Circuit breaker: open when at least MIN_CALLS calls in a WINDOW-second
+# window fail (errors, 5xx or slower than SLOW_CALL_SECONDS) at ERROR_RATE or
+# more, and refuse calls for COOLDOWN seconds
+PAYMENT_CIRCUIT_WINDOW = config("PAYMENT_CIRCUIT_WINDOW", default=60, cast=int)
+PAYMENT_CIRCUIT_MIN_CALLS = config("PAYMENT_CIRCUIT_MIN_CALLS", default=10, cast=int)
+PAYMENT_CIRCUIT_ERROR_RATE = config("PAYMENT_CIRCUIT_ERROR_RATE", default=0.5, cast=float)
+PAYMENT_CIRCUIT_SLOW_CALL_SECONDS = config("PAYMENT_CIRCUIT_SLOW_CALL_SECONDS", default=5, cast=float)
+PAYMENT_CIRCUIT_COOLDOWN = config("PAYMENT_CIRCUIT_COOLDOWN", default=30, cast=int)
+# Bulkhead: provider calls in flight per worker process, and how long a call
+# waits for a free slot
+PAYMENT_PROVIDER_MAX_CONCURRENCY = config("PAYMENT_PROVIDER_MAX_CONCURRENCY", default=10, cast=int)
+PAYMENT_BULKHEAD_WAIT = config("PAYMENT_BULKHEAD_WAIT", default=0.5, cast=float)
+
+# Payment webhooks: processed on an in-process worker pool after intake
+PAYMENT_WEBHOOK_ASYNC = config("PAYMENT_WEBHOOK_ASYNC", default=True, cast=bool)
+PAYMENT_WEBHOOK_WORKERS = config("PAYMENT_WEBHOOK_WORKERS", default=2, cast=int)
+# Shared secret expected in the X-Webhook-Token header or ?token= (optional)
+AZAM_PAY_WEBHOOK_TOKEN = config("AZAM_PAY_WEBHOOK_TOKEN", default="")
+# Payment status event streams: how long they stay open, how often they
+# check the cache channel and the database (doubling after each read when the
+# cache is shared), and keep-alive interval (seconds)
+PAYMENT_EVENTS_TIMEOUT = config("PAYMENT_EVENTS_TIMEOUT", default=300, cast=int)
+PAYMENT_EVENTS_POLL_INTERVAL = config("PAYMENT_EVENTS_POLL_INTERVAL", default=0.5, cast=float)
+PAYMENT_EVENTS_DB_INTERVAL = config("PAYMENT_EVENTS_DB_INTERVAL", default=5, cast=float)
+PAYMENT_EVENTS_KEEPALIVE = config("PAYMENT_EVENTS_KEEPALIVE", default=15, cast=float)
+PAYMENT_EVENTS_RETRY = config("PAYMENT_EVENTS_RETRY", default=5, cast=float)
+# reconcile_payments: check payments processing for longer than this with
+# the provider, using this many threads and at most this many requests/second
+PAYMENT_RECONCILE_AFTER_MINUTES = config("PAYMENT_RECONCILE_AFTER_MINUTES", default=10, cast=int)
+PAYMENT_RECONCILE_WORKERS = config("PAYMENT_RECONCILE_WORKERS", default=8, cast=int)
+PAYMENT_RECONCILE_RATE = config("PAYMENT_RECONCILE_RATE", default=10, cast=float)
+# How long a process keeps its payment method eligibility index before reloading it
+PAYMENT_METHOD_INDEX_TTL = config("PAYMENT_METHOD_INDEX_TTL", default=300, cast=int)
+
+# Orders
+# Order numbers reserved per process at a time
+ORDER_NUMBER_BLOCK_SIZE = config("ORDER_NUMBER_BLOCK_SIZE", default=20, cast=int)
+# How long checkout holds stock while waiting for payment
+INVENTORY_HOLD_TTL_MINUTES = config("INVENTORY_HOLD_TTL_MINUTES", default=15, cast=int)
+# Idempotency-Key replay window and how long a retry waits for the first request
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+IDEMPOTENCY_WAIT_SECONDS = config("IDEMPOTENCY_WAIT_SECONDS", default=10, cast=int)
+# Finished orders older than this are moved to the archive by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = config("ORDER_ARCHIVE_AFTER_DAYS", default=365, cast=int)
+
+# Shipping
+# How long a process keeps its shipping rate index before reloading it
+SHIPPING_RATE_INDEX_TTL = config("SHIPPING_RATE_INDEX_TTL", default=300, cast=int)
+# Weight used for artworks without one when quoting shipping
+SHIPPING_DEFAULT_ITEM_WEIGHT_KG = config("SHIPPING_DEFAULT_ITEM_WEIGHT_KG", default="1.0")
+# How long whole-cart shipping quotes are cached
+SHIPPING_QUOTE_CACHE_TTL = config("SHIPPING_QUOTE_CACHE_TTL", default=600, cast=int)
+
+# Reviews
+# How long per-artwork review statistics are cached
+REVIEW_STATS_CACHE_TTL = config("REVIEW_STATS_CACHE_TTL", default=300, cast=int)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import ShippingMethod, Shipment, ShipmentEvent, ShippingRate
+from .services.quotes import invalidate_rate_index
 
 
 @admin.register(ShippingMethod)
@@ -9,6 +10,11 @@ class ShippingMethodAdmin(admin.ModelAdmin):
     list_filter = ('carrier', 'is_active')
     search_fields = ('name', 'carrier')
     ordering = ('name',)
+    
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes skip ShippingMethod.delete, which refreshes the rate index
+        super().delete_queryset(request, queryset)
+        invalidate_rate_index()
 
 
 @admin.register(ShippingRate)
@@ -17,6 +23,11 @@ class ShippingRateAdmin(admin.ModelAdmin):
     list_display = ('shipping_method', 'base_rate', 'per_kg_rate')
     search_fields = ('shipping_method__name',)
     ordering = ('shipping_method',)
+    
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes skip ShippingRate.delete, which refreshes the rate index
+        super().delete_queryset(request, queryset)
+        invalidate_rate_index()
 
 
 @admin.register(Shipment)
@@ -44,6 +44,21 @@ class ShippingMethod(models.Model):
     def __str__(self):
         return f"{self.name} ({self.carrier})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_rate_index()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_rate_index()
+        return result
+    
+    @staticmethod
+    def _invalidate_rate_index():
+        # Quotes are served from an in-memory index of methods and rates
+        from .services.quotes import invalidate_rate_index
+        invalidate_rate_index()
+    
     def calculate_cost(self, weight, destination_country='TZ'):
         """Calculate shipping cost based on weight and destination"""
         if self.domestic_only and destination_country != 'TZ':
@@ -218,6 +233,21 @@ class ShippingRate(models.Model):
     def __str__(self):
         return f"{self.shipping_method.name} - {self.country} ({self.min_weight}-{self.max_weight}kg)"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_rate_index()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_rate_index()
+        return result
+    
+    @staticmethod
+    def _invalidate_rate_index():
+        # Quotes are served from an in-memory index of methods and rates
+        from .services.quotes import invalidate_rate_index
+        invalidate_rate_index()
+    
     def calculate_cost(self, weight):
         """Calculate cost for this rate given a weight"""
         if weight < self.min_weight or weight > self.max_weight:
@@ -45,6 +45,39 @@ class ShippingCostResponseSerializer(serializers.Serializer):
     delivery_window = serializers.CharField()
 
 
+class ShippingQuoteRequestSerializer(serializers.Serializer):
+    artwork_ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False,
+        help_text='Artworks to quote (repeat an id for more copies); defaults to the cart'
+    )
+    country = serializers.CharField(max_length=2, default='TZ')
+    region = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    service_level = serializers.CharField(max_length=50, default='standard')
+    
+    def validate_country(self, value):
+        return value.upper()
+
+
+class ShippingQuoteSerializer(serializers.Serializer):
+    method_id = serializers.IntegerField()
+    method_name = serializers.CharField()
+    carrier = serializers.CharField()
+    cost = serializers.DecimalField(max_digits=10, decimal_places=2)
+    service_level = serializers.CharField()
+    min_delivery_days = serializers.IntegerField()
+    max_delivery_days = serializers.IntegerField()
+    delivery_window = serializers.SerializerMethodField()
+    
+    def get_delivery_window(self, obj):
+        return f"{obj['min_delivery_days']}-{obj['max_delivery_days']} business days"
+
+
+class ShippingQuoteResponseSerializer(serializers.Serializer):
+    weight = serializers.DecimalField(max_digits=12, decimal_places=3)
+    currency = serializers.CharField(default='TZS')
+    quotes = ShippingQuoteSerializer(many=True)
+
+
 class ShipmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Shipment
@@ -0,0 +1,261 @@
+"""
+Shipping quote engine
+
+Active shipping methods and their ``ShippingRate`` weight bands are loaded
+into an in-process index keyed by (method, country, service level, region),
+with the bands of each key sorted so the matching band is found with a
+bisect. Quoting every method for a cart is then a pure in-memory pass.
+
+The index is rebuilt when a method or rate is saved or deleted, including
+the admin's bulk delete action (a version number in the shared cache tells
+other processes to reload), and at least every ``SHIPPING_RATE_INDEX_TTL``
+seconds. ``QuerySet.update()`` and ``QuerySet.delete()`` skip the model hooks,
+so call ``invalidate_rate_index`` after them; otherwise changes show up within
+the TTL. The version needs a shared cache: with the dummy cache other
+processes only reload on the TTL. Methods with no rate table for a
+destination fall back to ``ShippingMethod.calculate_cost``.
+
+Quotes for a whole cart are cached per (cart contents, destination) for
+``SHIPPING_QUOTE_CACHE_TTL`` seconds; the key includes the index version, so
+rate changes are picked up immediately.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from catalog.models import Artwork, CartItem
+from shipping.models import ShippingMethod, ShippingRate
+
+logger = logging.getLogger(__name__)
+
+RATE_INDEX_VERSION_KEY = 'shipping:rate_index:version'
+CART_QUOTES_CACHE_KEY = 'shipping:quotes:{version}:{destination}:{digest}'
+DEFAULT_SERVICE_LEVEL = 'standard'
+DOMESTIC_COUNTRY = 'TZ'
+
+_lock = threading.Lock()
+_index = None
+
+
+@dataclass
+class ShippingQuote:
+    method: ShippingMethod
+    cost: Decimal
+    min_delivery_days: int
+    max_delivery_days: int
+    service_level: str
+    rate_id: int = None
+
+
+class RateIndex:
+    """In-memory view of active shipping methods and rate bands"""
+
+    def __init__(self, methods, rates, version):
+        self.methods = methods
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.bands = {}
+
+        for rate in sorted(rates, key=lambda rate: rate.min_weight):
+            key = (rate.shipping_method_id, rate.country, rate.service_level, rate.region)
+            min_weights, band_rates = self.bands.setdefault(key, ([], []))
+            min_weights.append(rate.min_weight)
+            band_rates.append(rate)
+
+    @classmethod
+    def load(cls, version):
+        methods = list(ShippingMethod.objects.filter(is_active=True).order_by('sort_order', 'name'))
+        rates = list(ShippingRate.objects.filter(is_active=True, shipping_method__is_active=True))
+        return cls(methods, rates, version)
+
+    def find_rate(self, method_id, country, service_level, weight, region=''):
+        """
+        The band covering ``weight``, preferring region-specific rates.
+
+        Returns ``(rate, has_rate_table)``; ``has_rate_table`` tells whether
+        the method has any bands for this destination at all.
+        """
+        regions = [region, ''] if region else ['']
+        has_rate_table = False
+        for band_region in regions:
+            band = self.bands.get((method_id, country, service_level, band_region))
+            if not band:
+                continue
+            has_rate_table = True
+            min_weights, band_rates = band
+            position = bisect.bisect_right(min_weights, weight) - 1
+            if position >= 0 and weight <= band_rates[position].max_weight:
+                return band_rates[position], True
+        return None, has_rate_table
+
+    def quote(self, method, country, weight, service_level=DEFAULT_SERVICE_LEVEL, region=''):
+        """Quote one method, or ``None`` if it can't ship to ``country`` at ``weight``"""
+        rate, has_rate_table = self.find_rate(method.id, country, service_level, weight, region)
+        if rate is None and has_rate_table:
+            return None  # Outside every weight band for this destination
+        if rate is not None:
+            cost = (rate.base_rate + rate.per_kg_rate * weight).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            return ShippingQuote(
+                method=method,
+                cost=cost,
+                min_delivery_days=rate.min_delivery_days,
+                max_delivery_days=rate.max_delivery_days,
+                service_level=service_level,
+                rate_id=rate.id,
+            )
+
+        cost = method.calculate_cost(weight, country)
+        if cost is None:
+            return None
+        return ShippingQuote(
+            method=method,
+            cost=cost,
+            min_delivery_days=method.min_delivery_days,
+            max_delivery_days=method.max_delivery_days,
+            service_level=service_level,
+        )
+
+    def quote_all(self, country, weight, service_level=DEFAULT_SERVICE_LEVEL, region=''):
+        """Quotes for every method that can ship, cheapest first"""
+        quotes = [
+            quote for quote in (
+                self.quote(method, country, weight, service_level, region) for method in self.methods
+            )
+            if quote is not None
+        ]
+        return sorted(quotes, key=lambda quote: (quote.cost, quote.max_delivery_days))
+
+
+def get_rate_index():
+    """Return the current rate index, reloading it if it changed or expired"""
+    global _index
+
+    version = cache.get(RATE_INDEX_VERSION_KEY)
+    ttl = getattr(settings, 'SHIPPING_RATE_INDEX_TTL', 300)
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.loaded_at < ttl:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.loaded_at >= ttl:
+            index = _index = RateIndex.load(version)
+            logger.debug(f"Loaded shipping rate index (version {version})")
+    return index
+
+
+def invalidate_rate_index():
+    """Drop this process's index and tell other processes to reload theirs"""
+    global _index
+
+    _index = None
+    try:
+        cache.incr(RATE_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(RATE_INDEX_VERSION_KEY, 1, None)
+
+
+def default_item_weight():
+    return Decimal(str(getattr(settings, 'SHIPPING_DEFAULT_ITEM_WEIGHT_KG', 1)))
+
+
+def items_weight(cart_items):
+    """Total weight of already loaded cart items (artworks without a weight use the default)"""
+    default_weight = default_item_weight()
+    return sum(
+        ((item.artwork.weight if item.artwork.weight is not None else default_weight) * item.quantity
+         for item in cart_items),
+        Decimal('0')
+    )
+
+
+def quote_shipping(method, country=DOMESTIC_COUNTRY, weight=Decimal('0'), service_level=DEFAULT_SERVICE_LEVEL, region=''):
+    """Quote a single method from the shared index"""
+    return get_rate_index().quote(method, country, weight, service_level, region)
+
+
+def quote_all_methods(country=DOMESTIC_COUNTRY, weight=Decimal('0'), service_level=DEFAULT_SERVICE_LEVEL, region=''):
+    """Quote every active method from the shared index, cheapest first"""
+    return get_rate_index().quote_all(country, weight, service_level, region)
+
+
+def cart_lines(cart_id):
+    """``(artwork_id, quantity, weight)`` for each item in a cart, in one query"""
+    return list(CartItem.objects.filter(cart_id=cart_id).values_list('artwork_id', 'quantity', 'artwork__weight'))
+
+
+def artwork_lines(artwork_quantities):
+    """
+    ``(artwork_id, quantity, weight)`` for active artworks, from a list of
+    artwork ids (an id listed more than once counts as that many copies) or
+    an ``{artwork_id: quantity}`` mapping. Unknown and inactive ids are skipped.
+    """
+    if isinstance(artwork_quantities, dict):
+        pairs = artwork_quantities.items()
+    else:
+        pairs = ((artwork_id, 1) for artwork_id in artwork_quantities)
+    quantities = Counter()
+    for artwork_id, quantity in pairs:
+        quantities[str(artwork_id)] += quantity
+
+    weights = Artwork.objects.filter(id__in=quantities, status=Artwork.ACTIVE).values_list('id', 'weight')
+    return [(artwork_id, quantities[str(artwork_id)], weight) for artwork_id, weight in weights]
+
+
+def lines_weight(lines):
+    default_weight = default_item_weight()
+    return sum(
+        ((weight if weight is not None else default_weight) * quantity for _, quantity, weight in lines),
+        Decimal('0')
+    )
+
+
+def _lines_digest(lines):
+    raw = ';'.join(
+        f"{artwork_id}:{quantity}:{weight}" for artwork_id, quantity, weight in sorted(lines, key=lambda line: str(line[0]))
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def quote_cart(lines, country=DOMESTIC_COUNTRY, service_level=DEFAULT_SERVICE_LEVEL, region=''):
+    """
+    Quotes from every eligible method for the given cart lines, cheapest first.
+
+    Returns ``{'weight': ..., 'quotes': [...]}`` with each quote as a plain
+    dict so the result can be cached.
+    """
+    key = CART_QUOTES_CACHE_KEY.format(
+        version=cache.get(RATE_INDEX_VERSION_KEY),
+        destination=f"{country}:{region}:{service_level}",
+        digest=_lines_digest(lines),
+    )
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    weight = lines_weight(lines)
+    quotes = [
+        {
+            'method_id': quote.method.id,
+            'method_name': quote.method.name,
+            'carrier': quote.method.carrier,
+            'cost': quote.cost,
+            'min_delivery_days': quote.min_delivery_days,
+            'max_delivery_days': quote.max_delivery_days,
+            'service_level': quote.service_level,
+            'rate_id': quote.rate_id,
+        }
+        for quote in quote_all_methods(country, weight, service_level, region)
+    ]
+
+    result = {'weight': weight, 'quotes': quotes}
+    cache.set(key, result, getattr(settings, 'SHIPPING_QUOTE_CACHE_TTL', 600))
+    return result
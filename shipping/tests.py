@@ -1,3 +1,207 @@
-from django.test import TestCase
+import uuid
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from artists.models import Artist
+from catalog.models import Artwork, Cart, CartItem, Category
+from .admin import ShippingRateAdmin
+from .models import ShippingMethod, ShippingRate
+from .services.quotes import (
+    RATE_INDEX_VERSION_KEY, _lines_digest, artwork_lines, get_rate_index, invalidate_rate_index, quote_cart
+)
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_method(**kwargs):
+    fields = {
+        'name': 'Standard', 'carrier': 'DHL', 'base_cost': Decimal('5000.00'),
+        'cost_per_kg': Decimal('2000.00'), 'min_delivery_days': 3, 'max_delivery_days': 7,
+    }
+    fields.update(kwargs)
+    return ShippingMethod.objects.create(**fields)
+
+
+def create_rate(method, min_weight, max_weight, base_rate, **kwargs):
+    fields = {
+        'country': 'TZ', 'per_kg_rate': Decimal('0'), 'min_delivery_days': 1, 'max_delivery_days': 2,
+    }
+    fields.update(kwargs)
+    return ShippingRate.objects.create(
+        shipping_method=method, min_weight=Decimal(min_weight), max_weight=Decimal(max_weight),
+        base_rate=Decimal(base_rate), **fields
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RateIndexTests(TestCase):
+    """Weight band lookup in the in-memory rate index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.method = create_method()
+        cls.light = create_rate(cls.method, '0.5', '2', '3000.00')
+        cls.heavy = create_rate(cls.method, '2', '10', '8000.00')
+        cls.bulky = create_rate(cls.method, '20', '30', '20000.00')
+
+    def setUp(self):
+        cache.clear()
+        invalidate_rate_index()
+
+    def find(self, weight, method=None, **kwargs):
+        rate, has_rate_table = get_rate_index().find_rate(
+            (method or self.method).id, kwargs.pop('country', 'TZ'), 'standard', Decimal(weight), **kwargs
+        )
+        return rate.id if rate else None, has_rate_table
+
+    def test_band_edges(self):
+        cases = [
+            ('0.5', self.light.id),  # min_weight is inclusive
+            ('1.999', self.light.id),
+            ('2', self.heavy.id),  # a shared edge goes to the heavier band
+            ('10', self.heavy.id),  # max_weight is inclusive
+            ('20', self.bulky.id),
+            ('30', self.bulky.id),
+        ]
+        for weight, expected in cases:
+            with self.subTest(weight=weight):
+                self.assertEqual(self.find(weight), (expected, True))
+
+    def test_weights_outside_every_band(self):
+        for weight in ['0', '0.499', '10.001', '15', '30.001']:
+            with self.subTest(weight=weight):
+                self.assertEqual(self.find(weight), (None, True))
+                self.assertIsNone(get_rate_index().quote(self.method, 'TZ', Decimal(weight)))
+
+    def test_inactive_rates_and_methods_are_left_out(self):
+        ShippingRate.objects.filter(pk=self.heavy.pk).update(is_active=False)
+        express = create_method(name='Express', is_active=False)
+        create_rate(express, '0', '10', '9000.00')
+        invalidate_rate_index()
+
+        self.assertEqual(self.find('5'), (None, True))
+        self.assertEqual(self.find('5', method=express), (None, False))
+        self.assertEqual([method.id for method in get_rate_index().methods], [self.method.id])
+
+    def test_region_rates_are_preferred(self):
+        arusha = create_rate(self.method, '0', '5', '4000.00', region='Arusha')
+
+        self.assertEqual(self.find('1', region='Arusha'), (arusha.id, True))
+        self.assertEqual(self.find('1'), (self.light.id, True))
+        # Outside the regional bands the country-wide table applies
+        self.assertEqual(self.find('8', region='Arusha'), (self.heavy.id, True))
+
+    def test_destination_without_rates_falls_back_to_the_method(self):
+        self.assertEqual(self.find('1', country='KE'), (None, False))
+
+        quote = get_rate_index().quote(self.method, 'TZ', Decimal('40'))
+        self.assertIsNone(quote)
+        ShippingRate.objects.filter(shipping_method=self.method).update(is_active=False)
+        invalidate_rate_index()
+        quote = get_rate_index().quote(self.method, 'TZ', Decimal('1.5'))
+        self.assertEqual(quote.cost, Decimal('8000.00'))
+        self.assertIsNone(quote.rate_id)
+
+    def test_admin_bulk_delete_refreshes_the_index(self):
+        self.assertEqual(self.find('1'), (self.light.id, True))
+        version = cache.get(RATE_INDEX_VERSION_KEY)
+
+        ShippingRateAdmin(ShippingRate, site).delete_queryset(None, ShippingRate.objects.filter(pk=self.light.pk))
+
+        self.assertNotEqual(cache.get(RATE_INDEX_VERSION_KEY), version)
+        self.assertEqual(self.find('1'), (None, True))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ShippingQuoteTests(APITestCase):
+    """Whole-cart quotes and the quote endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        artist_user = User.objects.create_user(email='artist@example.com', username='artist', password=None)
+        artist = Artist.objects.create(user=artist_user, display_name='Asha')
+        category = Category.objects.create(name='Masks', slug='masks')
+        cls.artworks = Artwork.objects.bulk_create([
+            Artwork(
+                artist=artist, category=category, title=f'Mask {i}', slug=f'mask-{i}',
+                description='Mask', material='Wood', dimensions='10 x 10 x 10', price=Decimal('1000.00'),
+                weight=Decimal('1.5'), stock_quantity=10, status=Artwork.ACTIVE
+            )
+            for i in range(3)
+        ])
+        Artwork.objects.filter(pk=cls.artworks[2].pk).update(status=Artwork.DRAFT)
+        cls.method = create_method()
+        create_rate(cls.method, '0', '5', '3000.00')
+        cls.user = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+
+    def setUp(self):
+        cache.clear()
+        invalidate_rate_index()
+
+    def quote(self, **data):
+        return self.client.post(reverse('shipping:shipping_quote'), data, format='json')
+
+    def test_digest_ignores_line_order(self):
+        lines = artwork_lines([self.artworks[0].id, self.artworks[1].id, self.artworks[1].id])
+
+        self.assertEqual(_lines_digest(lines), _lines_digest(list(reversed(lines))))
+        changed = [(artwork_id, quantity + 1, weight) for artwork_id, quantity, weight in lines]
+        self.assertNotEqual(_lines_digest(lines), _lines_digest(changed))
+
+    def test_quotes_are_cached_until_rates_change(self):
+        lines = artwork_lines({self.artworks[0].id: 2})
+        first = quote_cart(lines)
+        self.assertEqual(first['weight'], Decimal('3.0'))
+        self.assertEqual(first['quotes'][0]['cost'], Decimal('3000.00'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(quote_cart(list(reversed(lines))), first)
+
+        ShippingRate.objects.filter(shipping_method=self.method).update(base_rate=Decimal('3500.00'))
+        self.assertEqual(quote_cart(lines), first)
+        invalidate_rate_index()
+        self.assertEqual(quote_cart(lines)['quotes'][0]['cost'], Decimal('3500.00'))
+
+    def test_quote_for_artworks(self):
+        response = self.quote(artwork_ids=[str(self.artworks[0].id)] * 2 + [str(self.artworks[1].id)])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['weight'], '4.500')
+        self.assertEqual([quote['cost'] for quote in response.json()['quotes']], ['3000.00'])
+
+    def test_unknown_or_inactive_artworks_are_rejected(self):
+        unknown = str(uuid.uuid4())
+        response = self.quote(artwork_ids=[str(self.artworks[0].id), str(self.artworks[2].id), unknown])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['artwork_ids'], sorted([str(self.artworks[2].id), unknown]))
+
+    def test_quote_for_the_users_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, artwork=self.artworks[1], quantity=3, unit_price=Decimal('1000.00'))
+        self.client.force_authenticate(self.user)
+
+        response = self.quote(country='tz')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['weight'], '4.500')
+
+    def test_quote_for_a_guest_session_cart(self):
+        self.assertEqual(self.quote().status_code, 400)
+        self.client.post(
+            reverse('catalog:cart_add_item'), {'artwork_id': str(self.artworks[0].id), 'quantity': 2}, format='json'
+        )
+
+        response = self.quote()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['weight'], '3.000')
+        self.assertEqual(len(response.json()['quotes']), 1)
@@ -7,6 +7,7 @@ urlpatterns = [
     # Shipping methods
     path('methods/', views.ShippingMethodListView.as_view(), name='shipping_methods'),
     path('calculate/', views.ShippingCostCalculationView.as_view(), name='calculate_shipping'),
+    path('quote/', views.ShippingQuoteView.as_view(), name='shipping_quote'),
     
     # Shipments
     path('shipments/', views.ShipmentListView.as_view(), name='shipment_list'),
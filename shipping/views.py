@@ -10,8 +10,11 @@ from datetime import date, timedelta
 from .models import ShippingMethod, Shipment
 from .serializers import (
     ShippingMethodSerializer, ShippingCostCalculationSerializer,
-    ShippingCostResponseSerializer, ShipmentSerializer
+    ShippingCostResponseSerializer, ShipmentSerializer,
+    ShippingQuoteRequestSerializer, ShippingQuoteResponseSerializer
 )
+from .services.quotes import artwork_lines, cart_lines, quote_cart, quote_shipping
+from catalog.services.cart import SessionCart, get_cart_id
 
 
 class ShippingMethodListView(generics.ListAPIView):
@@ -101,24 +104,15 @@ class ShippingCostCalculationView(APIView):
                     is_active=True
                 )
                 
-                # Check if method supports the country
-                if country != 'TZ' and shipping_method.domestic_only:
-                    if country not in shipping_method.supported_countries:
-                        return Response(
-                            {"error": "Shipping method not available for this country"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                
-                # Check weight limit
-                if weight > shipping_method.max_weight:
+                quote = quote_shipping(shipping_method, country=country, weight=weight)
+                if quote is None:
                     return Response(
-                        {"error": f"Weight exceeds maximum limit of {shipping_method.max_weight}kg"},
+                        {"error": "Shipping method not available for this country or weight"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                cost = shipping_method.calculate_cost(weight)
-                estimated_date = date.today() + timedelta(days=shipping_method.max_delivery_days)
-                delivery_window = f"{shipping_method.min_delivery_days}-{shipping_method.max_delivery_days} business days"
+                estimated_date = date.today() + timedelta(days=quote.max_delivery_days)
+                delivery_window = f"{quote.min_delivery_days}-{quote.max_delivery_days} business days"
                 
                 response_data = {
                     'shipping_method': {
@@ -126,7 +120,7 @@ class ShippingCostCalculationView(APIView):
                         'name': shipping_method.name,
                         'carrier': shipping_method.carrier
                     },
-                    'cost': str(cost),
+                    'cost': str(quote.cost),
                     'currency': 'TZS',
                     'estimated_delivery_date': estimated_date,
                     'delivery_window': delivery_window
@@ -143,6 +137,55 @@ class ShippingCostCalculationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ShippingQuoteView(APIView):
+    """
+    Quote every eligible shipping method for the cart or a list of artworks
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        summary="Quote shipping for a cart",
+        description="Quote all shipping methods that can deliver the cart (the user's cart, or the session "
+                    "cart for guests) or the given artworks to the destination, cheapest first",
+        request=ShippingQuoteRequestSerializer,
+        responses={
+            200: ShippingQuoteResponseSerializer,
+            400: OpenApiResponse(description="Invalid input, unknown or unavailable artworks, or empty cart"),
+        }
+    )
+    def post(self, request):
+        serializer = ShippingQuoteRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        if data.get('artwork_ids'):
+            lines = artwork_lines(data['artwork_ids'])
+            missing = {str(artwork_id) for artwork_id in data['artwork_ids']} - {str(line[0]) for line in lines}
+            if missing:
+                return Response(
+                    {"error": "Some artworks don't exist or aren't available", "artwork_ids": sorted(missing)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif request.user.is_authenticated:
+            lines = cart_lines(get_cart_id(request.user))
+        else:
+            lines = artwork_lines({item['artwork_id']: item['quantity'] for item in SessionCart(request).items})
+        if not lines:
+            return Response(
+                {"error": "Cart is empty"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = quote_cart(
+            lines,
+            country=data['country'],
+            service_level=data['service_level'],
+            region=data['region']
+        )
+        return Response(ShippingQuoteResponseSerializer({'currency': 'TZS', **result}).data)
+
+
 class ShipmentListView(generics.ListCreateAPIView):
     """
     List shipments for the authenticated user or create new shipment